@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import psycopg
+
+from app.core.db import DATABASE_URL
+from app.core.logger import get_logger
+from app.core.metrics import (
+    consumer_cache_entries,
+    consumer_cache_evictions,
+    consumer_cache_hits,
+    consumer_cache_misses,
+)
+from app.relay.repository import LATEST_TICKS_NOTIFY_CHANNEL
+
+logger = get_logger(__name__)
+
+CONSUMER_CACHE_MAX_ENTRIES = int(os.getenv("CONSUMER_CACHE_MAX_ENTRIES", "1024"))
+# Backstop only: entries are normally dropped by a delivery notification long before this.
+CONSUMER_CACHE_TTL_SECONDS = float(os.getenv("CONSUMER_CACHE_TTL_SECONDS", "30"))
+CACHE_RECONNECT_SECONDS = 5.0
+CACHE_STOP_POLL_SECONDS = 1.0
+
+
+class TickCache:
+    """
+    Thread-safe LRU cache of latest ticks by symbol with a per-entry TTL.
+
+    A cached None means "nothing delivered yet", so unknown symbols don't hit
+    Postgres on every read either. `version` moves on every invalidation;
+    callers read it before a fetch and pass it to put_many, which refuses to
+    store a result an invalidation may have overtaken.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CONSUMER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = CONSUMER_CACHE_TTL_SECONDS,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, dict | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, symbols: list[str]) -> tuple[dict[str, dict | None], list[str]]:
+        """
+        Split `symbols` into cached values and the symbols that must be fetched.
+        """
+        found, missing = {}, []
+        now = self._clock()
+        with self._lock:
+            for symbol in symbols:
+                entry = self._entries.get(symbol)
+                if entry is not None and entry[0] <= now:
+                    del self._entries[symbol]
+                    consumer_cache_evictions.labels(reason="expired").inc()
+                    entry = None
+                if entry is None:
+                    missing.append(symbol)
+                    continue
+                self._entries.move_to_end(symbol)
+                found[symbol] = entry[1]
+            consumer_cache_entries.set(len(self._entries))
+
+        consumer_cache_hits.inc(len(found))
+        consumer_cache_misses.inc(len(missing))
+        return found, missing
+
+    def put_many(self, values: dict[str, dict | None], version: int):
+        with self._lock:
+            if version != self.version:
+                # a delivery landed while the caller was reading; its rows may already be stale
+                return
+            expires_at = self._clock() + self.ttl_seconds
+            for symbol, value in values.items():
+                self._entries[symbol] = (expires_at, value)
+                self._entries.move_to_end(symbol)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                consumer_cache_evictions.labels(reason="size").inc()
+            consumer_cache_entries.set(len(self._entries))
+
+    def invalidate(self, symbol: str):
+        with self._lock:
+            self.version += 1
+            if self._entries.pop(symbol, None) is not None:
+                consumer_cache_evictions.labels(reason="invalidated").inc()
+            consumer_cache_entries.set(len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            if self._entries:
+                consumer_cache_evictions.labels(reason="invalidated").inc(len(self._entries))
+            self._entries.clear()
+            consumer_cache_entries.set(0)
+
+
+class CacheInvalidator:
+    """
+    Drops cache entries as the relay announces newer ticks on LATEST_TICKS_NOTIFY_CHANNEL.
+
+    Holds one dedicated autocommit connection, like the relay listener. The
+    cache is cleared on every (re)connect because notifications sent while
+    nobody was listening are lost.
+    """
+
+    def __init__(self, cache: TickCache):
+        self._cache = cache
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="consumer-cache-invalidator", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {LATEST_TICKS_NOTIFY_CHANNEL}")
+                    self._cache.clear()
+                    self._listen(conn)
+            except Exception as e:
+                logger.error("Consumer cache invalidator error", extra={"error": str(e)})
+                self._cache.clear()
+                self._stop.wait(CACHE_RECONNECT_SECONDS)
+
+    def _listen(self, conn: psycopg.Connection):
+        while not self._stop.is_set():
+            for notify in conn.notifies(timeout=CACHE_STOP_POLL_SECONDS):
+                self._cache.invalidate(notify.payload)
+
+
+tick_cache = TickCache()
+_invalidator = CacheInvalidator(tick_cache)
+
+
+def start_cache_invalidation():
+    """
+    Start push invalidation for the shared cache. Consumers that run
+    long-lived should call this once at start-up; without it entries live
+    for CONSUMER_CACHE_TTL_SECONDS.
+    """
+    _invalidator.start()
+
+
+def stop_cache_invalidation(timeout: float = 5.0):
+    _invalidator.stop(timeout)
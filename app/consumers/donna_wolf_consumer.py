@@ -1,15 +1,24 @@
-import psycopg
-import os
-from dotenv import load_dotenv
+from datetime import datetime
 
-load_dotenv()
+from app.consumers.cache import start_cache_invalidation, tick_cache
+from app.core import archive
+from app.core.db import get_connection
 
-DATABASE_URL: str = os.getenv("DATABASE_URL") or ""
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set in environment")
 
+def _tick_from_row(row) -> dict:
+    return {
+        "event_id": str(row[0]),
+        "trace_id": str(row[1]),
+        "symbol": row[2],
+        "occurred_at": row[3].isoformat(),
+        "price": row[4]["price"],
+        "volume": row[4]["volume"],
+        "currency": row[4]["currency"],
+        "delivered_at": row[5].isoformat(),
+    }
 
-def get_latest_market_event(symbol: str) -> dict | None:
+
+def get_latest_market_event(symbol: str, use_cache: bool = True) -> dict | None:
     """
     Reads the most recently delivered market event for a given symbol
     from the Control Plane event store.
@@ -17,53 +26,127 @@ def get_latest_market_event(symbol: str) -> dict | None:
     This replaces Donna's direct yfinance call with a reliable,
     traceable, structured event consumption pattern.
     """
-    with psycopg.connect(DATABASE_URL) as conn:
+    snapshot = get_portfolio_snapshot([symbol], use_cache=use_cache)
+    return snapshot[0] if snapshot else None
+
+
+def _fetch_latest_ticks(symbols: list[str]) -> dict[str, dict]:
+    with get_connection() as conn:
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT
-                    e.event_id,
-                    e.trace_id,
-                    e.entity_id,
-                    e.occurred_at,
-                    e.payload_json,
-                    o.delivered_at
-                FROM events e
-                JOIN outbox o ON e.event_id = o.event_id
-                WHERE e.entity_id = %s
-                AND e.event_type = 'MARKET_TICK_INGESTED'
-                AND o.delivered_at IS NOT NULL
-                ORDER BY o.delivered_at DESC
-                LIMIT 1
-            """, (symbol,))
-            row = cur.fetchone()
-            if not row:
-                return None
-            return {
-                "event_id": str(row[0]),
-                "trace_id": str(row[1]),
-                "symbol": row[2],
-                "occurred_at": row[3].isoformat(),
-                "price": row[4]["price"],
-                "volume": row[4]["volume"],
-                "currency": row[4]["currency"],
-                "delivered_at": row[5].isoformat(),
-            }
-
-
-def get_portfolio_snapshot(symbols: list[str]) -> list[dict]:
+                    event_id,
+                    trace_id,
+                    entity_id,
+                    occurred_at,
+                    payload_json,
+                    delivered_at
+                FROM latest_ticks
+                WHERE entity_id = ANY(%s)
+            """, (symbols,))
+            return {row[2]: _tick_from_row(row) for row in cur.fetchall()}
+
+
+def get_portfolio_snapshot(symbols: list[str], use_cache: bool = True) -> list[dict]:
     """
     Returns the latest delivered market event for each symbol.
     Donna's Wolf calls this instead of hitting yfinance directly.
+
+    Served from latest_ticks (maintained by the relay on delivery) with one
+    primary-key lookup for all symbols, behind the in-process tick cache.
+    Results follow the order of `symbols`; symbols with nothing delivered
+    yet are omitted.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return []
+
+    if use_cache:
+        found, missing = tick_cache.get_many(symbols)
+    else:
+        found, missing = {}, symbols
+
+    if missing:
+        version = tick_cache.version
+        fetched = _fetch_latest_ticks(missing)
+        fetched = {symbol: fetched.get(symbol) for symbol in missing}
+        tick_cache.put_many(fetched, version)
+        found.update(fetched)
+
+    return [found[s] for s in symbols if found.get(s) is not None]
+
+
+DELIVERED_HISTORY_SQL = """
+SELECT
+    e.event_id,
+    e.trace_id,
+    e.entity_id,
+    e.occurred_at,
+    e.payload_json,
+    o.delivered_at
+FROM outbox o
+JOIN events e ON e.event_id = o.event_id
+WHERE o.partition_key = %s
+  AND o.topic = 'market.ticks'
+  AND o.delivered_at IS NOT NULL
+ORDER BY o.delivered_at DESC
+LIMIT %s
+"""
+
+
+def get_delivered_history(symbol: str, limit: int = 100) -> list[dict]:
+    """
+    The last `limit` delivered market events for one symbol, newest delivery
+    first. Read straight from the outbox (idx_outbox_delivered_entity), uncached.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(DELIVERED_HISTORY_SQL, (symbol, limit))
+            return [_tick_from_row(row) for row in cur.fetchall()]
+
+
+TICK_HISTORY_SQL = """
+SELECT
+    e.event_id,
+    e.trace_id,
+    e.entity_id,
+    e.occurred_at,
+    e.payload_json,
+    o.delivered_at
+FROM events e
+JOIN outbox o ON o.event_id = e.event_id
+WHERE e.entity_id = %s
+  AND o.topic = 'market.ticks'
+  AND o.delivered_at IS NOT NULL
+  AND e.occurred_at >= %s
+  AND e.occurred_at < %s
+ORDER BY e.occurred_at, e.event_id
+"""
+
+
+def get_tick_history(symbol: str, start: datetime, end: datetime) -> list[dict]:
+    """
+    Delivered ticks for one symbol with start <= occurred_at < end, oldest
+    first, for backtests. Any part of the range below the archive watermark
+    is read from the Parquet archive, and the rest from the event store.
     """
-    results = []
-    for symbol in symbols:
-        event = get_latest_market_event(symbol)
-        if event:
-            results.append(event)
-    return results
+    ticks = []
+    boundary = archive.archived_until(archive.DEFAULT_TOPIC) if archive.ARCHIVE_ENABLED else None
+    if boundary is not None and start < boundary:
+        archived_end = min(end, boundary)
+        for r in archive.iter_range(archive.DEFAULT_TOPIC, start, archived_end, [symbol]):
+            ticks.append(_tick_from_row((r[0], r[7], r[3], r[5], r[8], r[9])))
+        start = archived_end
 
+    if start < end:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(TICK_HISTORY_SQL, (symbol, start, end))
+                ticks.extend(_tick_from_row(row) for row in cur.fetchall())
+    return ticks
 
 if __name__ == "__main__":
+    start_cache_invalidation()
     snapshot = get_portfolio_snapshot(["AAPL"])
     for item in snapshot:
-        print(f"{item['symbol']}: ${item['price']} — trace_id: {item['trace_id']}")
\ No newline at end of file
+        print(f"{item['symbol']}: ${item['price']} — trace_id: {item['trace_id']}")
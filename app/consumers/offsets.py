@@ -0,0 +1,87 @@
+from uuid import uuid4
+
+from app.core.db import get_connection
+
+DEFAULT_TOPIC = "market.ticks"
+CONSUMER_ITERSIZE = 500
+
+
+def _event_from_row(row) -> dict:
+    return {
+        "delivery_seq": row[0],
+        "event_id": str(row[1]),
+        "trace_id": str(row[2]),
+        "symbol": row[3],
+        "occurred_at": row[4].isoformat(),
+        "payload": row[5],
+        "delivered_at": row[6].isoformat(),
+    }
+
+
+def get_offset(consumer_name: str, topic: str = DEFAULT_TOPIC) -> int:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT last_seq
+                FROM consumer_offsets
+                WHERE consumer_name = %s AND topic = %s
+            """, (consumer_name, topic))
+            row = cur.fetchone()
+            return row[0] if row else 0
+
+
+def commit_offset(consumer_name: str, last_seq: int, topic: str = DEFAULT_TOPIC):
+    """
+    Record that `consumer_name` has processed everything up to `last_seq`.
+    Offsets only move forward, so a late or repeated commit is harmless.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO consumer_offsets (consumer_name, topic, last_seq)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (consumer_name, topic) DO UPDATE
+                SET last_seq = GREATEST(consumer_offsets.last_seq, EXCLUDED.last_seq),
+                    updated_at = NOW()
+            """, (consumer_name, topic, last_seq))
+
+
+def iter_delivered(after_seq: int, limit: int | None = None, topic: str = DEFAULT_TOPIC):
+    """
+    Stream delivered events with delivery_seq > after_seq in sequence order.
+
+    Keyset read on (topic, delivery_seq) through a server-side cursor, so a
+    large catch-up streams CONSUMER_ITERSIZE rows per round trip instead of
+    materializing the whole range client-side.
+    """
+    with get_connection() as conn:
+        with conn.cursor(name=f"consumer_{uuid4().hex[:8]}") as cur:
+            cur.itersize = CONSUMER_ITERSIZE
+            cur.execute("""
+                SELECT
+                    o.delivery_seq,
+                    e.event_id,
+                    e.trace_id,
+                    e.entity_id,
+                    e.occurred_at,
+                    e.payload_json,
+                    o.delivered_at
+                FROM outbox o
+                JOIN events e ON e.event_id = o.event_id
+                WHERE o.topic = %s
+                  AND o.delivery_seq > %s
+                ORDER BY o.delivery_seq
+                LIMIT %s
+            """, (topic, after_seq, limit))
+            for row in cur:
+                yield _event_from_row(row)
+
+
+def read_since(consumer_name: str, max_batch: int = 500, topic: str = DEFAULT_TOPIC) -> list[dict]:
+    """
+    Return up to `max_batch` delivered events this consumer hasn't committed
+    yet, oldest first. Nothing is committed here: process the batch, then
+    commit_offset(consumer_name, batch[-1]["delivery_seq"]) for at-least-once
+    consumption.
+    """
+    return list(iter_delivered(get_offset(consumer_name, topic), limit=max_batch, topic=topic))
@@ -0,0 +1,347 @@
+"""
+Columnar archive of delivered events.
+
+Delivered events are exported one day (of occurred_at) at a time to
+compressed Parquet, one file per day and symbol:
+
+    {ARCHIVE_DIR}/topic=market.ticks/date=2026-10-17/entity_id=AAPL.parquet
+
+event_archive_watermarks records how far each topic is archived. A day is
+only exported once it is ARCHIVE_LAG_DAYS old, so late ticks have landed,
+and none of its events are still waiting for delivery.
+Readers memory-map the files. load_table() returns an Arrow table for
+backtests. iter_range() yields rows in replay order, (occurred_at, event_id).
+
+The archive is off unless ARCHIVE_DIR is set. pyarrow is only imported
+here, so nothing else needs it installed.
+
+    python -m app.core.archive                    # export every day that is due
+    python -m app.core.archive --day 2026-10-01   # (re-)export one day
+"""
+import argparse
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import groupby, islice
+from pathlib import Path
+from urllib.parse import quote
+from uuid import uuid4
+
+from app.core.codec import dumps, loads
+from app.core.db import get_connection
+from app.core.logger import get_logger
+from app.core.metrics import events_archived
+
+logger = get_logger(__name__)
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "")
+ARCHIVE_ENABLED = bool(ARCHIVE_DIR)
+ARCHIVE_LAG_DAYS = int(os.getenv("ARCHIVE_LAG_DAYS", "2"))
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+ARCHIVE_ITERSIZE = 2000
+DEFAULT_TOPIC = "market.ticks"
+
+# Row layout shared by the export query and the readers. The first nine
+# columns are the event store row event_replay publishes from.
+ARCHIVE_COLUMNS = (
+    "event_id", "event_type", "source", "entity_id", "entity_type",
+    "occurred_at", "schema_version", "trace_id", "payload_json",
+    "delivered_at", "delivery_seq",
+)
+
+EXPORT_SQL = """
+    SELECT
+        e.event_id, e.event_type, e.source, e.entity_id, e.entity_type,
+        e.occurred_at, e.schema_version, e.trace_id, e.payload_json,
+        o.delivered_at, o.delivery_seq
+    FROM events e
+    JOIN outbox o ON o.event_id = e.event_id
+    WHERE o.topic = %s
+      AND o.delivered_at IS NOT NULL
+      AND e.occurred_at >= %s
+      AND e.occurred_at < %s
+    ORDER BY e.entity_id, e.occurred_at, e.event_id
+"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("The event archive needs pyarrow: pip install pyarrow") from e
+    return pa, pc, pq
+
+
+def _schema(pa):
+    ts = pa.timestamp("us", tz="UTC")
+    return pa.schema([
+        ("event_id", pa.string()),
+        ("event_type", pa.string()),
+        ("source", pa.string()),
+        ("entity_id", pa.string()),
+        ("entity_type", pa.string()),
+        ("occurred_at", ts),
+        ("schema_version", pa.int32()),
+        ("trace_id", pa.string()),
+        ("payload_json", pa.string()),
+        ("delivered_at", ts),
+        ("delivery_seq", pa.int64()),
+    ])
+
+
+def as_datetime(value) -> datetime:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time(), timezone.utc)
+
+
+def _days(start: datetime, end: datetime):
+    day = start.astimezone(timezone.utc).date()
+    while _day_start(day) < end:
+        yield day
+        day += timedelta(days=1)
+
+
+def _day_dir(root: Path, topic: str, day: date) -> Path:
+    return root / f"topic={quote(topic, safe='')}" / f"date={day.isoformat()}"
+
+
+def _entity_file(entity_id: str | None) -> str:
+    return f"entity_id={quote(entity_id or '', safe='')}.parquet"
+
+
+def _root(root) -> Path:
+    return Path(root or ARCHIVE_DIR)
+
+
+def _archive_record(row) -> dict:
+    record = dict(zip(ARCHIVE_COLUMNS, row))
+    record["event_id"] = str(record["event_id"])
+    record["trace_id"] = str(record["trace_id"])
+    record["payload_json"] = dumps(record["payload_json"])
+    return record
+
+
+def archived_until(topic: str = DEFAULT_TOPIC) -> datetime | None:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT archived_until FROM event_archive_watermarks WHERE topic = %s", (topic,))
+            row = cur.fetchone()
+            return row[0] if row else None
+
+
+def _advance_watermark(topic: str, expected: datetime | None, until: datetime) -> bool:
+    """
+    Move the watermark from `expected` to `until`. Returns False if it moved
+    in the meantime, e.g. a dead-letter replay pulled it back.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            if expected is None:
+                cur.execute("""
+                    INSERT INTO event_archive_watermarks (topic, archived_until)
+                    VALUES (%s, %s)
+                    ON CONFLICT (topic) DO NOTHING
+                """, (topic, until))
+            else:
+                cur.execute("""
+                    UPDATE event_archive_watermarks
+                    SET archived_until = %s, updated_at = NOW()
+                    WHERE topic = %s AND archived_until = %s
+                """, (until, topic, expected))
+            return cur.rowcount == 1
+
+
+def _earliest_pending(topic: str) -> datetime | None:
+    """occurred_at of the oldest event on `topic` that is still waiting for delivery."""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT MIN(e.occurred_at)
+                FROM outbox o
+                JOIN events e ON e.event_id = o.event_id
+                WHERE o.topic = %s
+                  AND o.delivered_at IS NULL
+                  AND o.dead_lettered_at IS NULL
+            """, (topic,))
+            row = cur.fetchone()
+            return row[0] if row else None
+
+
+def _first_event_at() -> datetime | None:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT MIN(occurred_at) FROM events")
+            row = cur.fetchone()
+            return row[0] if row else None
+
+
+def _merge(archived: list[dict], records: list[dict]) -> list[dict]:
+    """Already archived records plus newly exported ones, one per event_id, in (occurred_at, event_id) order."""
+    by_id = {r["event_id"]: r for r in archived}
+    by_id.update((r["event_id"], r) for r in records)
+    return sorted(by_id.values(), key=lambda r: (r["occurred_at"], r["event_id"]))
+
+
+def export_day(day: date, topic: str = DEFAULT_TOPIC, root=None) -> int:
+    """
+    Write one day's delivered events, one Parquet file per symbol, and
+    return how many were written. Re-exporting a day (after a late delivery)
+    merges into what is already archived rather than replacing it, so events
+    whose partitions were retired in the meantime are kept. Each file is
+    written under a temporary name and renamed over the old one, so a
+    concurrent reader always sees a complete file for every symbol.
+    """
+    pa, _, pq = _pyarrow()
+    schema = _schema(pa)
+    start = _day_start(day)
+    final = _day_dir(_root(root), topic, day)
+    final.mkdir(parents=True, exist_ok=True)
+    suffix = f".tmp-{uuid4().hex[:8]}"
+
+    count = 0
+    try:
+        with get_connection() as conn:
+            with conn.cursor(name=f"archive_{uuid4().hex[:8]}") as cur:
+                cur.itersize = ARCHIVE_ITERSIZE
+                cur.execute(EXPORT_SQL, (topic, start, start + timedelta(days=1)))
+                for entity_id, rows in groupby(cur, key=lambda r: r[3]):
+                    records = [_archive_record(r) for r in rows]
+                    path = final / _entity_file(entity_id)
+                    if path.exists():
+                        existing = pq.read_table(path, schema=schema).to_pylist()
+                        records = _merge(existing, records)
+                    # the dot prefix keeps readers' entity_id=*.parquet glob off the partial file
+                    scratch = final / f".{path.name}{suffix}"
+                    pq.write_table(pa.Table.from_pylist(records, schema=schema), scratch, compression=ARCHIVE_COMPRESSION)
+                    os.replace(scratch, path)
+                    count += len(records)
+    except BaseException:
+        for leftover in final.glob(f".*{suffix}"):
+            leftover.unlink(missing_ok=True)
+        raise
+
+    events_archived.labels(topic=topic).inc(count)
+    logger.info(f"Archived {count} {topic} events for {day}")
+    return count
+
+
+def export_pending(topic: str = DEFAULT_TOPIC, lag_days: int = ARCHIVE_LAG_DAYS, root=None, now: datetime | None = None) -> list[dict]:
+    """
+    Export every day from the watermark up to `lag_days` ago, advancing the
+    watermark after each day so an interrupted run picks up where it stopped.
+
+    The watermark never passes a day with an event still waiting for
+    delivery (a retry, or a relay backlog longer than the lag), since that
+    event would never reach the archive. A dead letter requeued below the
+    watermark pulls it back to its day (app.relay.repository), and that day
+    is re-exported once the event is delivered.
+    """
+    until = _day_start((now or datetime.now(timezone.utc)).astimezone(timezone.utc).date()) - timedelta(days=lag_days)
+    pending = _earliest_pending(topic)
+    if pending is not None:
+        until = min(until, _day_start(pending.astimezone(timezone.utc).date()))
+
+    watermark = archived_until(topic)
+    expected = watermark
+    if watermark is None:
+        first = _first_event_at()
+        if first is None:
+            return []
+        watermark = _day_start(first.astimezone(timezone.utc).date())
+
+    exported = []
+    day = watermark.astimezone(timezone.utc).date()
+    while _day_start(day) + timedelta(days=1) <= until:
+        count = export_day(day, topic, root)
+        next_day = _day_start(day) + timedelta(days=1)
+        if not _advance_watermark(topic, expected, next_day):
+            logger.info(f"Archive watermark for {topic} moved during export; resuming next run")
+            break
+        exported.append({"day": day.isoformat(), "events": count})
+        expected = next_day
+        day += timedelta(days=1)
+    return exported
+
+
+def load_table(topic: str, start, end, entity_ids: list[str] | None = None, root=None):
+    """
+    Archived events with start <= occurred_at < end as one Arrow table in
+    (occurred_at, event_id) order. The files are memory-mapped, and the
+    concatenation references their buffers rather than copying them.
+    """
+    pa, pc, pq = _pyarrow()
+    schema = _schema(pa)
+    start, end = as_datetime(start), as_datetime(end)
+
+    tables = []
+    for day in _days(start, end):
+        directory = _day_dir(_root(root), topic, day)
+        if entity_ids:
+            paths = [directory / _entity_file(e) for e in entity_ids]
+        else:
+            paths = sorted(directory.glob("entity_id=*.parquet"))
+        tables.extend(pq.read_table(p, memory_map=True, schema=schema) for p in paths if p.exists())
+    if not tables:
+        return schema.empty_table()
+
+    table = pa.concat_tables(tables)
+    ts = schema.field("occurred_at").type
+    in_range = pc.and_(
+        pc.greater_equal(table["occurred_at"], pa.scalar(start, type=ts)),
+        pc.less(table["occurred_at"], pa.scalar(end, type=ts)),
+    )
+    return table.filter(in_range).sort_by([("occurred_at", "ascending"), ("event_id", "ascending")])
+
+
+def iter_range(topic: str, start, end, entity_ids: list[str] | None = None, after=None, root=None):
+    """
+    Yield archived rows (ARCHIVE_COLUMNS order, payload decoded) with
+    start <= occurred_at < end and (occurred_at, event_id) > after, in that
+    order. Only one day is loaded at a time.
+    """
+    pa, pc, _ = _pyarrow()
+    start, end = as_datetime(start), as_datetime(end)
+    after_at = as_datetime(after[0]) if after else None
+
+    for day in _days(start, end):
+        day_end = _day_start(day) + timedelta(days=1)
+        if after_at and day_end <= after_at:
+            continue
+        table = load_table(topic, max(start, _day_start(day)), min(end, day_end), entity_ids, root)
+        if after_at:
+            at = pa.scalar(after_at, type=table.schema.field("occurred_at").type)
+            later = pc.or_(
+                pc.greater(table["occurred_at"], at),
+                pc.and_(pc.equal(table["occurred_at"], at), pc.greater(table["event_id"], str(after[1]))),
+            )
+            table = table.filter(later)
+        for batch in table.to_batches():
+            for record in batch.to_pylist():
+                record["payload_json"] = loads(record["payload_json"])
+                yield tuple(record[c] for c in ARCHIVE_COLUMNS)
+
+
+def read_page(topic: str, start, end, entity_ids=None, after=None, limit: int = 1000, root=None) -> list[tuple]:
+    return list(islice(iter_range(topic, start, end, entity_ids, after, root), limit))
+
+
+def _parse_day(value: str) -> date:
+    return date.fromisoformat(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export delivered events to the Parquet archive")
+    parser.add_argument("--topic", default=DEFAULT_TOPIC)
+    parser.add_argument("--day", type=_parse_day, help="export just this day (YYYY-MM-DD); the watermark is not moved")
+    args = parser.parse_args()
+
+    if not ARCHIVE_ENABLED:
+        parser.error("ARCHIVE_DIR is not set")
+    if args.day:
+        print({"day": args.day.isoformat(), "events": export_day(args.day, args.topic)})
+    else:
+        print(export_pending(args.topic))
@@ -0,0 +1,86 @@
+"""
+Serialization for the hot paths: ingestion rows, published messages and
+log lines.
+
+dumps()/loads() produce and parse compact JSON text. Ingestion uses them for
+the JSONB columns, psycopg for every JSONB value it reads, and the logger for
+each line. They use orjson when it is installed and fall back to the stdlib.
+
+Codecs turn an event envelope into the bytes the relay publishes. EVENT_CODEC
+selects one by name:
+- "json": stdlib json
+- "orjson": identical JSON, several times faster (needs orjson)
+- "msgpack": compact binary, for consumers that read it (needs msgpack)
+Others can be added with register_codec().
+"""
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+EVENT_CODEC = os.getenv("EVENT_CODEC", "orjson" if orjson else "json")
+
+
+def _stdlib_dumps(obj: Any, default: Callable | None = None) -> str:
+    return json.dumps(obj, separators=(",", ":"), default=default)
+
+
+def _orjson_dumps(obj: Any, default: Callable | None = None) -> str:
+    return orjson.dumps(obj, default=default).decode()
+
+
+dumps = _orjson_dumps if orjson else _stdlib_dumps
+loads = orjson.loads if orjson else json.loads
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    content_type: str
+    encode: Callable[[Any], bytes]
+    decode: Callable[[bytes], Any]
+
+
+def _json_codec() -> Codec:
+    return Codec("json", "application/json", lambda obj: _stdlib_dumps(obj).encode(), json.loads)
+
+
+def _orjson_codec() -> Codec:
+    if orjson is None:
+        raise RuntimeError("EVENT_CODEC=orjson needs orjson: pip install orjson")
+    return Codec("orjson", "application/json", orjson.dumps, orjson.loads)
+
+
+def _msgpack_codec() -> Codec:
+    try:
+        import msgpack
+    except ImportError as e:
+        raise RuntimeError("EVENT_CODEC=msgpack needs msgpack: pip install msgpack") from e
+    return Codec("msgpack", "application/msgpack", msgpack.packb, msgpack.unpackb)
+
+
+_FACTORIES: dict[str, Callable[[], Codec]] = {
+    "json": _json_codec,
+    "orjson": _orjson_codec,
+    "msgpack": _msgpack_codec,
+}
+_codecs: dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec):
+    _codecs[codec.name] = codec
+
+
+def get_codec(name: str | None = None) -> Codec:
+    """The codec registered as `name` (default EVENT_CODEC); optional libraries are imported on first use."""
+    name = name or EVENT_CODEC
+    if name not in _codecs:
+        if name not in _FACTORIES:
+            raise ValueError(f"Unknown codec: {name}")
+        _codecs[name] = _FACTORIES[name]()
+    return _codecs[name]
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+import psycopg
+from dotenv import load_dotenv
+from psycopg.types.json import set_json_loads
+from psycopg_pool import AsyncConnectionPool, ConnectionPool, PoolTimeout
+
+from app.core import codec
+
+from app.core.metrics import db_pool_connections, db_pool_timeouts, db_pool_wait_seconds
+
+load_dotenv()
+
+DATABASE_URL: str = os.getenv("DATABASE_URL") or ""
+if not DATABASE_URL:
+    raise RuntimeError("DATABASE_URL is not set in environment")
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Every JSONB value read on any connection (claimed payloads, API reads) is parsed with the fast codec.
+set_json_loads(codec.loads)
+
+_pool: ConnectionPool | None = None
+_async_pool: AsyncConnectionPool | None = None
+_pool_lock = threading.Lock()
+_async_pool_lock: asyncio.Lock | None = None
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Process-wide sync pool, created on first use.
+    Creation is lazy so forked worker processes each build their own pool.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    DATABASE_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    check=ConnectionPool.check_connection,
+                    name="control-plane",
+                    open=True,
+                )
+    return _pool
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    """
+    Process-wide async pool for the API's event loop, opened on first use.
+    Published only once open, so concurrent first requests never see a closed pool.
+    """
+    global _async_pool, _async_pool_lock
+    if _async_pool is None:
+        if _async_pool_lock is None:
+            _async_pool_lock = asyncio.Lock()
+        async with _async_pool_lock:
+            if _async_pool is None:
+                pool = AsyncConnectionPool(
+                    DATABASE_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    check=AsyncConnectionPool.check_connection,
+                    name="control-plane-async",
+                    open=False,
+                )
+                await pool.open()
+                _async_pool = pool
+    return _async_pool
+
+
+def _record_pool_stats(pool: ConnectionPool | AsyncConnectionPool, kind: str):
+    stats = pool.get_stats()
+    db_pool_connections.labels(pool=kind, state="size").set(stats.get("pool_size", 0))
+    db_pool_connections.labels(pool=kind, state="available").set(stats.get("pool_available", 0))
+    db_pool_connections.labels(pool=kind, state="waiting").set(stats.get("requests_waiting", 0))
+
+
+@contextmanager
+def get_connection(timeout: float | None = None) -> Iterator[psycopg.Connection]:
+    """
+    Borrow a pooled connection.
+    Same semantics as `with psycopg.connect(...)`: commit on success,
+    rollback on error — but the connection goes back to the pool instead of closing.
+    """
+    pool = get_pool()
+    start = time.perf_counter()
+    try:
+        conn = pool.getconn(timeout=timeout)
+    except PoolTimeout:
+        db_pool_timeouts.labels(pool="sync").inc()
+        raise
+    db_pool_wait_seconds.labels(pool="sync").observe(time.perf_counter() - start)
+    _record_pool_stats(pool, "sync")
+
+    try:
+        with conn:
+            yield conn
+    finally:
+        pool.putconn(conn)
+
+
+@asynccontextmanager
+async def get_async_connection(timeout: float | None = None) -> AsyncIterator[psycopg.AsyncConnection]:
+    pool = await get_async_pool()
+    start = time.perf_counter()
+    try:
+        conn = await pool.getconn(timeout=timeout)
+    except PoolTimeout:
+        db_pool_timeouts.labels(pool="async").inc()
+        raise
+    db_pool_wait_seconds.labels(pool="async").observe(time.perf_counter() - start)
+    _record_pool_stats(pool, "async")
+
+    try:
+        async with conn:
+            yield conn
+    finally:
+        await pool.putconn(conn)
+
+
+def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+async def close_async_pool():
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
@@ -0,0 +1,94 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+JOBS_MAX_WORKERS = int(os.getenv("JOBS_MAX_WORKERS", "2"))
+# Finished jobs kept for status lookups; the oldest are forgotten first.
+JOBS_HISTORY = int(os.getenv("JOBS_HISTORY", "200"))
+
+_ACTIVE = ("queued", "running")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobRunner:
+    """
+    Runs slow API work (relay drains, vendor fetches, replays) on a small
+    thread pool so request handlers return immediately with a job id.
+
+    State is in-process: status lookups must hit the API process that
+    accepted the job, and history doesn't survive a restart.
+    """
+
+    def __init__(self, max_workers: int = JOBS_MAX_WORKERS, history: int = JOBS_HISTORY):
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api-job")
+        self._jobs: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn, *args, coalesce: bool = False, **kwargs) -> dict:
+        """
+        Queue fn(*args, **kwargs) and return its job record. With coalesce=True
+        an already queued or running job of the same kind is returned instead
+        of starting another (e.g. repeated /run-relay clicks).
+        """
+        with self._lock:
+            if coalesce:
+                for job in reversed(self._jobs.values()):
+                    if job["kind"] == kind and job["status"] in _ACTIVE:
+                        return dict(job)
+
+            job = {
+                "job_id": str(uuid4()),
+                "kind": kind,
+                "status": "queued",
+                "submitted_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job["job_id"]] = job
+            self._prune()
+            snapshot = dict(job)
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return snapshot
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job: dict, fn, args, kwargs):
+        with self._lock:
+            job["status"] = "running"
+            job["started_at"] = _now()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Job {job['job_id']} ({job['kind']}) failed", extra={"error": str(e)})
+            with self._lock:
+                job.update(status="failed", error=str(e), finished_at=_now())
+            return
+        with self._lock:
+            job.update(status="succeeded", result=result, finished_at=_now())
+
+    def _prune(self):
+        excess = len(self._jobs) - self.history
+        if excess <= 0:
+            return
+        for job_id in [j for j, job in self._jobs.items() if job["status"] not in _ACTIVE][:excess]:
+            del self._jobs[job_id]
@@ -1,8 +1,9 @@
 import logging
-import json
 from datetime import datetime
 from uuid import UUID
 
+from app.core.codec import dumps
+
 
 class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
@@ -22,7 +23,7 @@ class JsonFormatter(logging.Formatter):
 
                 log_record[attr] = value
 
-        return json.dumps(log_record, default=str)
+        return dumps(log_record, default=str)
 
 def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
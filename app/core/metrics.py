@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 publish_latency_seconds = Histogram(
     "publish_latency_seconds",
@@ -18,4 +18,154 @@ events_failed = Counter(
 events_dead_lettered = Counter(
     "events_dead_lettered_total",
     "Total events dead-lettered"
-)
\ No newline at end of file
+)
+
+events_deferred = Counter(
+    "events_deferred_total",
+    "Total claimed events held back behind a failed event for the same entity"
+)
+
+publishes_in_flight = Gauge(
+    "publishes_in_flight",
+    "Publish calls currently in progress"
+)
+
+outbox_leases_reclaimed = Counter(
+    "outbox_leases_reclaimed_total",
+    "Outbox rows claimed again after a previous worker's lease expired"
+)
+
+outbox_backlog = Gauge(
+    "outbox_backlog",
+    "Outbox rows neither delivered nor dead-lettered, as of the last drain"
+)
+
+relay_drain_rate = Gauge(
+    "relay_drain_rate_events_per_second",
+    "Events delivered per second during the last drain"
+)
+
+relay_batch_size = Gauge(
+    "relay_batch_size",
+    "Current adaptive relay batch size"
+)
+
+db_pool_wait_seconds = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to borrow a pooled database connection",
+    ["pool"]
+)
+
+db_pool_timeouts = Counter(
+    "db_pool_timeouts_total",
+    "Total pool checkouts that timed out",
+    ["pool"]
+)
+
+db_pool_connections = Gauge(
+    "db_pool_connections",
+    "Pooled database connections by state",
+    ["pool", "state"]
+)
+
+
+ingest_latency_seconds = Histogram(
+    "ingest_latency_seconds",
+    "Time to fetch and persist one symbol",
+    ["source", "symbol"]
+)
+
+ingest_failures = Counter(
+    "ingest_failures_total",
+    "Symbols that failed to ingest",
+    ["source", "symbol"]
+)
+
+ingest_duplicate_events = Counter(
+    "ingest_duplicate_events_total",
+    "Events skipped at ingestion because their event_id was already stored"
+)
+
+ingest_throttled = Counter(
+    "ingest_throttled_total",
+    "Vendor requests delayed by the per-source rate limiter",
+    ["source", "symbol"]
+)
+
+ingest_throttle_seconds = Counter(
+    "ingest_throttle_seconds_total",
+    "Total time spent waiting on the per-source rate limiter",
+    ["source"]
+)
+
+
+consumer_cache_hits = Counter(
+    "consumer_cache_hits_total",
+    "Consumer market reads served from the in-process cache"
+)
+
+consumer_cache_misses = Counter(
+    "consumer_cache_misses_total",
+    "Consumer market reads that went to Postgres"
+)
+
+consumer_cache_evictions = Counter(
+    "consumer_cache_evictions_total",
+    "Entries dropped from the consumer cache",
+    ["reason"]
+)
+
+consumer_cache_entries = Gauge(
+    "consumer_cache_entries",
+    "Entries currently held in the consumer cache"
+)
+
+events_replayed = Counter(
+    "events_replayed_total",
+    "Events re-published from the event store by time-range replays",
+    ["topic"]
+)
+
+dashboard_viewers = Gauge(
+    "dashboard_viewers",
+    "Dashboards currently connected to the live update stream"
+)
+
+db_partitions = Gauge(
+    "db_partitions",
+    "Partitions currently attached to a time-partitioned table",
+    ["table"]
+)
+
+db_partition_bytes = Gauge(
+    "db_partition_bytes",
+    "On-disk size of each attached partition, indexes included",
+    ["table", "partition"]
+)
+
+db_partitions_retired = Counter(
+    "db_partitions_retired_total",
+    "Partitions detached by retention, by what happened to them",
+    ["table", "mode"]
+)
+
+events_archived = Counter(
+    "events_archived_total",
+    "Delivered events written to the columnar archive",
+    ["topic"]
+)
+
+raw_payload_blobs_written = Counter(
+    "raw_payload_blobs_written_total",
+    "Distinct vendor payloads stored in raw_payload_blobs"
+)
+
+raw_payloads_deduplicated = Counter(
+    "raw_payloads_deduplicated_total",
+    "Fetched payloads that referenced an already stored blob instead of storing a copy"
+)
+
+raw_payload_blobs_deleted = Counter(
+    "raw_payload_blobs_deleted_total",
+    "Unreferenced payload blobs removed by garbage collection"
+)
@@ -0,0 +1,164 @@
+"""
+Versioned schema migrations.
+
+Migrations are the files in db/migrations named NNNN_description.sql, applied
+in version order and recorded in schema_migrations with a checksum. Editing
+a migration after it has been applied is an error; add a new one instead.
+
+Each file runs in its own transaction unless its first line is
+`-- migrate: no-transaction`. Files with that marker (needed for
+CREATE INDEX CONCURRENTLY) run one statement at a time, and every statement
+must be safe to re-run in case the file fails partway. A session advisory
+lock serializes runners, so every API container can migrate on start.
+
+    python -m app.core.migrations            # apply everything pending
+    python -m app.core.migrations --status   # list applied and pending versions
+"""
+import argparse
+import hashlib
+import re
+from pathlib import Path
+
+import psycopg
+
+from app.core.db import DATABASE_URL
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "db" / "migrations"
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+_LOCK_SQL = "SELECT pg_advisory_lock(hashtext('schema_migrations'))"
+_UNLOCK_SQL = "SELECT pg_advisory_unlock(hashtext('schema_migrations'))"
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> list[dict]:
+    migrations = {}
+    for path in sorted(directory.glob("*.sql")):
+        match = _FILENAME.match(path.name)
+        if not match:
+            raise RuntimeError(f"Migration file name must look like 0001_name.sql: {path.name}")
+        version = int(match.group(1))
+        if version in migrations:
+            raise RuntimeError(f"Duplicate migration version {version}: {path.name}")
+        sql = path.read_text()
+        migrations[version] = {
+            "version": version,
+            "name": match.group(2),
+            "sql": sql,
+            "checksum": hashlib.sha256(sql.encode()).hexdigest(),
+            "transactional": not sql.startswith(NO_TRANSACTION_MARKER),
+        }
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def split_statements(sql: str) -> list[str]:
+    """
+    Split a no-transaction migration into statements on a trailing `;`.
+    Deliberately simple: such files hold plain DDL, no function bodies.
+    """
+    statements = []
+    for chunk in re.split(r";[ \t]*$", sql, flags=re.M):
+        code = "\n".join(line for line in chunk.splitlines() if not line.lstrip().startswith("--")).strip()
+        if code:
+            statements.append(code)
+    return statements
+
+
+def _ensure_table(conn: psycopg.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """)
+
+
+def _applied(conn: psycopg.Connection) -> dict[int, str]:
+    return dict(conn.execute("SELECT version, checksum FROM schema_migrations").fetchall())
+
+
+def _record(conn: psycopg.Connection, migration: dict):
+    conn.execute(
+        "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+        (migration["version"], migration["name"], migration["checksum"]),
+    )
+
+
+def _apply(conn: psycopg.Connection, migration: dict):
+    if migration["transactional"]:
+        with conn.transaction():
+            conn.execute(migration["sql"])
+            _record(conn, migration)
+        return
+
+    for statement in split_statements(migration["sql"]):
+        conn.execute(statement)
+    _record(conn, migration)
+
+
+def migrate(conn: psycopg.Connection | None = None, target: int | None = None, directory: Path = MIGRATIONS_DIR) -> list[int]:
+    """
+    Apply pending migrations up to `target` (all of them by default) and
+    return the versions applied. `conn` must be in autocommit mode; without
+    one a dedicated connection to DATABASE_URL is opened.
+    """
+    if conn is None:
+        with psycopg.connect(DATABASE_URL, autocommit=True) as own:
+            return migrate(own, target, directory)
+
+    migrations = discover(directory)
+    conn.execute(_LOCK_SQL)
+    try:
+        _ensure_table(conn)
+        applied = _applied(conn)
+        done = []
+        for migration in migrations:
+            version = migration["version"]
+            if target is not None and version > target:
+                break
+            if version in applied:
+                if applied[version] != migration["checksum"]:
+                    raise RuntimeError(f"Migration {version}_{migration['name']} was changed after it was applied")
+                continue
+            logger.info(f"Applying migration {version}_{migration['name']}")
+            _apply(conn, migration)
+            done.append(version)
+        return done
+    finally:
+        conn.execute(_UNLOCK_SQL)
+
+
+def status(conn: psycopg.Connection | None = None, directory: Path = MIGRATIONS_DIR) -> list[dict]:
+    if conn is None:
+        with psycopg.connect(DATABASE_URL, autocommit=True) as own:
+            return status(own, directory)
+
+    _ensure_table(conn)
+    applied = dict(conn.execute("SELECT version, applied_at FROM schema_migrations").fetchall())
+    return [
+        {
+            "version": m["version"],
+            "name": m["name"],
+            "applied_at": applied[m["version"]].isoformat() if m["version"] in applied else None,
+        }
+        for m in discover(directory)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    parser.add_argument("--status", action="store_true", help="list migrations instead of applying them")
+    args = parser.parse_args()
+
+    if args.status:
+        for m in status():
+            print(f"{m['version']:04d}_{m['name']}: {m['applied_at'] or 'pending'}")
+    else:
+        applied = migrate(target=args.target)
+        print(f"Applied {len(applied)} migration(s)" + (f": {applied}" if applied else ""))
@@ -0,0 +1,289 @@
+"""
+Partition maintenance for raw_payloads, events and outbox (monthly range
+partitions on the time each row was written; see db/migrations/0003).
+
+Each run:
+- creates partitions PARTITION_PREMAKE_MONTHS ahead, so rows never fall
+  into the default partition;
+- exports due days to the columnar archive, when it is enabled;
+- retires months older than PARTITION_RETENTION_MONTHS once every outbox
+  row in them is delivered or dead-lettered. With the archive enabled, every
+  event in the month must also be below the archive watermark. The month's
+  outbox, events and raw_payloads partitions are detached together, then
+  dropped or moved to the `archive` schema (PARTITION_RETENTION_MODE);
+- in drop mode, deletes raw payload blobs from before the retention window
+  that no raw_payloads row references any more;
+- exports partition counts and sizes as metrics.
+
+Runs on one dedicated autocommit connection. A session advisory lock keeps
+concurrent runs (several API processes) from overlapping.
+
+    python -m app.core.partitions
+"""
+import os
+import re
+import threading
+from datetime import datetime, timezone
+
+import psycopg
+from psycopg.errors import LockNotAvailable
+
+from app.core import archive, payload_blobs
+from app.core.db import DATABASE_URL
+from app.core.logger import get_logger
+from app.core.metrics import db_partition_bytes, db_partitions, db_partitions_retired
+
+logger = get_logger(__name__)
+
+# Outbox first: whether a month may retire is decided by its outbox partition.
+PARTITIONED_TABLES = ("outbox", "events", "raw_payloads")
+PARTITION_PREMAKE_MONTHS = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "3"))
+# "drop" deletes retired partitions; "archive" keeps them as plain tables in ARCHIVE_SCHEMA.
+PARTITION_RETENTION_MODE = os.getenv("PARTITION_RETENTION_MODE", "drop")
+PARTITION_MAINTENANCE_SECONDS = float(os.getenv("PARTITION_MAINTENANCE_SECONDS", "3600"))
+# DETACH briefly needs an exclusive lock on the parent; give up rather than queue traffic behind it.
+PARTITION_LOCK_TIMEOUT = "2s"
+ARCHIVE_SCHEMA = "archive"
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+_LOCK_SQL = "SELECT pg_try_advisory_lock(hashtext('partition_maintenance'))"
+_UNLOCK_SQL = "SELECT pg_advisory_unlock(hashtext('partition_maintenance'))"
+
+
+def month_start(ts: datetime) -> datetime:
+    ts = ts.astimezone(timezone.utc)
+    return datetime(ts.year, ts.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(ts: datetime, months: int) -> datetime:
+    index = ts.year * 12 + ts.month - 1 + months
+    return ts.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y_%m}"
+
+
+def list_partitions(conn: psycopg.Connection, table: str) -> list[dict]:
+    """
+    Partitions of `table` with their upper bound (None for the default
+    partition) and on-disk size, oldest first.
+    """
+    rows = conn.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), pg_total_relation_size(c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, (table,)).fetchall()
+
+    partitions = []
+    for name, bound, size in rows:
+        match = _UPPER_BOUND.search(bound)
+        partitions.append({
+            "name": name,
+            "upper": datetime.fromisoformat(match.group(1)) if match else None,
+            "bytes": size,
+        })
+    far_future = datetime.max.replace(tzinfo=timezone.utc)
+    return sorted(partitions, key=lambda p: p["upper"] or far_future)
+
+
+def ensure_partitions(conn: psycopg.Connection, months_ahead: int = PARTITION_PREMAKE_MONTHS, now: datetime | None = None) -> list[str]:
+    """Create this month's partitions and `months_ahead` more; returns the ones created."""
+    current = month_start(now or datetime.now(timezone.utc))
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = {p["upper"] for p in list_partitions(conn, table)}
+        for i in range(months_ahead + 1):
+            start, end = add_months(current, i), add_months(current, i + 1)
+            if end in existing:
+                continue
+            name = partition_name(table, start)
+            try:
+                conn.execute(
+                    f"CREATE TABLE {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            except psycopg.Error as e:
+                # e.g. overlaps the legacy partition, or rows for this month already sit in the default
+                logger.error(f"Could not create partition {name}", extra={"error": str(e)})
+                continue
+            created.append(name)
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return created
+
+
+def _retire(conn: psycopg.Connection, month: dict[str, str], mode: str, require_archive: bool) -> bool:
+    """
+    Detach one month's partitions (table -> partition name) in a single
+    transaction, provided nothing in its outbox partition is still pending
+    (and, with require_archive, every event in it has been archived).
+    """
+    outbox_partition = month["outbox"]
+    with conn.transaction():
+        conn.execute(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'")
+        # blocks relay and replay writes to this partition while we decide
+        conn.execute(f"LOCK TABLE {outbox_partition} IN SHARE ROW EXCLUSIVE MODE")
+        pending = conn.execute(f"""
+            SELECT EXISTS (
+                SELECT 1 FROM {outbox_partition}
+                WHERE delivered_at IS NULL AND dead_lettered_at IS NULL
+            )
+        """).fetchone()[0]
+        if pending:
+            logger.info(f"Keeping {outbox_partition}: it still has undelivered rows")
+            return False
+        if require_archive and "events" in month:
+            unarchived = conn.execute(f"""
+                SELECT EXISTS (
+                    SELECT 1 FROM {month["events"]}
+                    WHERE occurred_at >= COALESCE(
+                        (SELECT MIN(archived_until) FROM event_archive_watermarks), '-infinity'
+                    )
+                )
+            """).fetchone()[0]
+            if unarchived:
+                logger.info(f"Keeping {month['events']}: not archived yet")
+                return False
+
+        if mode == "archive":
+            conn.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+        for table, partition in month.items():
+            conn.execute(f"ALTER TABLE {table} DETACH PARTITION {partition}")
+            if mode == "archive":
+                conn.execute(f"ALTER TABLE {partition} SET SCHEMA {ARCHIVE_SCHEMA}")
+            else:
+                conn.execute(f"DROP TABLE {partition}")
+    for table in month:
+        db_partitions_retired.labels(table=table, mode=mode).inc()
+    return True
+
+
+def retire_partitions(
+    conn: psycopg.Connection,
+    retention_months: int = PARTITION_RETENTION_MONTHS,
+    mode: str = PARTITION_RETENTION_MODE,
+    now: datetime | None = None,
+    require_archive: bool = archive.ARCHIVE_ENABLED,
+) -> list[str]:
+    """
+    Retire every month that ended more than `retention_months` ago and has
+    nothing left to deliver. A month that is still busy, or whose lock
+    isn't available right now, is retried on the next run.
+    """
+    if mode not in ("drop", "archive"):
+        raise ValueError(f"Unknown retention mode: {mode}")
+
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -retention_months)
+    by_upper = {
+        table: {p["upper"]: p["name"] for p in list_partitions(conn, table) if p["upper"] is not None}
+        for table in PARTITIONED_TABLES
+    }
+
+    retired = []
+    for upper, outbox_partition in sorted(by_upper["outbox"].items()):
+        if upper > cutoff:
+            break
+        month = {table: by_upper[table][upper] for table in PARTITIONED_TABLES if upper in by_upper[table]}
+        try:
+            if _retire(conn, month, mode, require_archive):
+                retired.extend(month.values())
+        except LockNotAvailable:
+            logger.info(f"Skipping {outbox_partition} this run: lock not available")
+    if retired:
+        logger.info(f"Retired partitions ({mode}): {', '.join(retired)}")
+    return retired
+
+
+def collect_blobs(
+    conn: psycopg.Connection,
+    retention_months: int = PARTITION_RETENTION_MONTHS,
+    mode: str = PARTITION_RETENTION_MODE,
+    now: datetime | None = None,
+) -> int:
+    """
+    Delete payload blobs that only retired raw_payloads partitions referenced.
+    Partitions kept in the archive schema still point at their blobs, so
+    nothing is collected in archive mode.
+    """
+    if mode != "drop":
+        return 0
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -retention_months)
+    deleted = payload_blobs.collect_garbage(conn, older_than=cutoff)
+    if deleted:
+        logger.info(f"Deleted {deleted} unreferenced payload blobs")
+    return deleted
+
+
+def record_partition_metrics(conn: psycopg.Connection) -> dict[str, list[dict]]:
+    partitions = {table: list_partitions(conn, table) for table in PARTITIONED_TABLES}
+    # rebuilt from scratch so retired partitions don't linger as stale series
+    db_partition_bytes.clear()
+    for table, parts in partitions.items():
+        db_partitions.labels(table=table).set(len(parts))
+        for p in parts:
+            db_partition_bytes.labels(table=table, partition=p["name"]).set(p["bytes"])
+    return partitions
+
+
+def run_maintenance(now: datetime | None = None) -> dict:
+    with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        if not conn.execute(_LOCK_SQL).fetchone()[0]:
+            logger.info("Partition maintenance already running elsewhere")
+            return {"archived": [], "created": [], "retired": [], "blobs_deleted": 0, "skipped": True}
+        try:
+            archived = archive.export_pending(now=now) if archive.ARCHIVE_ENABLED else []
+            created = ensure_partitions(conn, now=now)
+            retired = retire_partitions(conn, now=now)
+            blobs_deleted = collect_blobs(conn, now=now)
+            partitions = record_partition_metrics(conn)
+        finally:
+            conn.execute(_UNLOCK_SQL)
+    return {
+        "archived": archived,
+        "created": created,
+        "retired": retired,
+        "blobs_deleted": blobs_deleted,
+        "partitions": {table: [p["name"] for p in parts] for table, parts in partitions.items()},
+        "skipped": False,
+    }
+
+
+class PartitionMaintainer:
+    """Runs run_maintenance() every PARTITION_MAINTENANCE_SECONDS on a daemon thread."""
+
+    def __init__(self, interval: float = PARTITION_MAINTENANCE_SECONDS, maintain=run_maintenance):
+        self.interval = interval
+        self._maintain = maintain
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._maintain()
+            except Exception as e:
+                logger.error("Partition maintenance failed", extra={"error": str(e)})
+            self._stop.wait(self.interval)
+
+
+if __name__ == "__main__":
+    print(run_maintenance())
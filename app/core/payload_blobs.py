@@ -0,0 +1,111 @@
+"""
+Content-addressed storage for raw vendor payloads.
+
+Polling more than once a minute mostly returns the bar we already saved, so
+a raw_payloads row only records the fetch (id, source, fetched_at) and the
+sha256 of the payload's JSON text. The payload itself is stored once per
+distinct hash in raw_payload_blobs (db/migrations/0006).
+
+With RAW_PAYLOAD_COMPRESSION=zlib, payloads of at least
+RAW_PAYLOAD_COMPRESS_MIN_BYTES are stored compressed in payload_zlib
+instead of as JSONB. Postgres only compresses values of about 2 kB and up
+by itself.
+
+Blobs outlive the monthly raw_payloads partitions that reference them;
+collect_garbage() removes the ones nothing references any more. Writers
+link to blobs under a shared advisory lock and collection takes it
+exclusively, so a blob can't disappear between a writer finding it and
+committing its reference.
+"""
+import hashlib
+import os
+import zlib
+from typing import NamedTuple
+
+import psycopg
+
+from app.core.codec import loads
+from app.core.metrics import raw_payload_blobs_deleted, raw_payload_blobs_written, raw_payloads_deduplicated
+
+RAW_PAYLOAD_COMPRESSION = os.getenv("RAW_PAYLOAD_COMPRESSION", "none")
+RAW_PAYLOAD_COMPRESS_MIN_BYTES = int(os.getenv("RAW_PAYLOAD_COMPRESS_MIN_BYTES", "2048"))
+BLOB_GC_BATCH_SIZE = 5000
+
+_GC_LOCK = "hashtext('raw_payload_blobs')"
+
+# One statement: the shared lock is taken before any blob row is checked or inserted.
+INSERT_BLOBS_SQL = f"""
+    WITH gc_guard AS (SELECT pg_advisory_xact_lock_shared({_GC_LOCK}))
+    INSERT INTO raw_payload_blobs (content_hash, payload_json, payload_zlib, size_bytes)
+    SELECT b.content_hash, b.payload_json::jsonb, b.payload_zlib, b.size_bytes
+    FROM gc_guard,
+         unnest(%s::bytea[], %s::text[], %s::bytea[], %s::int[])
+             AS b(content_hash, payload_json, payload_zlib, size_bytes)
+    ON CONFLICT (content_hash) DO NOTHING
+"""
+
+GC_SQL = """
+    DELETE FROM raw_payload_blobs
+    WHERE content_hash IN (
+        SELECT b.content_hash
+        FROM raw_payload_blobs b
+        WHERE b.first_seen_at < %s
+          AND NOT EXISTS (SELECT 1 FROM raw_payloads r WHERE r.content_hash = b.content_hash)
+        LIMIT %s
+    )
+"""
+
+
+class Blob(NamedTuple):
+    content_hash: bytes
+    payload_json: str | None
+    payload_zlib: bytes | None
+    size_bytes: int
+
+
+def encode(text: str, compression: str = RAW_PAYLOAD_COMPRESSION, min_bytes: int = RAW_PAYLOAD_COMPRESS_MIN_BYTES) -> Blob:
+    data = text.encode()
+    content_hash = hashlib.sha256(data).digest()
+    if compression == "zlib" and len(data) >= min_bytes:
+        return Blob(content_hash, None, zlib.compress(data), len(data))
+    return Blob(content_hash, text, None, len(data))
+
+
+def decode(payload_json, payload_zlib):
+    """The payload as stored by encode(); payload_json comes back already parsed from JSONB."""
+    if payload_zlib is not None:
+        return loads(zlib.decompress(payload_zlib))
+    return payload_json
+
+
+def write_blobs(cur: psycopg.Cursor, blobs: list[Blob]) -> int:
+    """
+    Store the distinct payloads among `blobs` (one per fetch) that aren't
+    stored yet, inside the caller's transaction. Returns how many were new.
+    """
+    if not blobs:
+        return 0
+    distinct = list({blob.content_hash: blob for blob in blobs}.values())
+    cur.execute(INSERT_BLOBS_SQL, [list(column) for column in zip(*distinct)])
+    written = cur.rowcount
+    raw_payload_blobs_written.inc(written)
+    raw_payloads_deduplicated.inc(len(blobs) - written)
+    return written
+
+
+def collect_garbage(conn: psycopg.Connection, older_than, batch_size: int = BLOB_GC_BATCH_SIZE) -> int:
+    """
+    Delete blobs first seen before `older_than` that no raw_payloads row
+    references, `batch_size` per transaction so writers are held up only
+    briefly. Expects an autocommit connection. Returns how many were deleted.
+    """
+    deleted = 0
+    while True:
+        with conn.transaction():
+            conn.execute(f"SELECT pg_advisory_xact_lock({_GC_LOCK})")
+            count = conn.execute(GC_SQL, (older_than, batch_size)).rowcount
+        deleted += count
+        if count < batch_size:
+            break
+    raw_payload_blobs_deleted.inc(deleted)
+    return deleted
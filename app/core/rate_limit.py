@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`.
+    A rate <= 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until `tokens` are available. Returns the seconds spent waiting
+        (0.0 means the call was not throttled).
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+_limiters: dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(source: str) -> TokenBucket:
+    """
+    One shared bucket per source, configured from <SOURCE>_RATE_PER_SECOND
+    and <SOURCE>_BURST (e.g. YFINANCE_RATE_PER_SECOND=2, YFINANCE_BURST=5).
+    """
+    with _limiters_lock:
+        if source not in _limiters:
+            prefix = source.upper()
+            _limiters[source] = TokenBucket(
+                rate=float(os.getenv(f"{prefix}_RATE_PER_SECOND", "2")),
+                capacity=float(os.getenv(f"{prefix}_BURST", "5")),
+            )
+        return _limiters[source]
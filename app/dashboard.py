@@ -0,0 +1,284 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+
+from app.core.logger import get_logger
+from app.core.metrics import dashboard_viewers
+from app.relay import async_repository as repo
+
+logger = get_logger(__name__)
+
+DASHBOARD_DEAD_LETTERS = 50
+# One poll per interval no matter how many viewers are connected.
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "2"))
+DASHBOARD_HEARTBEAT_SECONDS = 15.0
+DASHBOARD_QUEUE_SIZE = 32
+
+_COUNTERS = ("delivered_events", "pending_events", "dead_lettered_events")
+
+
+class DashboardFeed:
+    """
+    Single snapshot producer shared by every connected dashboard.
+
+    While anyone is watching, one task polls the O(1) health counters every
+    DASHBOARD_REFRESH_SECONDS. Dead letters are only queried when the
+    dead-letter count goes up, and then only the rows newer than the last
+    one seen. Changes go to each viewer's queue as an "update" event.
+    A viewer gets a full "snapshot" event when it connects, and again
+    whenever its queue overflows.
+    """
+
+    def __init__(
+        self,
+        fetch_health=None,
+        fetch_dead_letters=None,
+        relay_running=lambda: False,
+        interval: float = DASHBOARD_REFRESH_SECONDS,
+        clock=time.monotonic,
+    ):
+        self._fetch_health = fetch_health or repo.get_system_health
+        self._fetch_dead_letters = fetch_dead_letters or (
+            lambda since: repo.get_dead_letters(limit=DASHBOARD_DEAD_LETTERS, since=since)
+        )
+        self._relay_running = relay_running
+        self.interval = interval
+        self._clock = clock
+        self.state: dict | None = None
+        self._refreshed_at: float | None = None
+        self._subscribers: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def viewers(self) -> int:
+        return len(self._subscribers)
+
+    async def refresh(self) -> dict | None:
+        """
+        Poll once and fold the result into self.state. Returns the update to
+        broadcast, or None if nothing visible changed.
+        """
+        stats = await self._fetch_health()
+        now = self._clock()
+        relay = "running" if self._relay_running() else "stopped"
+        prev = self.state
+
+        if prev is None:
+            dead_letters = await self._fetch_dead_letters(None)
+            self.state = {"stats": stats, "relay": relay, "delivery_rate": 0.0, "dead_letters": dead_letters}
+            self._refreshed_at = now
+            return None
+
+        deltas = {k: stats[k] - prev["stats"][k] for k in _COUNTERS}
+        elapsed = now - self._refreshed_at
+        rate = max(deltas["delivered_events"], 0) / elapsed if elapsed > 0 else 0.0
+
+        new_dead_letters = []
+        if deltas["dead_lettered_events"] > 0:
+            known = prev["dead_letters"]
+            since = datetime.fromisoformat(known[0]["dead_lettered_at"]) if known else None
+            seen = {dl["event_id"] for dl in known}
+            new_dead_letters = [dl for dl in await self._fetch_dead_letters(since) if dl["event_id"] not in seen]
+
+        self.state = {
+            "stats": stats,
+            "relay": relay,
+            "delivery_rate": rate,
+            "dead_letters": (new_dead_letters + prev["dead_letters"])[:DASHBOARD_DEAD_LETTERS],
+        }
+        self._refreshed_at = now
+
+        if not any(deltas.values()) and not new_dead_letters and relay == prev["relay"] and rate == prev["delivery_rate"]:
+            return None
+        return {
+            "stats": stats,
+            "deltas": deltas,
+            "relay": relay,
+            "delivery_rate": rate,
+            "new_dead_letters": new_dead_letters,
+        }
+
+    async def subscribe(self) -> asyncio.Queue:
+        if self.state is None:
+            await self.refresh()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=DASHBOARD_QUEUE_SIZE)
+        queue.put_nowait(("snapshot", self.state))
+        self._subscribers.add(queue)
+        dashboard_viewers.set(len(self._subscribers))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        dashboard_viewers.set(len(self._subscribers))
+
+    def _broadcast(self, update: dict):
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(("update", update))
+            except asyncio.QueueFull:
+                # slow viewer: drop its backlog and resync it with the current state
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("snapshot", self.state))
+
+    async def _run(self):
+        while self._subscribers:
+            await asyncio.sleep(self.interval)
+            try:
+                update = await self.refresh()
+            except Exception as e:
+                logger.error("Dashboard refresh failed", extra={"error": str(e)})
+                continue
+            if update:
+                self._broadcast(update)
+        # no await between the loop check and this, so subscribe() can't miss a dying task
+        self._task = None
+
+    async def stream(self):
+        """
+        Server-sent events for one viewer: a snapshot, then updates, with
+        keepalive comments so idle proxies don't drop the connection.
+        """
+        queue = await self.subscribe()
+        try:
+            while True:
+                try:
+                    kind, data = await asyncio.wait_for(queue.get(), timeout=DASHBOARD_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            self.unsubscribe(queue)
+
+
+DASHBOARD_HTML = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>AI Control Plane</title>
+        <style>
+            body { font-family: monospace; background: #0a0a0a; color: #00d4ff; padding: 40px; }
+            h1 { color: #ff6b35; }
+            h2 { color: #00d4ff; border-bottom: 1px solid #333; padding-bottom: 8px; }
+            .grid { display: grid; grid-template-columns: repeat(5, 1fr); gap: 20px; margin: 30px 0; }
+            .card { background: #111; border: 1px solid #222; border-radius: 8px; padding: 20px; }
+            .card .value { font-size: 2em; font-weight: bold; color: #ff6b35; }
+            .card .label { font-size: 0.85em; color: #666; margin-top: 4px; }
+            .card .delta { font-size: 0.75em; color: #00ff88; min-height: 1em; }
+            .status { display: inline-block; padding: 4px 12px; border-radius: 4px; font-size: 0.85em; }
+            .running { background: #0a2a0a; color: #00ff88; border: 1px solid #00ff88; }
+            .stopped { background: #2a0a0a; color: #ff4444; border: 1px solid #ff4444; }
+            table { width: 100%; border-collapse: collapse; margin-top: 16px; }
+            th { text-align: left; padding: 10px; border-bottom: 1px solid #333; color: #666; font-size: 0.85em; }
+            td { padding: 10px; border-bottom: 1px solid #1a1a1a; font-size: 0.85em; color: #aaa; }
+            .footer { margin-top: 40px; color: #333; font-size: 0.75em; }
+        </style>
+    </head>
+    <body>
+        <h1>AI Control Plane</h1>
+        <p>Relay: <span id="relay" class="status stopped">● CONNECTING</span></p>
+
+        <div class="grid">
+            <div class="card">
+                <div class="value" id="delivered_events">–</div>
+                <div class="label">Delivered</div>
+                <div class="delta" id="delivered_events_delta"></div>
+            </div>
+            <div class="card">
+                <div class="value" id="pending_events">–</div>
+                <div class="label">Pending</div>
+                <div class="delta" id="pending_events_delta"></div>
+            </div>
+            <div class="card">
+                <div class="value" id="dead_lettered_events">–</div>
+                <div class="label">Dead Lettered</div>
+                <div class="delta" id="dead_lettered_events_delta"></div>
+            </div>
+            <div class="card">
+                <div class="value" id="delivery_rate">–</div>
+                <div class="label">Delivered / s</div>
+            </div>
+            <div class="card">
+                <div class="value" id="last_delivered_at" style="font-size: 0.9em;">N/A</div>
+                <div class="label">Last Delivered</div>
+            </div>
+        </div>
+
+        <h2>Dead Letters <span style="color:#333; font-size:0.6em;">latest 50 · full list at /dead-letters</span></h2>
+        <table>
+            <thead>
+                <tr>
+                    <th>Event ID</th>
+                    <th>Symbol</th>
+                    <th>Attempts</th>
+                    <th>Last Error</th>
+                    <th>Dead Lettered At</th>
+                </tr>
+            </thead>
+            <tbody id="dead_letters">
+                <tr><td colspan="5" style="color:#333">No dead letters</td></tr>
+            </tbody>
+        </table>
+
+        <div class="footer">Live via server-sent events · AI Control Plane</div>
+
+        <script>
+            const MAX_ROWS = 50;
+            const counters = ["delivered_events", "pending_events", "dead_lettered_events"];
+
+            function cell(text) {
+                const td = document.createElement("td");
+                td.textContent = text;
+                return td;
+            }
+
+            function row(dl) {
+                const tr = document.createElement("tr");
+                [dl.event_id.slice(0, 8) + "...", dl.entity_id, dl.delivery_attempts, dl.last_error, dl.dead_lettered_at]
+                    .forEach(v => tr.appendChild(cell(v)));
+                return tr;
+            }
+
+            function renderStats(state) {
+                counters.forEach(k => document.getElementById(k).textContent = state.stats[k]);
+                document.getElementById("last_delivered_at").textContent = state.stats.last_delivered_at || "N/A";
+                document.getElementById("delivery_rate").textContent = state.delivery_rate.toFixed(1);
+                const relay = document.getElementById("relay");
+                relay.className = "status " + state.relay;
+                relay.textContent = state.relay === "running" ? "● RUNNING" : "● STOPPED";
+            }
+
+            function renderDeadLetters(deadLetters, replace) {
+                const body = document.getElementById("dead_letters");
+                if (replace || body.querySelector("td[colspan]")) body.innerHTML = "";
+                deadLetters.slice().reverse().forEach(dl => body.insertBefore(row(dl), body.firstChild));
+                while (body.children.length > MAX_ROWS) body.removeChild(body.lastChild);
+                if (!body.children.length) {
+                    body.innerHTML = '<tr><td colspan="5" style="color:#333">No dead letters</td></tr>';
+                }
+            }
+
+            const source = new EventSource("/dashboard/stream");
+            source.addEventListener("snapshot", e => {
+                const state = JSON.parse(e.data);
+                renderStats(state);
+                renderDeadLetters(state.dead_letters, true);
+            });
+            source.addEventListener("update", e => {
+                const update = JSON.parse(e.data);
+                renderStats(update);
+                counters.forEach(k => {
+                    const d = update.deltas[k];
+                    document.getElementById(k + "_delta").textContent = d ? (d > 0 ? "+" : "") + d : "";
+                });
+                renderDeadLetters(update.new_dead_letters, false);
+            });
+        </script>
+    </body>
+    </html>
+"""
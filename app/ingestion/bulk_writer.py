@@ -0,0 +1,132 @@
+import uuid
+from datetime import datetime
+
+from app.core import payload_blobs
+from app.core.codec import dumps
+from app.core.db import get_connection
+from app.core.metrics import ingest_duplicate_events
+from app.relay.repository import OUTBOX_NOTIFY_CHANNEL
+
+# Column lists shared by the COPY path here and the INSERT path in run_ingestion.
+# The payload itself goes to raw_payload_blobs, see app.core.payload_blobs.
+RAW_PAYLOAD_COLUMNS = "raw_payloads (id, source, content_hash)"
+EVENT_COLUMNS = """events (
+    event_id, event_type, source, entity_id, entity_type,
+    occurred_at, schema_version, trace_id, payload_json, raw_payload_id
+)"""
+# No payload: the relay rebuilds the envelope from the events row (migration 0005).
+OUTBOX_COLUMNS = "outbox (event_id, topic, partition_key, occurred_at)"
+
+
+# The events primary key includes ingested_at (migration 0003), so it only
+# rejects a duplicate written in the same month; this probe covers every month.
+STORED_EVENTS_SQL = "SELECT event_id FROM events WHERE event_id = ANY(%s::uuid[])"
+
+
+# Namespace for raw payload ids derived from event ids.
+RAW_PAYLOAD_NAMESPACE = uuid.UUID("6f1d2c4e-8a3b-5c7d-9e0f-1a2b3c4d5e6f")
+
+
+def raw_payload_id(canonical_event: dict) -> str:
+    """
+    Id of the raw payload an event was built from. Derived from event_id, so
+    the raw_payloads and events row builders agree without passing ids around.
+    """
+    return str(uuid.uuid5(RAW_PAYLOAD_NAMESPACE, canonical_event["event_id"]))
+
+
+def skip_stored_events(cur, batch: list[tuple[dict, dict]]) -> list[tuple[dict, dict]]:
+    """The pairs in `batch` whose event_id isn't stored yet, in any monthly partition."""
+    if not batch:
+        return batch
+    cur.execute(STORED_EVENTS_SQL, ([event["event_id"] for _, event in batch],))
+    stored = {str(row[0]) for row in cur.fetchall()}
+    if not stored:
+        return batch
+    ingest_duplicate_events.inc(sum(1 for _, event in batch if event["event_id"] in stored))
+    return [(raw_data, event) for raw_data, event in batch if event["event_id"] not in stored]
+
+
+def raw_payload_rows(batch: list[tuple[dict, dict]]):
+    """raw_payloads rows for a batch, and the blob each one references (in the same order)."""
+    rows, blobs = [], []
+    for raw_data, canonical_event in batch:
+        blob = payload_blobs.encode(dumps(raw_data))
+        rows.append((raw_payload_id(canonical_event), canonical_event["source"], blob.content_hash))
+        blobs.append(blob)
+    return rows, blobs
+
+
+def event_rows(batch: list[tuple[dict, dict]]):
+    return [
+        (
+            canonical_event["event_id"],
+            canonical_event["event_type"],
+            canonical_event["source"],
+            canonical_event["entity_id"],
+            canonical_event["entity_type"],
+            datetime.fromisoformat(raw_data["occurred_at"]),
+            canonical_event["schema_version"],
+            canonical_event["trace_id"],
+            dumps(canonical_event["payload"]),
+            raw_payload_id(canonical_event),
+        )
+        for raw_data, canonical_event in batch
+    ]
+
+
+def outbox_rows(batch: list[tuple[dict, dict]]):
+    return [
+        (
+            canonical_event["event_id"],
+            "market.ticks",
+            canonical_event["entity_id"],
+            datetime.fromisoformat(raw_data["occurred_at"]),
+        )
+        for raw_data, canonical_event in batch
+    ]
+
+
+def copy_events(cur, batch: list[tuple[dict, dict]]) -> int:
+    """
+    COPY-based atomic triple write for a batch of (raw_data, canonical_event) pairs.
+    Events already stored (say, a re-run backfill) are skipped; returns how
+    many were written. Payloads not stored yet are first added to
+    raw_payload_blobs in one INSERT (COPY can't skip the ones that exist).
+
+    Same rows as write_events, streamed with one COPY per table instead of
+    per-row INSERTs. Runs inside the caller's transaction, so the raw payloads,
+    events and outbox rows still commit or roll back together. Sharing the
+    transaction also gives them one NOW(), so all three land in the same
+    monthly partition.
+    """
+    batch = skip_stored_events(cur, batch)
+    if not batch:
+        return 0
+    raw_rows, blobs = raw_payload_rows(batch)
+    payload_blobs.write_blobs(cur, blobs)
+    for columns, rows in (
+        (RAW_PAYLOAD_COLUMNS, raw_rows),
+        (EVENT_COLUMNS, event_rows(batch)),
+        (OUTBOX_COLUMNS, outbox_rows(batch)),
+    ):
+        with cur.copy(f"COPY {columns} FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+
+    cur.execute("SELECT pg_notify(%s, %s)", (OUTBOX_NOTIFY_CHANNEL, "market.ticks"))
+    return len(batch)
+
+
+def bulk_write_events(batch: list[tuple[dict, dict]]) -> int:
+    """
+    Write a batch in its own transaction. Intended for backfills.
+    Returns the number of events written.
+    """
+    if not batch:
+        return 0
+
+    with get_connection() as conn:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                return copy_events(cur, batch)
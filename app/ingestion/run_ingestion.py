@@ -1,21 +1,42 @@
 import uuid
-import json
+import pandas as pd
 import yfinance as yf
-import psycopg
 from datetime import datetime, timezone
-from dotenv import load_dotenv
+from app.core import payload_blobs
+from app.core.db import get_connection
+from app.ingestion.bulk_writer import (
+    EVENT_COLUMNS,
+    OUTBOX_COLUMNS,
+    RAW_PAYLOAD_COLUMNS,
+    bulk_write_events,
+    event_rows,
+    outbox_rows,
+    raw_payload_rows,
+    skip_stored_events,
+)
+from app.ingestion.sources import MarketDataSource, YFinanceSource, latest_ticks
+from app.core.rate_limit import get_rate_limiter
+from app.core.metrics import ingest_failures, ingest_latency_seconds, ingest_throttle_seconds, ingest_throttled
+from concurrent.futures import ThreadPoolExecutor
+from app.relay.repository import OUTBOX_NOTIFY_CHANNEL
 import os
+import time
 
-load_dotenv()
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "8"))
+INGEST_FETCH_TIMEOUT = float(os.getenv("INGEST_FETCH_TIMEOUT", "10"))
 
-DATABASE_URL: str = os.getenv("DATABASE_URL") or ""
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set in environment")
 
+def _throttle(source: str, symbol: str):
+    waited = get_rate_limiter(source).acquire()
+    if waited > 0:
+        ingest_throttled.labels(source=source, symbol=symbol).inc()
+        ingest_throttle_seconds.labels(source=source).inc(waited)
 
-def fetch_market_data(symbol: str):
+
+def fetch_market_data(symbol: str, timeout: float = INGEST_FETCH_TIMEOUT):
+    _throttle("yfinance", symbol)
     ticker = yf.Ticker(symbol)
-    data = ticker.history(period="1d", interval="1m")
+    data = ticker.history(period="1d", interval="1m", timeout=timeout)
     if data.empty:
         raise ValueError(f"No market data returned for {symbol}")
     latest = data.iloc[-1]
@@ -34,20 +55,16 @@ def fetch_market_data(symbol: str):
     }
 
 
-def ingest_symbol(symbol: str):
-    raw_data = fetch_market_data(symbol)
-    event_id = uuid.uuid4()
-    trace_id = uuid.uuid4()
-
-    canonical_event = {
-        "event_id": str(event_id),
+def build_canonical_event(raw_data: dict, source: str = "yfinance") -> dict:
+    return {
+        "event_id": str(uuid.uuid4()),
         "event_type": "MARKET_TICK_INGESTED",
-        "source": "yfinance",
+        "source": source,
         "entity_id": raw_data["symbol"],
         "entity_type": "equity",
         "occurred_at": raw_data["occurred_at"],
         "schema_version": 1,
-        "trace_id": str(trace_id),
+        "trace_id": str(uuid.uuid4()),
         "payload": {
             "price": raw_data["price"],
             "volume": raw_data["volume"],
@@ -55,56 +72,111 @@ def ingest_symbol(symbol: str):
         }
     }
 
-    with psycopg.connect(DATABASE_URL) as conn:
+
+def write_events(cur, batch: list[tuple[dict, dict]]) -> int:
+    """
+    Atomic triple write for a batch of (raw_data, canonical_event) pairs.
+    Runs inside the caller's transaction: one executemany per table, one NOTIFY.
+    A payload already in raw_payload_blobs is referenced, not stored again,
+    and an event already stored is skipped. Returns how many were written.
+    """
+    batch = skip_stored_events(cur, batch)
+    if not batch:
+        return 0
+    raw_rows, blobs = raw_payload_rows(batch)
+    payload_blobs.write_blobs(cur, blobs)
+    cur.executemany(f"INSERT INTO {RAW_PAYLOAD_COLUMNS} VALUES (%s, %s, %s)", raw_rows)
+    cur.executemany(f"INSERT INTO {EVENT_COLUMNS} VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", event_rows(batch))
+    cur.executemany(f"INSERT INTO {OUTBOX_COLUMNS} VALUES (%s, %s, %s, %s)", outbox_rows(batch))
+    # delivered on commit, so the relay never wakes before the rows are visible
+    cur.execute("SELECT pg_notify(%s, %s)", (OUTBOX_NOTIFY_CHANNEL, "market.ticks"))
+    return len(batch)
+
+
+def ingest_symbol(symbol: str):
+    raw_data = fetch_market_data(symbol)
+    canonical_event = build_canonical_event(raw_data)
+
+    with get_connection() as conn:
         with conn.transaction():
             with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO raw_payloads (source, payload_json)
-                    VALUES (%s, %s)
-                """, (
-                    canonical_event["source"],
-                    json.dumps(raw_data)
-                ))
-                cur.execute("""
-                    INSERT INTO events (
-                        event_id, event_type, source, entity_id, entity_type,
-                        occurred_at, schema_version, trace_id, payload_json
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    canonical_event["event_id"],
-                    canonical_event["event_type"],
-                    canonical_event["source"],
-                    canonical_event["entity_id"],
-                    canonical_event["entity_type"],
-                    datetime.fromisoformat(raw_data["occurred_at"]),
-                    canonical_event["schema_version"],
-                    canonical_event["trace_id"],
-                    json.dumps(canonical_event["payload"])
-                ))
-                cur.execute("""
-                    INSERT INTO outbox (event_id, topic, payload_json)
-                    VALUES (%s, %s, %s)
-                """, (
-                    canonical_event["event_id"],
-                    "market.ticks",
-                    json.dumps(canonical_event)
-                ))
-
-    return {"event_id": str(event_id), "trace_id": str(trace_id), "symbol": symbol}
-
-
-def run_ingestion(symbols: list[str]):
-    results = []
+                write_events(cur, [(raw_data, canonical_event)])
+
+    return {"event_id": canonical_event["event_id"], "trace_id": canonical_event["trace_id"], "symbol": symbol}
+
+
+def ticks_to_raw_payloads(ticks: pd.DataFrame) -> list[dict]:
+    """
+    Vectorized conversion of latest_ticks() output into the raw payload shape
+    fetch_market_data produces.
+    """
+    frame = ticks.assign(
+        currency="USD",
+        occurred_at=ticks["occurred_at"].dt.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+    )
+    return frame[["symbol", "price", "volume", "currency", "occurred_at"]].to_dict("records")
+
+
+def ingest_batch(symbols: list[str], source: MarketDataSource | None = None):
+    """
+    Batched ingestion: one request for all symbols, one COPY-based transaction for all events.
+    Symbols the source returned no data for are reported and skipped.
+    """
+    source = source or YFinanceSource()
+    _throttle(source.name, "batch")
+    ticks = latest_ticks(source.fetch_bars(symbols))
+
+    batch = [
+        (raw_data, build_canonical_event(raw_data, source=source.name))
+        for raw_data in ticks_to_raw_payloads(ticks)
+    ]
+
+    missing = set(symbols) - set(ticks["symbol"])
     for symbol in symbols:
-        try:
-            result = ingest_symbol(symbol)
-            print(f"✅ Ingested {symbol} — Event ID: {result['event_id']}")
-            results.append(result)
-        except Exception as e:
-            print(f"❌ Failed to ingest {symbol}: {e}")
+        if symbol in missing:
+            print(f"❌ Failed to ingest {symbol}: No market data returned for {symbol}")
+
+    bulk_write_events(batch)
+
+    results = []
+    for raw_data, canonical_event in batch:
+        print(f"✅ Ingested {raw_data['symbol']} — Event ID: {canonical_event['event_id']}")
+        results.append({
+            "event_id": canonical_event["event_id"],
+            "trace_id": canonical_event["trace_id"],
+            "symbol": raw_data["symbol"],
+        })
     return results
 
 
+def _ingest_one(symbol: str):
+    start = time.perf_counter()
+    try:
+        result = ingest_symbol(symbol)
+    except Exception as e:
+        ingest_failures.labels(source="yfinance", symbol=symbol).inc()
+        print(f"❌ Failed to ingest {symbol}: {e}")
+        return None
+
+    duration = time.perf_counter() - start
+    ingest_latency_seconds.labels(source="yfinance", symbol=symbol).observe(duration)
+    print(f"✅ Ingested {symbol} — Event ID: {result['event_id']} ({duration * 1000:.0f} ms)")
+    return result
+
+
+def run_ingestion(symbols: list[str], max_workers: int = INGEST_MAX_WORKERS):
+    """
+    Ingest symbols independently on a bounded thread pool, so one slow or failing
+    symbol doesn't hold up the rest. Vendor calls are paced by the per-source
+    rate limiter. Returns successful results in input order.
+    """
+    if max_workers <= 1 or len(symbols) <= 1:
+        results = [_ingest_one(symbol) for symbol in symbols]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as executor:
+            results = list(executor.map(_ingest_one, symbols))
+    return [result for result in results if result]
+
+
 if __name__ == "__main__":
     run_ingestion(["AAPL", "GOOGL", "TSLA"])
\ No newline at end of file
@@ -0,0 +1,91 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+
+class MarketDataSource(ABC):
+    """
+    Batch market data interface.
+
+    fetch_bars returns intraday bars for many symbols in one frame, shaped like
+    yf.download: a DatetimeIndex of bar times and (field, symbol) columns with
+    at least "Close" and "Volume". Symbols with no data may be missing or all-NaN.
+    """
+
+    name = "unknown"
+
+    @abstractmethod
+    def fetch_bars(self, symbols: list[str]) -> pd.DataFrame:
+        ...
+
+
+class YFinanceSource(MarketDataSource):
+    name = "yfinance"
+
+    def __init__(self, period: str = "1d", interval: str = "1m"):
+        self.period = period
+        self.interval = interval
+
+    def fetch_bars(self, symbols: list[str]) -> pd.DataFrame:
+        # one vectorized request for the whole universe instead of one Ticker per symbol
+        return yf.download(
+            symbols,
+            period=self.period,
+            interval=self.interval,
+            group_by="column",
+            auto_adjust=False,
+            multi_level_index=True,
+            progress=False,
+            threads=True,
+        )
+
+
+class StaticSource(MarketDataSource):
+    """
+    Serves a fixed bars frame. Stand-in for tests and local runs without network access.
+    """
+
+    def __init__(self, bars: pd.DataFrame, name: str = "yfinance"):
+        self.bars = bars
+        self.name = name
+
+    def fetch_bars(self, symbols: list[str]) -> pd.DataFrame:
+        available = [s for s in symbols if s in self.bars.columns.get_level_values(1)]
+        return self.bars.loc[:, (slice(None), available)]
+
+
+def latest_ticks(bars: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduce a bars frame to the last bar with a close price for every symbol.
+    Returns columns symbol, price, volume, occurred_at (UTC); symbols with no data are dropped.
+    """
+    if bars.empty:
+        # typed like a non-empty result, so callers' .dt accessors still work
+        return pd.DataFrame({
+            "symbol": pd.Series(dtype="object"),
+            "price": pd.Series(dtype="float64"),
+            "volume": pd.Series(dtype="int64"),
+            "occurred_at": pd.Series(dtype="datetime64[ns, UTC]"),
+        })
+
+    close = bars["Close"]
+    volume = bars["Volume"].reindex(columns=close.columns)
+
+    valid = close.notna().to_numpy()
+    has_data = valid.any(axis=0)
+    # index of the last valid row per column: first hit when scanning the reversed rows
+    last_row = len(close) - 1 - valid[::-1].argmax(axis=0)
+    cols = np.arange(close.shape[1])
+
+    index = close.index
+    occurred_at = index.tz_convert("UTC") if index.tz is not None else index.tz_localize("UTC")
+
+    ticks = pd.DataFrame({
+        "symbol": close.columns.astype(str),
+        "price": close.to_numpy(dtype="float64")[last_row, cols],
+        "volume": np.nan_to_num(volume.to_numpy(dtype="float64")[last_row, cols]).astype("int64"),
+        "occurred_at": occurred_at[last_row],
+    })
+    return ticks[has_data].reset_index(drop=True)
@@ -1,23 +1,52 @@
-from fastapi import FastAPI
-from fastapi.responses import Response, HTMLResponse
+import json
+import os
+from datetime import datetime
+from uuid import UUID
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse, Response, HTMLResponse, StreamingResponse
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-from apscheduler.schedulers.background import BackgroundScheduler
 from app.relay.run_relay import run_relay
-from app.relay.repository import get_dead_letters, get_dead_letter_by_id, get_event_trace, replay_dead_letter, get_system_health
-from app.ingestion.run_ingestion import run_ingestion
+from app.relay.listener import RelayListener
+from app.relay.drain import drain_outbox
+from app.relay.event_replay import EVENT_REPLAY_RATE_PER_SECOND, replay_running, run_replay, start_replay
+from app.relay.repository import (
+    DEAD_LETTER_PAGE_SIZE, decode_dead_letter_cursor, replay_dead_letter,
+    EVENT_TRACE_MAX_IDS, REPLAY_RATE_PER_SECOND, replay_dead_letters,
+)
+from app.relay import async_repository as repo
+from app.ingestion.run_ingestion import ingest_batch, run_ingestion
+from app.core.db import close_async_pool, close_pool
+from app.core.jobs import JobRunner
+from app.core.partitions import PartitionMaintainer
+from app.dashboard import DASHBOARD_HTML, DashboardFeed
 
 app = FastAPI()
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(run_relay, "interval", seconds=30)
-scheduler.start()
+# Set RELAY_IN_PROCESS=false when the relay runs as `python -m app.relay.workers`
+RELAY_IN_PROCESS = os.getenv("RELAY_IN_PROCESS", "true").lower() in ("1", "true", "yes")
+
+relay_listener = RelayListener()
+if RELAY_IN_PROCESS:
+    relay_listener.start()
+
+# Set PARTITION_MAINTENANCE_IN_PROCESS=false when `python -m app.core.partitions` runs from cron instead
+PARTITION_MAINTENANCE_IN_PROCESS = os.getenv("PARTITION_MAINTENANCE_IN_PROCESS", "true").lower() in ("1", "true", "yes")
+
+partition_maintainer = PartitionMaintainer()
+if PARTITION_MAINTENANCE_IN_PROCESS:
+    partition_maintainer.start()
+
+# Relay drains, vendor fetches and replays run here, never on a request thread.
+jobs = JobRunner()
+
+dashboard_feed = DashboardFeed(relay_running=lambda: relay_listener.running)
 
 @app.get("/health")
-def health():
-    stats = get_system_health()
+async def health():
+    stats = await repo.get_system_health()
     return {
         "status": "ok",
-        "scheduler": "running" if scheduler.running else "stopped",
+        "scheduler": "running" if relay_listener.running else "stopped",
         "pending_events": stats["pending_events"],
         "dead_lettered_events": stats["dead_lettered_events"],
         "delivered_events": stats["delivered_events"],
@@ -25,31 +54,147 @@ def health():
     }
 
 @app.get("/metrics")
-def metrics():
+async def metrics():
     return Response(
         generate_latest(),
         media_type=CONTENT_TYPE_LATEST
     )
 
+def _accepted(job: dict) -> JSONResponse:
+    return JSONResponse(job, status_code=202, headers={"Location": f"/jobs/{job['job_id']}"})
+
 @app.post("/run-relay")
-def trigger_relay():
-    run_relay()
-    return {"status": "relay executed"}
+def trigger_relay(drain: bool = False):
+    """
+    Queue a relay pass (or a full drain) as a background job; poll /jobs/{job_id}.
+    Coalesces with a relay job that is already queued or running.
+    """
+    if drain:
+        return _accepted(jobs.submit("relay_drain", drain_outbox, coalesce=True))
+    return _accepted(jobs.submit("relay", run_relay, coalesce=True))
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    result = jobs.get(job_id)
+    if not result:
+        return {"error": "Job not found"}
+    return result
 
 @app.get("/dead-letters")
-def dead_letters():
-    return get_dead_letters()
+async def dead_letters(
+    limit: int = DEAD_LETTER_PAGE_SIZE,
+    cursor: str | None = None,
+    topic: str | None = None,
+    entity_id: str | None = None,
+    error: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    format: str = "json",
+):
+    """
+    Newest-first dead letters. JSON returns one page and puts the cursor for
+    the next one in X-Next-Cursor; format=ndjson streams every match.
+    """
+    if cursor:
+        try:
+            decode_dead_letter_cursor(cursor)
+        except ValueError:
+            return JSONResponse({"error": "Invalid cursor"}, status_code=400)
+
+    filters = {"topic": topic, "entity_id": entity_id, "error": error, "since": since, "until": until}
+    if format == "ndjson":
+        lines = (json.dumps(item) + "\n" async for item in repo.iter_dead_letters(cursor, **filters))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    items, next_cursor = await repo.get_dead_letters_page(limit, cursor, **filters)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return JSONResponse(items, headers=headers)
+
+@app.post("/dead-letters/replay")
+def replay_dead_letters_endpoint(
+    topic: str | None = None,
+    entity_id: str | None = None,
+    error: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    rate_per_second: float = REPLAY_RATE_PER_SECOND,
+):
+    """
+    Requeue every dead letter matching the filters as one paced replay job.
+    """
+    return replay_dead_letters(
+        rate_per_second=rate_per_second,
+        topic=topic, entity_id=entity_id, error=error, since=since, until=until,
+    )
+
+@app.get("/replay-jobs/{job_id}")
+async def replay_job(job_id: str):
+    result = await repo.get_replay_job(job_id)
+    if not result:
+        return {"error": "Replay job not found"}
+    return result
 
 @app.get("/dead-letters/{event_id}")
-def dead_letter_by_id(event_id: str):
-    result = get_dead_letter_by_id(event_id)
+async def dead_letter_by_id(event_id: str):
+    result = await repo.get_dead_letter_by_id(event_id)
     if not result:
         return {"error": "Not found"}
     return result
 
+@app.post("/events/replay")
+def replay_events_endpoint(
+    name: str,
+    start: datetime,
+    end: datetime,
+    topic: str = "market.ticks",
+    entity_ids: list[str] | None = Query(None),
+    rate_per_second: float = EVENT_REPLAY_RATE_PER_SECOND,
+):
+    """
+    Start (or resume, if `name` exists) a time-range replay from the event store.
+    Runs as a background job; poll GET /events/replay/{name} for progress.
+    A name that is still running is rejected with 409.
+    """
+    if replay_running(name):
+        return JSONResponse({"error": f"Replay {name} is already running"}, status_code=409)
+    replay = start_replay(name, start, end, topic, entity_ids, rate_per_second)
+    if replay["status"] != "completed":
+        replay["job_id"] = jobs.submit("event_replay", run_replay, name)["job_id"]
+    return replay
+
+@app.get("/events/replay/{name}")
+async def replay_events_status(name: str):
+    result = await repo.get_replay(name)
+    if not result:
+        return {"error": "Replay not found"}
+    return result
+
+@app.get("/events/trace")
+async def event_traces(ids: list[str] = Query(...)):
+    """
+    Trace many events in one query. Accepts repeated and/or comma-separated
+    ids; results follow request order and unknown ids are listed in "missing".
+    """
+    event_ids = list(dict.fromkeys(i.strip() for chunk in ids for i in chunk.split(",") if i.strip()))
+    if len(event_ids) > EVENT_TRACE_MAX_IDS:
+        return JSONResponse({"error": f"At most {EVENT_TRACE_MAX_IDS} ids per request"}, status_code=400)
+    try:
+        event_ids = [str(UUID(i)) for i in event_ids]
+    except ValueError:
+        return JSONResponse({"error": "ids must be UUIDs"}, status_code=400)
+
+    traces = await repo.get_event_traces(event_ids)
+    return {
+        "traces": [traces[i] for i in event_ids if i in traces],
+        "missing": [i for i in event_ids if i not in traces],
+    }
+
 @app.get("/events/{event_id}/trace")
-def event_trace(event_id: str):
-    result = get_event_trace(event_id)
+async def event_trace(event_id: str):
+    try:
+        result = await repo.get_event_trace(event_id)
+    except ValueError:
+        return JSONResponse({"error": "event_id must be a UUID"}, status_code=400)
     if not result:
         return {"error": "Event not found"}
     return result
@@ -62,97 +207,33 @@ def replay_dead_letter_endpoint(event_id: str):
     return result
 
 @app.get("/dashboard", response_class=HTMLResponse)
-def dashboard():
-    stats = get_system_health()
-    dead_letters = get_dead_letters()
-
-    dead_letter_rows = ""
-    for dl in dead_letters:
-        dead_letter_rows += f"""
-        <tr>
-            <td>{dl['event_id'][:8]}...</td>
-            <td>{dl['entity_id']}</td>
-            <td>{dl['delivery_attempts']}</td>
-            <td>{dl['last_error']}</td>
-            <td>{dl['dead_lettered_at']}</td>
-        </tr>
-        """
-
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>AI Control Plane</title>
-        <meta http-equiv="refresh" content="30">
-        <style>
-            body {{ font-family: monospace; background: #0a0a0a; color: #00d4ff; padding: 40px; }}
-            h1 {{ color: #ff6b35; }}
-            h2 {{ color: #00d4ff; border-bottom: 1px solid #333; padding-bottom: 8px; }}
-            .grid {{ display: grid; grid-template-columns: repeat(4, 1fr); gap: 20px; margin: 30px 0; }}
-            .card {{ background: #111; border: 1px solid #222; border-radius: 8px; padding: 20px; }}
-            .card .value {{ font-size: 2em; font-weight: bold; color: #ff6b35; }}
-            .card .label {{ font-size: 0.85em; color: #666; margin-top: 4px; }}
-            .status {{ display: inline-block; padding: 4px 12px; border-radius: 4px; font-size: 0.85em; }}
-            .running {{ background: #0a2a0a; color: #00ff88; border: 1px solid #00ff88; }}
-            .stopped {{ background: #2a0a0a; color: #ff4444; border: 1px solid #ff4444; }}
-            table {{ width: 100%; border-collapse: collapse; margin-top: 16px; }}
-            th {{ text-align: left; padding: 10px; border-bottom: 1px solid #333; color: #666; font-size: 0.85em; }}
-            td {{ padding: 10px; border-bottom: 1px solid #1a1a1a; font-size: 0.85em; color: #aaa; }}
-            .footer {{ margin-top: 40px; color: #333; font-size: 0.75em; }}
-        </style>
-    </head>
-    <body>
-        <h1>AI Control Plane</h1>
-        <p>Scheduler: <span class="status {'running' if scheduler.running else 'stopped'}">
-            {'● RUNNING' if scheduler.running else '● STOPPED'}
-        </span></p>
-
-        <div class="grid">
-            <div class="card">
-                <div class="value">{stats['delivered_events']}</div>
-                <div class="label">Delivered</div>
-            </div>
-            <div class="card">
-                <div class="value">{stats['pending_events']}</div>
-                <div class="label">Pending</div>
-            </div>
-            <div class="card">
-                <div class="value">{stats['dead_lettered_events']}</div>
-                <div class="label">Dead Lettered</div>
-            </div>
-            <div class="card">
-                <div class="value" style="font-size: 0.9em;">{stats['last_delivered_at'] or 'N/A'}</div>
-                <div class="label">Last Delivered</div>
-            </div>
-        </div>
-
-        <h2>Dead Letters</h2>
-        <table>
-            <thead>
-                <tr>
-                    <th>Event ID</th>
-                    <th>Symbol</th>
-                    <th>Attempts</th>
-                    <th>Last Error</th>
-                    <th>Dead Lettered At</th>
-                </tr>
-            </thead>
-            <tbody>
-                {dead_letter_rows if dead_letter_rows else '<tr><td colspan="5" style="color:#333">No dead letters</td></tr>'}
-            </tbody>
-        </table>
-
-        <div class="footer">Auto-refreshes every 30 seconds · AI Control Plane</div>
-    </body>
-    </html>
-    """
+async def dashboard():
+    # static shell; all data arrives over /dashboard/stream
+    return DASHBOARD_HTML
+
+@app.get("/dashboard/stream")
+async def dashboard_stream():
+    return StreamingResponse(
+        dashboard_feed.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@app.post("/ingest")
-def ingest(symbols: list[str]):
-    results = run_ingestion(symbols)
+def _ingest(symbols: list[str], batch: bool) -> dict:
+    results = ingest_batch(symbols) if batch else run_ingestion(symbols)
     return {"ingested": results}
 
+@app.post("/ingest")
+def ingest(symbols: list[str], batch: bool = False):
+    """
+    Queue ingestion as a background job so vendor latency never holds a request; poll /jobs/{job_id}.
+    """
+    return _accepted(jobs.submit("ingest", _ingest, symbols, batch))
+
 @app.on_event("shutdown")
-def shutdown_event():
-    global scheduler
-    scheduler.shutdown()
\ No newline at end of file
+async def shutdown_event():
+    relay_listener.stop()
+    partition_maintainer.stop()
+    jobs.shutdown()
+    close_pool()
+    await close_async_pool()
\ No newline at end of file
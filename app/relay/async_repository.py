@@ -0,0 +1,97 @@
+"""
+Async read paths for the API, on the async connection pool.
+
+Same SQL and row mappers as app.relay.repository, so the sync and async
+variants can't drift; only the I/O differs.
+"""
+from uuid import UUID, uuid4
+
+from app.core.db import get_async_connection
+from app.relay.event_replay import _REPLAY_COLUMNS, _replay_from_row
+from app.relay.repository import (
+    DEAD_LETTER_BY_ID_SQL,
+    DEAD_LETTER_ITERSIZE,
+    DEAD_LETTER_MAX_PAGE_SIZE,
+    DEAD_LETTER_PAGE_SIZE,
+    EVENT_TRACE_SQL,
+    REPLAY_JOB_SQL,
+    SYSTEM_HEALTH_SQL,
+    _dead_letter_detail_from_row,
+    _dead_letter_from_row,
+    _dead_letter_page,
+    _dead_letter_page_query,
+    _dead_letter_query,
+    _health_from_row,
+    _replay_job_from_row,
+    _trace_from_row,
+)
+
+
+async def get_system_health() -> dict:
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(SYSTEM_HEALTH_SQL)
+            return _health_from_row(await cur.fetchone())
+
+
+async def get_dead_letters_page(limit: int = DEAD_LETTER_PAGE_SIZE, cursor: str | None = None, **filters):
+    limit = min(max(limit, 1), DEAD_LETTER_MAX_PAGE_SIZE)
+    sql, params = _dead_letter_page_query(limit, cursor, **filters)
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            return _dead_letter_page(await cur.fetchall(), limit)
+
+
+async def get_dead_letters(limit: int = DEAD_LETTER_PAGE_SIZE, cursor: str | None = None, **filters):
+    return (await get_dead_letters_page(limit, cursor, **filters))[0]
+
+
+async def iter_dead_letters(cursor: str | None = None, **filters):
+    sql, params = _dead_letter_query(cursor, **filters)
+    async with get_async_connection() as conn:
+        async with conn.cursor(name=f"dead_letters_{uuid4().hex[:8]}") as cur:
+            cur.itersize = DEAD_LETTER_ITERSIZE
+            await cur.execute(sql, params)
+            async for r in cur:
+                yield _dead_letter_from_row(r)
+
+
+async def get_dead_letter_by_id(event_id: str):
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(DEAD_LETTER_BY_ID_SQL, (event_id,))
+            r = await cur.fetchone()
+            return _dead_letter_detail_from_row(r) if r else None
+
+
+async def get_event_traces(event_ids: list[str]) -> dict[str, dict]:
+    if not event_ids:
+        return {}
+
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(EVENT_TRACE_SQL, ([str(eid) for eid in event_ids],))
+            return {str(r[0]): _trace_from_row(r) for r in await cur.fetchall()}
+
+
+async def get_event_trace(event_id: str):
+    # traces are keyed by canonical UUID text; raises ValueError for a non-UUID
+    event_id = str(UUID(str(event_id)))
+    return (await get_event_traces([event_id])).get(event_id)
+
+
+async def get_replay_job(job_id: str):
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(REPLAY_JOB_SQL, (job_id,))
+            r = await cur.fetchone()
+            return _replay_job_from_row(r) if r else None
+
+
+async def get_replay(name: str):
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(f"SELECT {_REPLAY_COLUMNS} FROM replay_checkpoints WHERE name = %s", (name,))
+            r = await cur.fetchone()
+            return _replay_from_row(r) if r else None
@@ -0,0 +1,99 @@
+import os
+import time
+
+from app.core.logger import get_logger
+from app.core.metrics import outbox_backlog, relay_batch_size, relay_drain_rate
+from app.relay.repository import count_pending
+from app.relay.run_relay import RELAY_BATCH_SIZE, run_relay
+
+logger = get_logger(__name__)
+
+RELAY_MIN_BATCH_SIZE = int(os.getenv("RELAY_MIN_BATCH_SIZE", "10"))
+RELAY_MAX_BATCH_SIZE = int(os.getenv("RELAY_MAX_BATCH_SIZE", "1000"))
+RELAY_TARGET_PUBLISH_SECONDS = float(os.getenv("RELAY_TARGET_PUBLISH_SECONDS", "0.25"))
+RELAY_MAX_ERROR_RATE = float(os.getenv("RELAY_MAX_ERROR_RATE", "0.2"))
+
+
+class AdaptiveBatchSizer:
+    """
+    Multiplicative grow/shrink of the relay batch size.
+
+    A full batch with healthy publishes doubles the size (there's more backlog
+    to clear); slow publishes or a high error rate halve it so a struggling
+    downstream isn't hit with ever larger bursts.
+    """
+
+    def __init__(
+        self,
+        initial: int = RELAY_BATCH_SIZE,
+        min_size: int = RELAY_MIN_BATCH_SIZE,
+        max_size: int = RELAY_MAX_BATCH_SIZE,
+        target_publish_seconds: float = RELAY_TARGET_PUBLISH_SECONDS,
+        max_error_rate: float = RELAY_MAX_ERROR_RATE,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_publish_seconds = target_publish_seconds
+        self.max_error_rate = max_error_rate
+        self.size = min(max(initial, min_size), max_size)
+
+    def update(self, result: dict) -> int:
+        claimed = result["claimed"]
+        if claimed == 0:
+            return self.size
+
+        error_rate = result["failed"] / claimed
+        if error_rate > self.max_error_rate or result["mean_publish_seconds"] > self.target_publish_seconds:
+            self.size = max(self.min_size, self.size // 2)
+        elif claimed >= self.size:
+            self.size = min(self.max_size, self.size * 2)
+
+        return self.size
+
+
+def drain_outbox(
+    sizer: AdaptiveBatchSizer | None = None,
+    should_stop=lambda: False,
+    partition: tuple[int, int] | None = None,
+) -> dict:
+    """
+    Keep claiming batches until one comes back short (nothing more is due),
+    resizing between batches. Returns totals for the whole drain.
+    """
+    sizer = sizer or AdaptiveBatchSizer()
+    started = time.perf_counter()
+    totals = {"batches": 0, "claimed": 0, "delivered": 0, "failed": 0, "deferred": 0}
+
+    while not should_stop():
+        limit = sizer.size
+        relay_batch_size.set(limit)
+
+        result = run_relay(limit=limit, partition=partition)
+        totals["batches"] += 1
+        for key in ("claimed", "delivered", "failed", "deferred"):
+            totals[key] += result[key]
+
+        sizer.update(result)
+        if result["claimed"] < limit:
+            break
+
+    elapsed = time.perf_counter() - started
+    backlog = count_pending()
+    outbox_backlog.set(backlog)
+    relay_batch_size.set(sizer.size)
+
+    rate = totals["delivered"] / elapsed if totals["delivered"] and elapsed > 0 else 0.0
+    relay_drain_rate.set(rate)
+    if totals["claimed"]:
+        logger.info(
+            f"Drained {totals['delivered']} events in {totals['batches']} batches "
+            f"({rate:.1f}/s, backlog {backlog}, next batch {sizer.size})"
+        )
+
+    totals["backlog"] = backlog
+    totals["elapsed_seconds"] = elapsed
+    return totals
+
+
+if __name__ == "__main__":
+    print(drain_outbox())
@@ -0,0 +1,300 @@
+"""
+Time-range replay from the canonical event store.
+
+Re-publishes every event on a topic (optionally limited to some entities)
+with occurred_at in [start, end), oldest first, straight through the
+publisher. It doesn't go through the outbox, so delivery state is untouched.
+Progress is checkpointed by name in replay_checkpoints. Re-running the same
+name resumes after the last checkpoint. A session advisory lock on the name
+keeps a replay running in one place at a time.
+
+When the columnar archive is enabled, the part of the range below the
+archive watermark is read from the Parquet files (app.core.archive). The
+rest comes from the event store.
+
+    python -m app.relay.event_replay --name new-consumer --start 2026-01-01 --end 2026-02-01 --rate 200
+"""
+import argparse
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from uuid import uuid4
+
+import psycopg
+
+from app.core import archive
+from app.core.db import DATABASE_URL, get_connection
+from app.core.logger import get_logger
+from app.core.metrics import events_replayed
+from app.core.rate_limit import TokenBucket
+from app.relay.publisher import publish
+from app.relay.repository import EVENT_ENVELOPE_COLUMNS, canonical_event_from_row
+
+logger = get_logger(__name__)
+
+EVENT_REPLAY_RATE_PER_SECOND = float(os.getenv("EVENT_REPLAY_RATE_PER_SECOND", "200"))
+# Rows per keyset page; the checkpoint is written after each page.
+EVENT_REPLAY_PAGE_SIZE = int(os.getenv("EVENT_REPLAY_PAGE_SIZE", "1000"))
+EVENT_REPLAY_ITERSIZE = 200
+
+_LOCK_SQL = "SELECT pg_try_advisory_lock(hashtext('event_replay'), hashtext(%s))"
+_UNLOCK_SQL = "SELECT pg_advisory_unlock(hashtext('event_replay'), hashtext(%s))"
+
+
+def _replay_from_row(r) -> dict:
+    return {
+        "name": r[0],
+        "topic": r[1],
+        "entity_ids": r[2],
+        "start_at": r[3].isoformat(),
+        "end_at": r[4].isoformat(),
+        "rate_per_second": r[5],
+        "last_occurred_at": r[6].isoformat() if r[6] else None,
+        "last_event_id": str(r[7]) if r[7] else None,
+        "published": r[8],
+        "status": r[9],
+        "error": r[10],
+        "updated_at": r[11].isoformat(),
+    }
+
+
+_REPLAY_COLUMNS = """
+    name, topic, entity_ids, start_at, end_at, rate_per_second,
+    last_occurred_at, last_event_id, published, status, error, updated_at
+"""
+
+
+def get_replay(name: str):
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {_REPLAY_COLUMNS} FROM replay_checkpoints WHERE name = %s", (name,))
+            r = cur.fetchone()
+            return _replay_from_row(r) if r else None
+
+
+@contextmanager
+def _replay_lock(name: str):
+    """
+    Yields whether this process got the lock on `name`. It is held on a
+    dedicated connection for the whole run, not on a pooled one.
+    """
+    with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        if not conn.execute(_LOCK_SQL, (name,)).fetchone()[0]:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            conn.execute(_UNLOCK_SQL, (name,))
+
+
+def replay_running(name: str) -> bool:
+    """Whether a run_replay() for `name` is in progress anywhere."""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_LOCK_SQL, (name,))
+            if not cur.fetchone()[0]:
+                return True
+            cur.execute(_UNLOCK_SQL, (name,))
+            return False
+
+
+def start_replay(
+    name: str,
+    start: datetime,
+    end: datetime,
+    topic: str = "market.ticks",
+    entity_ids: list[str] | None = None,
+    rate_per_second: float = EVENT_REPLAY_RATE_PER_SECOND,
+) -> dict:
+    """
+    Register a replay. If `name` already exists its stored range and filters
+    win, so the caller resumes that replay instead of starting a new one.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                INSERT INTO replay_checkpoints (name, topic, entity_ids, start_at, end_at, rate_per_second)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (name) DO UPDATE
+                SET status = CASE WHEN replay_checkpoints.status = 'completed'
+                                  THEN 'completed' ELSE 'running' END,
+                    error = NULL,
+                    updated_at = NOW()
+                RETURNING {_REPLAY_COLUMNS}
+            """, (name, topic, entity_ids or None, start, end, rate_per_second))
+            return _replay_from_row(cur.fetchone())
+
+
+def _save_checkpoint(name: str, last_occurred_at, last_event_id, published: int, status: str, error: str | None = None):
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE replay_checkpoints
+                SET last_occurred_at = COALESCE(%s, last_occurred_at),
+                    last_event_id = COALESCE(%s, last_event_id),
+                    published = published + %s,
+                    status = %s,
+                    error = %s,
+                    updated_at = NOW()
+                WHERE name = %s
+            """, (last_occurred_at, last_event_id, published, status, error, name))
+
+
+def _page_query(replay: dict, after, start=None) -> tuple[str, list]:
+    where = [
+        "EXISTS (SELECT 1 FROM outbox o WHERE o.event_id = e.event_id AND o.topic = %s)",
+        "e.occurred_at >= %s",
+        "e.occurred_at < %s",
+    ]
+    params = [replay["topic"], start or replay["start_at"], replay["end_at"]]
+    if replay["entity_ids"]:
+        where.append("e.entity_id = ANY(%s)")
+        params.append(replay["entity_ids"])
+    if after:
+        where.append("(e.occurred_at, e.event_id) > (%s, %s::uuid)")
+        params.extend(after)
+
+    sql = f"""
+        SELECT {EVENT_ENVELOPE_COLUMNS}
+        FROM events e
+        WHERE {" AND ".join(where)}
+        ORDER BY e.occurred_at, e.event_id
+        LIMIT %s
+    """
+    return sql, params + [EVENT_REPLAY_PAGE_SIZE]
+
+
+def _archive_boundary(replay: dict) -> datetime | None:
+    """End of the part of the replay range served from the archive, if any."""
+    if not archive.ARCHIVE_ENABLED:
+        return None
+    watermark = archive.archived_until(replay["topic"])
+    start, end = archive.as_datetime(replay["start_at"]), archive.as_datetime(replay["end_at"])
+    if watermark is None or watermark <= start:
+        return None
+    return min(watermark, end)
+
+
+def _publish_rows(rows, topic: str, limiter: TokenBucket, should_stop, publisher):
+    """Publish rows in order; returns (published, last key, status, error) even when a publish fails."""
+    page_rows = 0
+    last_key = None
+    try:
+        for row in rows:
+            if should_stop():
+                return page_rows, last_key, "stopped", None
+            limiter.acquire()
+            publisher(canonical_event_from_row(row))
+            events_replayed.labels(topic=topic).inc()
+            page_rows += 1
+            last_key = (row[5], str(row[0]))
+    except Exception as e:
+        return page_rows, last_key, "failed", str(e)
+    return page_rows, last_key, None, None
+
+
+def run_replay(name: str, should_stop=lambda: False, publisher=publish) -> dict:
+    """
+    Publish a registered replay to completion (or until should_stop()).
+
+    Each keyset page on (occurred_at, event_id) streams through a server-side
+    cursor, so memory stays flat, and a checkpoint is saved after every page.
+    Each page holds a pooled connection only while it is being read. A
+    publish failure stops the replay at the last checkpoint. At most one page
+    is re-published on resume, which is at-least-once delivery.
+
+    Pages below the archive watermark come from the Parquet archive in the
+    same order, and the event store pages start where the archive ends.
+
+    Only one run per name goes ahead; if another holds the name, the replay
+    is returned as it stands with "skipped": True.
+    """
+    replay = get_replay(name)
+    if replay is None:
+        raise ValueError(f"Unknown replay: {name}")
+    if replay["status"] == "completed":
+        return replay
+
+    with _replay_lock(name) as acquired:
+        if not acquired:
+            logger.info(f"Replay {name} already running elsewhere")
+            return {**replay, "skipped": True}
+        return _run_locked(replay, should_stop, publisher)
+
+
+def _run_locked(replay: dict, should_stop, publisher) -> dict:
+    name = replay["name"]
+    limiter = TokenBucket(replay["rate_per_second"], capacity=max(replay["rate_per_second"], 1.0))
+    after = (replay["last_occurred_at"], replay["last_event_id"]) if replay["last_event_id"] else None
+    archive_until = _archive_boundary(replay)
+    archive_done = archive_until is None
+    logger.info(f"Replay {name} starting after {after[0] if after else replay['start_at']}")
+
+    while True:
+        from_archive = not archive_done and (after is None or archive.as_datetime(after[0]) < archive_until)
+        page_rows = 0
+        last_key = None
+        status = None
+        error = None
+
+        try:
+            if from_archive:
+                rows = archive.read_page(
+                    replay["topic"], replay["start_at"], archive_until,
+                    replay["entity_ids"], after, EVENT_REPLAY_PAGE_SIZE,
+                )
+                page_rows, last_key, status, error = _publish_rows(rows, replay["topic"], limiter, should_stop, publisher)
+            else:
+                sql, params = _page_query(replay, after, start=archive_until)
+                with get_connection() as conn:
+                    with conn.cursor(name=f"event_replay_{uuid4().hex[:8]}") as cur:
+                        cur.itersize = EVENT_REPLAY_ITERSIZE
+                        cur.execute(sql, params)
+                        page_rows, last_key, status, error = _publish_rows(cur, replay["topic"], limiter, should_stop, publisher)
+        except Exception as e:
+            status, error = "failed", str(e)
+        if status == "failed":
+            logger.error(f"Replay {name} failed", extra={"error": error})
+
+        if status is None and page_rows < EVENT_REPLAY_PAGE_SIZE:
+            if from_archive:
+                # archive exhausted; carry on from the event store
+                archive_done = True
+            else:
+                status = "completed"
+
+        _save_checkpoint(
+            name,
+            last_key[0] if last_key else None,
+            last_key[1] if last_key else None,
+            page_rows,
+            status or "running",
+            error,
+        )
+        if status:
+            break
+        if last_key:
+            after = last_key
+
+    replay = get_replay(name)
+    logger.info(f"Replay {name} {replay['status']}: {replay['published']} events published")
+    return replay
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-publish a time range of events from the event store")
+    parser.add_argument("--name", required=True, help="replay name; re-running a name resumes it")
+    parser.add_argument("--topic", default="market.ticks")
+    parser.add_argument("--entity", action="append", dest="entity_ids", help="repeat to replay several entities")
+    parser.add_argument("--start", type=_parse_time, required=True, help="inclusive, ISO 8601")
+    parser.add_argument("--end", type=_parse_time, required=True, help="exclusive, ISO 8601")
+    parser.add_argument("--rate", type=float, default=EVENT_REPLAY_RATE_PER_SECOND, help="events per second")
+    args = parser.parse_args()
+
+    start_replay(args.name, args.start, args.end, args.topic, args.entity_ids, args.rate)
+    print(run_replay(args.name))
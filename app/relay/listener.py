@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+
+import psycopg
+
+from app.core.db import DATABASE_URL, get_connection
+from app.core.logger import get_logger
+from app.relay.drain import AdaptiveBatchSizer, drain_outbox
+from app.relay.repository import OUTBOX_NOTIFY_CHANNEL, seconds_until_next_attempt
+from app.relay.run_relay import RELAY_PRESERVE_ORDER
+
+logger = get_logger(__name__)
+
+# Upper bound on how long the relay sleeps without a notification.
+# Only matters if a NOTIFY is lost; due retries are woken for explicitly.
+RELAY_MAX_IDLE_SECONDS = float(os.getenv("RELAY_MAX_IDLE_SECONDS", "30"))
+RELAY_MIN_WAIT_SECONDS = 0.1
+RELAY_RECONNECT_SECONDS = 5.0
+# An idle wait is sliced this finely so stop() (e.g. on SIGTERM) ends it promptly.
+RELAY_STOP_CHECK_SECONDS = 1.0
+
+
+def _next_wait_seconds(partition: tuple[int, int] | None = None) -> float:
+    due_in = seconds_until_next_attempt(partition, preserve_order=RELAY_PRESERVE_ORDER)
+    if due_in is None:
+        return RELAY_MAX_IDLE_SECONDS
+    return min(max(due_in, RELAY_MIN_WAIT_SECONDS), RELAY_MAX_IDLE_SECONDS)
+
+
+class RelayListener:
+    """
+    Drives the relay from Postgres notifications instead of a fixed interval.
+
+    Holds one dedicated autocommit connection (LISTEN is session state, so it
+    can't come from the pool), drains the outbox on every wake-up, then sleeps
+    until the next notification or the next retry's next_attempt_at.
+    """
+
+    def __init__(self, drain=None, partition: tuple[int, int] | None = None):
+        self._partition = partition
+        self._stop = threading.Event()
+        # one sizer for the listener's lifetime so the learned batch size carries across wake-ups
+        self._sizer = AdaptiveBatchSizer()
+        self._drain = drain or (
+            lambda: drain_outbox(self._sizer, should_stop=self._stop.is_set, partition=self._partition)
+        )
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="relay-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0, wake: bool = True):
+        self._stop.set()
+        if wake:
+            self.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_forever(self):
+        """
+        Block the calling thread running the listener loop until stop().
+        Used by standalone worker processes.
+        """
+        self._run()
+
+    def wake(self):
+        try:
+            with get_connection() as conn:
+                conn.execute("SELECT pg_notify(%s, %s)", (OUTBOX_NOTIFY_CHANNEL, "wake"))
+        except Exception as e:
+            logger.error("Relay wake-up failed", extra={"error": str(e)})
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {OUTBOX_NOTIFY_CHANNEL}")
+                    self._listen(conn)
+            except Exception as e:
+                logger.error("Relay listener error", extra={"error": str(e)})
+                self._stop.wait(RELAY_RECONNECT_SECONDS)
+
+    def _listen(self, conn: psycopg.Connection):
+        while not self._stop.is_set():
+            # coalesce queued notifications; anything arriving after this triggers another drain
+            for _ in conn.notifies(timeout=0):
+                pass
+            self._drain()
+            self._wait(conn, _next_wait_seconds(self._partition))
+
+    def _wait(self, conn: psycopg.Connection, seconds: float):
+        """Wait for new rows or the next scheduled retry, whichever comes first, or until stop()."""
+        deadline = time.monotonic() + seconds
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if list(conn.notifies(timeout=min(remaining, RELAY_STOP_CHECK_SECONDS), stop_after=1)):
+                return
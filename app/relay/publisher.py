@@ -1,5 +1,9 @@
 import time
 
+from app.core.codec import get_codec
+
+
 def publish(payload):
+    body = get_codec().encode(payload)
     time.sleep(0.02)  # simulate 20ms network delay
-    print("Published successfully")
\ No newline at end of file
+    print(f"Published successfully ({len(body)} bytes)")
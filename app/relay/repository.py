@@ -1,16 +1,27 @@
+import json
 import os
+import socket
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
 
-import psycopg
-from dotenv import load_dotenv
-
-load_dotenv()
-DATABASE_URL: str = os.getenv("DATABASE_URL") or ""
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set in environment")
+from app.core import payload_blobs
+from app.core.db import get_connection
+from app.core.metrics import outbox_leases_reclaimed
 
 MAX_ATTEMPTS = 5
 
+# How long a claim stays exclusive. Must comfortably exceed one batch's publish time.
+RELAY_LEASE_SECONDS = float(os.getenv("RELAY_LEASE_SECONDS", "60"))
+
+# Default pacing for bulk dead-letter replays.
+REPLAY_RATE_PER_SECOND = float(os.getenv("REPLAY_RATE_PER_SECOND", "50"))
+
+# Ingestion NOTIFYs this channel when it commits new outbox rows.
+OUTBOX_NOTIFY_CHANNEL = "outbox_new"
+# Payload is the entity_id whose latest_ticks row just changed.
+LATEST_TICKS_NOTIFY_CHANNEL = "latest_ticks"
+
 
 def _utcnow():
     return datetime.now(timezone.utc)
@@ -24,268 +35,722 @@ def _backoff_seconds(attempt: int) -> int:
     return schedule[idx]
 
 
-def claim_pending(limit: int = 10):
+def _partition_sql(alias: str = "") -> str:
+    # & 2147483647 keeps the hash non-negative (abs() would overflow on INT_MIN)
+    return f"mod(hashtext(COALESCE({alias}partition_key, {alias}topic)) & 2147483647, %s) = %s"
+
+
+def worker_id() -> str:
+    # computed per call, not at import, so forked/spawned processes get their own pid
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# events columns canonical_event_from_row() builds the published envelope from.
+EVENT_ENVELOPE_COLUMNS = (
+    "e.event_id, e.event_type, e.source, e.entity_id, e.entity_type, "
+    "e.occurred_at, e.schema_version, e.trace_id, e.payload_json"
+)
+
+
+def canonical_event_from_row(r) -> dict:
+    """The envelope ingestion publishes, from an events row in EVENT_ENVELOPE_COLUMNS order."""
+    return {
+        "event_id": str(r[0]),
+        "event_type": r[1],
+        "source": r[2],
+        "entity_id": r[3],
+        "entity_type": r[4],
+        "occurred_at": r[5].isoformat(),
+        "schema_version": r[6],
+        "trace_id": str(r[7]),
+        "payload": r[8],
+    }
+
+
+def _claimed_payload(row):
+    # outbox rows written before migration 0005 still carry their own copy
+    return row[3] if row[3] is not None else canonical_event_from_row(row[6:15])
+
+
+# Ordered claims (partitioned, or preserve_order) skip a row while an earlier
+# row for its entity is waiting on a retry.
+NOT_BLOCKED_SQL = """NOT EXISTS (
+                  SELECT 1
+                  FROM outbox earlier
+                  WHERE earlier.partition_key = o.partition_key
+                    AND earlier.delivered_at IS NULL
+                    AND earlier.dead_lettered_at IS NULL
+                    AND earlier.next_attempt_at > NOW()
+                    AND (earlier.occurred_at, earlier.created_at) < (o.occurred_at, o.created_at)
+              )"""
+
+
+def _claim_query(
+    limit: int,
+    partition: tuple[int, int] | None,
+    claimed_by: str,
+    lease_seconds: float,
+    preserve_order: bool = False,
+) -> tuple[str, tuple]:
+    if partition is None and preserve_order:
+        candidates = f"""
+            SELECT o.id, o.claimed_until
+            FROM outbox o
+            WHERE o.delivered_at IS NULL
+              AND o.dead_lettered_at IS NULL
+              AND o.next_attempt_at <= NOW()
+              AND (o.claimed_until IS NULL OR o.claimed_until < NOW())
+              AND {NOT_BLOCKED_SQL}
+            ORDER BY o.occurred_at, o.created_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """
+        order_by = "claimed.occurred_at, claimed.created_at"
+        params = (claimed_by, lease_seconds, limit)
+    elif partition is None:
+        candidates = """
+            SELECT id, claimed_until
+            FROM outbox
+            WHERE delivered_at IS NULL
+              AND dead_lettered_at IS NULL
+              AND next_attempt_at <= NOW()
+              AND (claimed_until IS NULL OR claimed_until < NOW())
+            ORDER BY created_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """
+        order_by = "claimed.created_at"
+        params = (claimed_by, lease_seconds, limit)
+    else:
+        index, count = partition
+        candidates = f"""
+            SELECT o.id, o.claimed_until
+            FROM outbox o
+            WHERE o.delivered_at IS NULL
+              AND o.dead_lettered_at IS NULL
+              AND o.next_attempt_at <= NOW()
+              AND (o.claimed_until IS NULL OR o.claimed_until < NOW())
+              AND {_partition_sql("o.")}
+              AND {NOT_BLOCKED_SQL}
+            ORDER BY o.occurred_at, o.created_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """
+        order_by = "claimed.occurred_at, claimed.created_at"
+        params = (claimed_by, lease_seconds, count, index, limit)
+
+    sql = f"""
+    WITH claimed AS (
+        UPDATE outbox
+        SET delivery_attempts = outbox.delivery_attempts + 1,
+            claimed_by = %s,
+            claimed_until = NOW() + make_interval(secs => %s)
+        FROM ({candidates}) AS c
+        WHERE outbox.id = c.id
+        RETURNING outbox.id, outbox.event_id, outbox.topic, outbox.payload_json,
+                  outbox.delivery_attempts - 1 AS prev_attempts,
+                  c.claimed_until IS NOT NULL AS reclaimed,
+                  outbox.occurred_at, outbox.created_at
+    )
+    SELECT claimed.id, claimed.event_id, claimed.topic, claimed.payload_json,
+           claimed.prev_attempts, claimed.reclaimed, {EVENT_ENVELOPE_COLUMNS}
+    FROM claimed
+    LEFT JOIN events e ON e.event_id = claimed.event_id AND claimed.payload_json IS NULL
+    ORDER BY {order_by}
+    """
+    return sql, params
+
+
+def claim_pending(
+    limit: int = 10,
+    partition: tuple[int, int] | None = None,
+    claimed_by: str | None = None,
+    lease_seconds: float = RELAY_LEASE_SECONDS,
+    preserve_order: bool = False,
+):
     """
     Claim eligible outbox rows for delivery.
     IMPORTANT: We increment delivery_attempts as part of the claim to represent "work started".
     This is critical for correctness if the worker crashes after claiming but before publishing.
+
+    Selection, locking and the attempt increment happen in a single statement.
+    Rows come back in created_at order with the attempt count as it was before this claim.
+    The payload is the event envelope, rebuilt from the events row in the same
+    statement; ingestion no longer stores a second copy of it on the outbox row.
+
+    Claimed rows are leased to `claimed_by` until NOW() + lease_seconds. The row lock
+    is gone once this returns, so the lease is what keeps another relay run from
+    publishing the same rows; a crashed worker's rows become claimable again once
+    the lease expires.
+
+    With partition=(index, count) only rows whose partition_key hashes to `index`
+    are claimed, in occurred_at order, and an entity is skipped entirely while an
+    earlier row for it is waiting on a retry — so its events can't overtake each other.
+    preserve_order=True applies the same ordering and skipping without a partition.
     """
-    with psycopg.connect(DATABASE_URL) as conn:
+    claimed_by = claimed_by or worker_id()
+    sql, params = _claim_query(limit, partition, claimed_by, lease_seconds, preserve_order)
+
+    with get_connection() as conn:
         with conn.transaction():
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT id, event_id, topic, payload_json, delivery_attempts
-                    FROM outbox
-                    WHERE delivered_at IS NULL
-                      AND dead_lettered_at IS NULL
-                      AND next_attempt_at <= NOW()
-                    ORDER BY created_at
-                    LIMIT %s
-                    FOR UPDATE SKIP LOCKED
-                    """,
-                    (limit,),
-                )
+                cur.execute(sql, params)
                 rows = cur.fetchall()
 
-                # increment attempts immediately for claimed rows
-                for (oid, _event_id, _topic, _payload, _attempts) in rows:
-                    cur.execute(
-                        """
-                        UPDATE outbox
-                        SET delivery_attempts = delivery_attempts + 1
-                        WHERE id = %s
-                        """,
-                        (oid,),
-                    )
-
-                return rows
+    reclaimed = sum(1 for row in rows if row[5])
+    if reclaimed:
+        outbox_leases_reclaimed.inc(reclaimed)
+    return [(*row[:3], _claimed_payload(row), row[4]) for row in rows]
 
 
 def mark_delivered(outbox_id: str):
-    with psycopg.connect(DATABASE_URL) as conn:
+    mark_delivered_many([outbox_id])
+
+
+# Runs first, outside the delivery_seq lock: row-locks the batch and folds the
+# newest delivered tick per entity into latest_ticks.
+UPSERT_LATEST_TICKS_SQL = """
+    WITH delivering AS (
+        SELECT event_id
+        FROM outbox
+        WHERE id = ANY(%s::uuid[])
+          AND delivered_at IS NULL
+        FOR UPDATE
+    ),
+    newest AS (
+        SELECT DISTINCT ON (e.entity_id)
+            e.entity_id, e.event_id, e.trace_id, e.occurred_at, e.payload_json
+        FROM delivering d
+        JOIN events e ON e.event_id = d.event_id
+        WHERE e.event_type = 'MARKET_TICK_INGESTED'
+          AND e.entity_id IS NOT NULL
+        ORDER BY e.entity_id, e.occurred_at DESC
+    ),
+    upserted AS (
+        INSERT INTO latest_ticks (entity_id, event_id, trace_id, occurred_at, payload_json, delivered_at)
+        SELECT entity_id, event_id, trace_id, occurred_at, payload_json, NOW()
+        FROM newest
+        ON CONFLICT (entity_id) DO UPDATE
+        SET event_id = EXCLUDED.event_id,
+            trace_id = EXCLUDED.trace_id,
+            occurred_at = EXCLUDED.occurred_at,
+            payload_json = EXCLUDED.payload_json,
+            delivered_at = EXCLUDED.delivered_at
+        WHERE latest_ticks.occurred_at <= EXCLUDED.occurred_at
+        RETURNING entity_id
+    )
+    SELECT pg_notify(%s, entity_id) FROM upserted
+"""
+
+# One lock per topic in the batch, taken in topic order so two batches can't deadlock.
+DELIVERY_SEQ_LOCK_SQL = """
+    SELECT pg_advisory_xact_lock(hashtext('outbox_delivery_seq'), hashtext(t.topic))
+    FROM (
+        SELECT DISTINCT topic
+        FROM outbox
+        WHERE id = ANY(%s::uuid[])
+          AND delivered_at IS NULL
+        ORDER BY topic
+    ) t
+"""
+
+MARK_DELIVERED_SQL = """
+    UPDATE outbox o
+    SET delivered_at = NOW(),
+        delivery_seq = n.seq,
+        last_error = NULL,
+        claimed_by = NULL,
+        claimed_until = NULL
+    FROM (
+        SELECT id, nextval('outbox_delivery_seq') AS seq
+        FROM (
+            SELECT id
+            FROM outbox
+            WHERE id = ANY(%s::uuid[])
+              AND delivered_at IS NULL
+            ORDER BY occurred_at, created_at
+        ) ordered
+    ) n
+    WHERE o.id = n.id
+"""
+
+
+def mark_delivered_many(outbox_ids: list[str]):
+    """
+    Finalize a whole batch of successful publishes in one transaction.
+    Not fenced on the lease: the publish already happened, so recording it is
+    correct even if the lease ran out in the meantime.
+
+    The newest delivered market tick per entity is folded into latest_ticks;
+    an older tick (e.g. a replayed dead letter) never replaces a newer one.
+    Each changed entity is announced on LATEST_TICKS_NOTIFY_CHANNEL at commit
+    so consumer caches can drop it.
+
+    Delivered rows also get the next outbox_delivery_seq values, in occurred_at
+    order. Consumers read (topic, delivery_seq) keysets, so a per-topic advisory
+    lock held from numbering to commit is enough to make a topic's sequence
+    numbers visible in order: a reader of "seq > offset" can never skip a row
+    that commits late. The lock is taken only after the latest_ticks upsert, so
+    it covers one UPDATE and the commit, and workers delivering other topics
+    don't wait at all.
+    """
+    if not outbox_ids:
+        return
+
+    ids = [str(oid) for oid in outbox_ids]
+    with get_connection() as conn:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                cur.execute(UPSERT_LATEST_TICKS_SQL, (ids, LATEST_TICKS_NOTIFY_CHANNEL))
+                cur.execute(DELIVERY_SEQ_LOCK_SQL, (ids,))
+                cur.execute(MARK_DELIVERED_SQL, (ids,))
+
+
+def mark_failed(outbox_id: str, attempt: int, error: str, claimed_by: str | None = None):
+    """
+    On failure:
+      - if attempt >= MAX_ATTEMPTS: dead-letter
+      - else: schedule retry using backoff
+    """
+    mark_failed_many([(outbox_id, attempt, error)], claimed_by=claimed_by)
+
+
+def mark_failed_many(failures: list[tuple[str, int, str]], claimed_by: str | None = None) -> dict[str, bool]:
+    """
+    Finalize a batch of failed publishes in one statement.
+    Each failure is (outbox_id, attempt, error); the per-row outcome follows mark_failed.
+    When `claimed_by` is given, only rows still leased to it are touched, so a
+    worker whose lease expired can't overwrite the outcome of whoever reclaimed the row.
+    Returns {outbox_id: dead_lettered} for the rows actually updated.
+    """
+    if not failures:
+        return {}
+
+    now = _utcnow()
+    ids, errors, next_times, dead = [], [], [], []
+    for outbox_id, attempt, error in failures:
+        is_dead = attempt >= MAX_ATTEMPTS
+        ids.append(str(outbox_id))
+        errors.append(error[:2000])
+        next_times.append(None if is_dead else now + timedelta(seconds=_backoff_seconds(attempt)))
+        dead.append(is_dead)
+
+    with get_connection() as conn:
         with conn.transaction():
             with conn.cursor() as cur:
                 cur.execute(
                     """
-                    UPDATE outbox
-                    SET delivered_at = NOW(),
-                        last_error = NULL
-                    WHERE id = %s
+                    UPDATE outbox o
+                    SET last_error = f.error,
+                        next_attempt_at = COALESCE(f.next_attempt_at, o.next_attempt_at),
+                        dead_lettered_at = CASE WHEN f.dead THEN NOW() ELSE o.dead_lettered_at END,
+                        claimed_by = NULL,
+                        claimed_until = NULL
+                    FROM unnest(%s::uuid[], %s::text[], %s::timestamptz[], %s::boolean[])
+                        AS f(id, error, next_attempt_at, dead)
+                    WHERE o.id = f.id
+                      AND (%s::text IS NULL OR o.claimed_by = %s)
+                    RETURNING o.id, f.dead
                     """,
-                    (outbox_id,),
+                    (ids, errors, next_times, dead, claimed_by, claimed_by),
                 )
+                return {str(outbox_id): is_dead for (outbox_id, is_dead) in cur.fetchall()}
 
 
-def mark_failed(outbox_id: str, attempt: int, error: str):
+def release_claimed_many(releases: list[tuple[str, str]], claimed_by: str | None = None):
     """
-    On failure:
-      - if attempt >= MAX_ATTEMPTS: dead-letter
-      - else: schedule retry using backoff
+    Hand claimed-but-unpublished rows back without counting the attempt.
+    Each release is (outbox_id, blocked_by_id): the row is held back until the
+    blocking row's next retry so per-entity order survives the failure.
+    Fenced on `claimed_by` like mark_failed_many.
     """
-    if attempt >= MAX_ATTEMPTS:
-        with psycopg.connect(DATABASE_URL) as conn:
-            with conn.transaction():
-                with conn.cursor() as cur:
-                    cur.execute(
-                        """
-                        UPDATE outbox
-                        SET last_error = %s,
-                            dead_lettered_at = NOW()
-                        WHERE id = %s
-                        """,
-                        (error[:2000], outbox_id),
-                    )
+    if not releases:
         return
 
-    delay = _backoff_seconds(attempt)
-    next_time = _utcnow() + timedelta(seconds=delay)
-
-    with psycopg.connect(DATABASE_URL) as conn:
+    with get_connection() as conn:
         with conn.transaction():
             with conn.cursor() as cur:
                 cur.execute(
                     """
-                    UPDATE outbox
-                    SET last_error = %s,
-                        next_attempt_at = %s
-                    WHERE id = %s
+                    UPDATE outbox o
+                    SET delivery_attempts = GREATEST(o.delivery_attempts - 1, 0),
+                        next_attempt_at = GREATEST(o.next_attempt_at, b.next_attempt_at),
+                        claimed_by = NULL,
+                        claimed_until = NULL
+                    FROM unnest(%s::uuid[], %s::uuid[]) AS r(id, blocked_by)
+                    JOIN outbox b ON b.id = r.blocked_by
+                    WHERE o.id = r.id
+                      AND (%s::text IS NULL OR o.claimed_by = %s)
                     """,
-                    (error[:2000], next_time, outbox_id),
+                    (
+                        [str(oid) for (oid, _) in releases],
+                        [str(bid) for (_, bid) in releases],
+                        claimed_by,
+                        claimed_by,
+                    ),
                 )
 
-def get_dead_letters():
-    with psycopg.connect(DATABASE_URL) as conn:
+
+def seconds_until_next_attempt(
+    partition: tuple[int, int] | None = None, preserve_order: bool = False
+) -> float | None:
+    """
+    Seconds until the earliest pending row becomes claimable
+    (<= 0 if one is already due, None if nothing is pending).
+
+    With a partition or preserve_order, rows held back behind an earlier row's
+    retry don't count: they can't be claimed before that row is due, and it is counted.
+    """
+    partition_filter, params = "", ()
+    if partition is not None:
+        index, count = partition
+        partition_filter = f"AND {_partition_sql('o.')} AND {NOT_BLOCKED_SQL}"
+        params = (count, index)
+    elif preserve_order:
+        partition_filter = f"AND {NOT_BLOCKED_SQL}"
+
+    with get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT
-                    o.event_id,
-                    o.topic,
-                    o.delivery_attempts,
-                    o.last_error,
-                    o.dead_lettered_at,
-                    e.event_type,
-                    e.entity_id,
-                    e.occurred_at
+            cur.execute(
+                f"""
+                SELECT EXTRACT(EPOCH FROM MIN(GREATEST(o.next_attempt_at, o.claimed_until)) - NOW())
                 FROM outbox o
-                JOIN events e ON o.event_id = e.event_id
-                WHERE o.dead_lettered_at IS NOT NULL
-                ORDER BY o.dead_lettered_at DESC
-            """)
-            rows = cur.fetchall()
-            return [
-                {
-                    "event_id": str(r[0]),
-                    "topic": r[1],
-                    "delivery_attempts": r[2],
-                    "last_error": r[3],
-                    "dead_lettered_at": r[4].isoformat(),
-                    "event_type": r[5],
-                    "entity_id": r[6],
-                    "occurred_at": r[7].isoformat(),
-                }
-                for r in rows
-            ]
+                WHERE o.delivered_at IS NULL
+                  AND o.dead_lettered_at IS NULL
+                  {partition_filter}
+                """,
+                params,
+            )
+            row = cur.fetchone()
+            if not row or row[0] is None:
+                return None
+            return float(row[0])
+
+def count_pending() -> int:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            # maintained by the outbox_stats triggers; includes rows waiting on a retry backoff
+            # SUM(bigint) is numeric; cast back so callers get an int, not a Decimal
+            cur.execute("SELECT COALESCE(SUM(pending), 0)::bigint FROM outbox_stats")
+            row = cur.fetchone()
+            return int(row[0]) if row else 0
+
+DEAD_LETTER_PAGE_SIZE = 100
+DEAD_LETTER_MAX_PAGE_SIZE = 1000
+DEAD_LETTER_ITERSIZE = 500
+
+
+def encode_dead_letter_cursor(dead_lettered_at: datetime, outbox_id) -> str:
+    return urlsafe_b64encode(f"{dead_lettered_at.isoformat()}|{outbox_id}".encode()).decode()
+
+
+def decode_dead_letter_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    Inverse of encode_dead_letter_cursor. Raises ValueError on anything malformed.
+    """
+    try:
+        at, outbox_id = urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(at), str(UUID(outbox_id))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"invalid dead-letter cursor: {cursor!r}") from e
+
+
+def _dead_letter_filters(
+    cursor: str | None = None,
+    topic: str | None = None,
+    entity_id: str | None = None,
+    error: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> tuple[list[str], list]:
+    """
+    WHERE predicates (on alias o) selecting dead letters, shared by listing and bulk replay.
+    """
+    where = ["o.dead_lettered_at IS NOT NULL"]
+    params = []
+    if cursor:
+        where.append("(o.dead_lettered_at, o.id) < (%s, %s::uuid)")
+        params.extend(decode_dead_letter_cursor(cursor))
+    if topic:
+        where.append("o.topic = %s")
+        params.append(topic)
+    if entity_id:
+        where.append("o.partition_key = %s")
+        params.append(entity_id)
+    if error:
+        where.append("o.last_error ILIKE %s")
+        escaped = error.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params.append(f"%{escaped}%")
+    if since:
+        where.append("o.dead_lettered_at >= %s")
+        params.append(since)
+    if until:
+        where.append("o.dead_lettered_at < %s")
+        params.append(until)
+    return where, params
+
+
+def _dead_letter_query(cursor: str | None = None, **filters) -> tuple[str, list]:
+    """
+    Newest-first dead letters as a keyset scan on (dead_lettered_at, id),
+    served by idx_outbox_dead_lettered. Filters only narrow that scan.
+    """
+    where, params = _dead_letter_filters(cursor, **filters)
+    sql = f"""
+        SELECT
+            o.event_id,
+            o.topic,
+            o.delivery_attempts,
+            o.last_error,
+            o.dead_lettered_at,
+            e.event_type,
+            e.entity_id,
+            e.occurred_at,
+            o.id
+        FROM outbox o
+        JOIN events e ON o.event_id = e.event_id
+        WHERE {" AND ".join(where)}
+        ORDER BY o.dead_lettered_at DESC, o.id DESC
+    """
+    return sql, params
+
+
+def _dead_letter_from_row(r) -> dict:
+    return {
+        "event_id": str(r[0]),
+        "topic": r[1],
+        "delivery_attempts": r[2],
+        "last_error": r[3],
+        "dead_lettered_at": r[4].isoformat(),
+        "event_type": r[5],
+        "entity_id": r[6],
+        "occurred_at": r[7].isoformat(),
+    }
+
+
+def _dead_letter_page_query(limit: int, cursor: str | None = None, **filters) -> tuple[str, tuple]:
+    sql, params = _dead_letter_query(cursor, **filters)
+    # one extra row tells us whether another page exists
+    return sql + " LIMIT %s", (*params, limit + 1)
+
+
+def _dead_letter_page(rows, limit: int):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_dead_letter_cursor(rows[-1][4], rows[-1][8])
+    return [_dead_letter_from_row(r) for r in rows], next_cursor
+
+
+def get_dead_letters_page(limit: int = DEAD_LETTER_PAGE_SIZE, cursor: str | None = None, **filters):
+    """
+    One page of dead letters, newest first. Returns (items, next_cursor);
+    next_cursor is None on the last page. Filters: topic, entity_id,
+    error (case-insensitive substring), since/until on dead_lettered_at.
+    """
+    limit = min(max(limit, 1), DEAD_LETTER_MAX_PAGE_SIZE)
+    sql, params = _dead_letter_page_query(limit, cursor, **filters)
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            return _dead_letter_page(cur.fetchall(), limit)
+
+
+def get_dead_letters(limit: int = DEAD_LETTER_PAGE_SIZE, cursor: str | None = None, **filters):
+    return get_dead_letters_page(limit, cursor, **filters)[0]
+
+
+def iter_dead_letters(cursor: str | None = None, **filters):
+    """
+    Stream every matching dead letter through a server-side cursor,
+    DEAD_LETTER_ITERSIZE rows per round trip. Used for NDJSON exports.
+    """
+    sql, params = _dead_letter_query(cursor, **filters)
+    with get_connection() as conn:
+        with conn.cursor(name=f"dead_letters_{uuid4().hex[:8]}") as cur:
+            cur.itersize = DEAD_LETTER_ITERSIZE
+            cur.execute(sql, params)
+            for r in cur:
+                yield _dead_letter_from_row(r)
+
+
+DEAD_LETTER_BY_ID_SQL = f"""
+    SELECT
+        o.event_id,
+        o.topic,
+        o.payload_json,
+        o.delivery_attempts,
+        o.last_error,
+        o.dead_lettered_at,
+        e.event_type,
+        e.entity_id,
+        e.occurred_at,
+        e.trace_id,
+        {EVENT_ENVELOPE_COLUMNS}
+    FROM outbox o
+    JOIN events e ON o.event_id = e.event_id
+    WHERE o.dead_lettered_at IS NOT NULL
+    AND o.event_id = %s
+"""
+
+
+def _dead_letter_detail_from_row(r) -> dict:
+    return {
+        "event_id": str(r[0]),
+        "topic": r[1],
+        "payload": r[2] if r[2] is not None else canonical_event_from_row(r[10:19]),
+        "delivery_attempts": r[3],
+        "last_error": r[4],
+        "dead_lettered_at": r[5].isoformat(),
+        "event_type": r[6],
+        "entity_id": r[7],
+        "occurred_at": r[8].isoformat(),
+        "trace_id": str(r[9]),
+    }
 
 
 def get_dead_letter_by_id(event_id: str):
-    with psycopg.connect(DATABASE_URL) as conn:
+    with get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT
-                    o.event_id,
-                    o.topic,
-                    o.payload_json,
-                    o.delivery_attempts,
-                    o.last_error,
-                    o.dead_lettered_at,
-                    e.event_type,
-                    e.entity_id,
-                    e.occurred_at,
-                    e.trace_id
-                FROM outbox o
-                JOIN events e ON o.event_id = e.event_id
-                WHERE o.dead_lettered_at IS NOT NULL
-                AND o.event_id = %s
-            """, (event_id,))
+            cur.execute(DEAD_LETTER_BY_ID_SQL, (event_id,))
             r = cur.fetchone()
-            if not r:
-                return None
-            return {
-                "event_id": str(r[0]),
-                "topic": r[1],
-                "payload": r[2],
-                "delivery_attempts": r[3],
-                "last_error": r[4],
-                "dead_lettered_at": r[5].isoformat(),
-                "event_type": r[6],
-                "entity_id": r[7],
-                "occurred_at": r[8].isoformat(),
-                "trace_id": str(r[9]),
-            }
+            return _dead_letter_detail_from_row(r) if r else None
 
-def get_event_trace(event_id: str):
-    with psycopg.connect(DATABASE_URL) as conn:
+
+EVENT_TRACE_MAX_IDS = 500
+
+
+def _trace_from_row(r) -> dict:
+    event = {
+        "event_type": r[1],
+        "source": r[2],
+        "entity_id": r[3],
+        "entity_type": r[4],
+        "occurred_at": r[5].isoformat(),
+        "ingested_at": r[6].isoformat(),
+        "schema_version": r[7],
+        "payload": r[9],
+    }
+    raw_payload = None
+    if r[17]:
+        raw_payload = {
+            "id": str(r[17]),
+            "source": r[18],
+            "fetched_at": r[19].isoformat(),
+            "payload": payload_blobs.decode(r[20], r[21]),
+        }
+
+    if r[10] is None:
+        state = "NO_OUTBOX_RECORD"
+        outbox = None
+    else:
+        if r[13]:
+            state = "DELIVERED"
+        elif r[14]:
+            state = "DEAD_LETTERED"
+        else:
+            state = "PENDING"
+        outbox = {
+            "topic": r[10],
+            "delivery_attempts": r[11],
+            "next_attempt_at": r[12].isoformat() if r[12] else None,
+            "delivered_at": r[13].isoformat() if r[13] else None,
+            "dead_lettered_at": r[14].isoformat() if r[14] else None,
+            "last_error": r[15],
+            "created_at": r[16].isoformat(),
+        }
+
+    return {
+        "event_id": str(r[0]),
+        "trace_id": str(r[8]),
+        "final_state": state,
+        "event": event,
+        "raw_payload": raw_payload,
+        "outbox": outbox,
+    }
+
+
+EVENT_TRACE_SQL = """
+    SELECT
+        e.event_id,
+        e.event_type,
+        e.source,
+        e.entity_id,
+        e.entity_type,
+        e.occurred_at,
+        e.ingested_at,
+        e.schema_version,
+        e.trace_id,
+        e.payload_json,
+        o.topic,
+        o.delivery_attempts,
+        o.next_attempt_at,
+        o.delivered_at,
+        o.dead_lettered_at,
+        o.last_error,
+        o.created_at,
+        r.id,
+        r.source,
+        r.fetched_at,
+        COALESCE(r.payload_json, b.payload_json),
+        b.payload_zlib
+    FROM events e
+    LEFT JOIN LATERAL (
+        SELECT topic, delivery_attempts, next_attempt_at, delivered_at,
+               dead_lettered_at, last_error, created_at
+        FROM outbox
+        WHERE outbox.event_id = e.event_id
+        ORDER BY created_at
+        LIMIT 1
+    ) o ON TRUE
+    LEFT JOIN raw_payloads r ON r.id = e.raw_payload_id
+    LEFT JOIN raw_payload_blobs b ON b.content_hash = r.content_hash
+    WHERE e.event_id = ANY(%s::uuid[])
+"""
+
+
+def get_event_traces(event_ids: list[str]) -> dict[str, dict]:
+    """
+    Full lifecycle (raw payload -> event -> outbox) for many events in one
+    query: events by primary key, the outbox row via uq_outbox_event_topic
+    and the raw payload via events.raw_payload_id, its body via the blob
+    content hash. Returns traces keyed by event_id; unknown ids are absent.
+    """
+    if not event_ids:
+        return {}
+
+    with get_connection() as conn:
         with conn.cursor() as cur:
-            # Get canonical event
-            cur.execute("""
-                SELECT
-                    event_id,
-                    event_type,
-                    source,
-                    entity_id,
-                    entity_type,
-                    occurred_at,
-                    ingested_at,
-                    schema_version,
-                    trace_id,
-                    payload_json
-                FROM events
-                WHERE event_id = %s
-            """, (event_id,))
-            event = cur.fetchone()
-            if not event:
-                return None
+            cur.execute(EVENT_TRACE_SQL, ([str(eid) for eid in event_ids],))
+            return {str(r[0]): _trace_from_row(r) for r in cur.fetchall()}
+
+
+def get_event_trace(event_id: str):
+    # traces are keyed by canonical UUID text; raises ValueError for a non-UUID
+    event_id = str(UUID(str(event_id)))
+    return get_event_traces([event_id]).get(event_id)
+
+# Appended to a statement whose `requeued` CTE returns (event_id, topic) of
+# dead letters sent back to pending. Any below the archive watermark pull it
+# back to their day: the archive re-exports that day once they're delivered,
+# and readers and retention treat it as not archived until then.
+REWIND_ARCHIVE_CTE = """
+    rewound AS (
+        UPDATE event_archive_watermarks w
+        SET archived_until = r.day, updated_at = NOW()
+        FROM (
+            SELECT q.topic, MIN(date_trunc('day', e.occurred_at, 'UTC')) AS day
+            FROM requeued q
+            JOIN events e ON e.event_id = q.event_id
+            GROUP BY q.topic
+        ) r
+        WHERE w.topic = r.topic AND r.day < w.archived_until
+    )
+"""
 
-            # Get raw payload
-            cur.execute("""
-                SELECT id, source, fetched_at, payload_json
-                FROM raw_payloads
-                WHERE source = %s
-                ORDER BY fetched_at ASC
-                LIMIT 1
-            """, (event[2],))
-            raw = cur.fetchone()
-
-            # Get outbox lifecycle
-            cur.execute("""
-                SELECT
-                    id,
-                    topic,
-                    delivery_attempts,
-                    next_attempt_at,
-                    delivered_at,
-                    dead_lettered_at,
-                    last_error,
-                    created_at
-                FROM outbox
-                WHERE event_id = %s
-            """, (event_id,))
-            outbox = cur.fetchone()
-
-            if not outbox:
-                return {
-                    "event_id": str(event[0]),
-                    "trace_id": str(event[8]),
-                    "final_state": "NO_OUTBOX_RECORD",
-                    "event": {
-                        "event_type": event[1],
-                        "source": event[2],
-                        "entity_id": event[3],
-                        "entity_type": event[4],
-                        "occurred_at": event[5].isoformat(),
-                        "ingested_at": event[6].isoformat(),
-                        "schema_version": event[7],
-                        "payload": event[9],
-                    },
-                    "outbox": None,
-                }
-
-            # Determine final state
-            if outbox[4]:
-                state = "DELIVERED"
-            elif outbox[5]:
-                state = "DEAD_LETTERED"
-            else:
-                state = "PENDING"
-
-            return {
-                "event_id": str(event[0]),
-                "trace_id": str(event[8]),
-                "final_state": state,
-                "event": {
-                    "event_type": event[1],
-                    "source": event[2],
-                    "entity_id": event[3],
-                    "entity_type": event[4],
-                    "occurred_at": event[5].isoformat(),
-                    "ingested_at": event[6].isoformat(),
-                    "schema_version": event[7],
-                    "payload": event[9],
-                },
-                "outbox": {
-                    "topic": outbox[1],
-                    "delivery_attempts": outbox[2],
-                    "next_attempt_at": outbox[3].isoformat() if outbox[3] else None,
-                    "delivered_at": outbox[4].isoformat() if outbox[4] else None,
-                    "dead_lettered_at": outbox[5].isoformat() if outbox[5] else None,
-                    "last_error": outbox[6],
-                    "created_at": outbox[7].isoformat(),
-                },
-            }
 
 def replay_dead_letter(event_id: str):
-    with psycopg.connect(DATABASE_URL) as conn:
+    with get_connection() as conn:
         with conn.transaction():
             with conn.cursor() as cur:
                 # Confirm it's actually dead-lettered
@@ -299,42 +764,170 @@ def replay_dead_letter(event_id: str):
                     return None
 
                 # Reset outbox record for redelivery
-                cur.execute("""
-                    UPDATE outbox
-                    SET dead_lettered_at = NULL,
-                        delivered_at = NULL,
-                        delivery_attempts = 0,
-                        next_attempt_at = NOW(),
-                        last_error = NULL
-                    WHERE event_id = %s
+                cur.execute(f"""
+                    WITH requeued AS (
+                        UPDATE outbox
+                        SET dead_lettered_at = NULL,
+                            delivered_at = NULL,
+                            delivery_attempts = 0,
+                            next_attempt_at = NOW(),
+                            last_error = NULL,
+                            claimed_by = NULL,
+                            claimed_until = NULL,
+                            replay_job_id = NULL
+                        WHERE event_id = %s
+                        RETURNING event_id, topic
+                    ),
+                    {REWIND_ARCHIVE_CTE}
+                    SELECT COUNT(*) FROM requeued
                 """, (event_id,))
+                cur.execute("SELECT pg_notify(%s, %s)", (OUTBOX_NOTIFY_CHANNEL, "replay"))
                 return {"event_id": event_id, "status": "requeued"}
 
+def replay_dead_letters(rate_per_second: float = REPLAY_RATE_PER_SECOND, **filters) -> dict:
+    """
+    Requeue every dead letter matching `filters` (see _dead_letter_filters)
+    in one statement and record it as a replay job.
+
+    Requeued rows get next_attempt_at spaced 1/rate_per_second apart in
+    occurred_at order. The relay picks each one up when it comes due, so a
+    large replay trickles back at that rate instead of landing as one burst.
+    A rate <= 0 makes everything due at once.
+    """
+    where, params = _dead_letter_filters(**filters)
+    spacing = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+    job_id = str(uuid4())
+    recorded_filters = json.dumps({k: v for k, v in filters.items() if v is not None}, default=str)
+
+    with get_connection() as conn:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    WITH locked AS (
+                        SELECT o.id, o.occurred_at, o.created_at
+                        FROM outbox o
+                        WHERE {" AND ".join(where)}
+                        FOR UPDATE SKIP LOCKED
+                    ),
+                    targets AS (
+                        SELECT id, ROW_NUMBER() OVER (ORDER BY occurred_at, created_at) - 1 AS position
+                        FROM locked
+                    ),
+                    requeued AS (
+                        UPDATE outbox o
+                        SET dead_lettered_at = NULL,
+                            delivered_at = NULL,
+                            delivery_attempts = 0,
+                            next_attempt_at = NOW() + t.position * make_interval(secs => %s),
+                            last_error = NULL,
+                            claimed_by = NULL,
+                            claimed_until = NULL,
+                            replay_job_id = %s
+                        FROM targets t
+                        WHERE o.id = t.id
+                        RETURNING o.event_id, o.topic, o.next_attempt_at
+                    ),
+                    {REWIND_ARCHIVE_CTE}
+                    INSERT INTO replay_jobs (id, filters, rate_per_second, total, finishes_at)
+                    SELECT %s, %s, %s, COUNT(*), MAX(next_attempt_at)
+                    FROM requeued
+                    RETURNING id, total, created_at, finishes_at
+                    """,
+                    (*params, spacing, job_id, job_id, recorded_filters, rate_per_second),
+                )
+                row = cur.fetchone()
+                if row[1]:
+                    cur.execute("SELECT pg_notify(%s, %s)", (OUTBOX_NOTIFY_CHANNEL, "replay"))
+
+    return {
+        "job_id": str(row[0]),
+        "requeued": row[1],
+        "created_at": row[2].isoformat(),
+        "finishes_at": row[3].isoformat() if row[3] else None,
+    }
+
+
+REPLAY_JOB_SQL = """
+    SELECT
+        j.id,
+        j.filters,
+        j.rate_per_second,
+        j.total,
+        j.created_at,
+        j.finishes_at,
+        COUNT(o.id) FILTER (WHERE o.delivered_at IS NOT NULL) AS delivered,
+        COUNT(o.id) FILTER (WHERE o.dead_lettered_at IS NOT NULL) AS dead_lettered,
+        COUNT(o.id) FILTER (
+            WHERE o.delivered_at IS NULL
+            AND o.dead_lettered_at IS NULL
+        ) AS pending
+    FROM replay_jobs j
+    LEFT JOIN outbox o ON o.replay_job_id = j.id
+    WHERE j.id = %s
+    GROUP BY j.id
+"""
+
+
+def _replay_job_from_row(r) -> dict:
+    return {
+        "job_id": str(r[0]),
+        "filters": r[1],
+        "rate_per_second": r[2],
+        "total": r[3],
+        "created_at": r[4].isoformat(),
+        "finishes_at": r[5].isoformat() if r[5] else None,
+        "delivered": r[6],
+        "dead_lettered": r[7],
+        "pending": r[8],
+        "status": "running" if r[8] else "completed",
+    }
+
+
+def get_replay_job(job_id: str):
+    """
+    A replay job with live progress, counted over its rows via idx_outbox_replay_job.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(REPLAY_JOB_SQL, (job_id,))
+            r = cur.fetchone()
+            return _replay_job_from_row(r) if r else None
+
+
+SYSTEM_HEALTH_SQL = """
+    SELECT
+        -- SUM(bigint) is numeric, which psycopg would hand back as Decimal
+        COALESCE(SUM(delivered), 0)::bigint AS delivered,
+        COALESCE(SUM(dead_lettered), 0)::bigint AS dead_lettered,
+        COALESCE(SUM(pending), 0)::bigint AS pending,
+        MAX(last_delivered_at) AS last_delivered_at
+    FROM outbox_stats
+"""
+
+
+def _health_from_row(row) -> dict:
+    if not row:
+        return {
+            "delivered_events": 0,
+            "dead_lettered_events": 0,
+            "pending_events": 0,
+            "last_delivered_at": None,
+        }
+    return {
+        "delivered_events": int(row[0]),
+        "dead_lettered_events": int(row[1]),
+        "pending_events": int(row[2]),
+        "last_delivered_at": row[3].isoformat() if row[3] else None,
+    }
+
+
 def get_system_health():
-    with psycopg.connect(DATABASE_URL) as conn:
+    """
+    Outbox totals from the trigger-maintained outbox_stats slots: a sum over
+    at most 16 rows, independent of outbox size.
+    """
+    with get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT
-                    COUNT(*) FILTER (WHERE delivered_at IS NOT NULL) AS delivered,
-                    COUNT(*) FILTER (WHERE dead_lettered_at IS NOT NULL) AS dead_lettered,
-                    COUNT(*) FILTER (
-                        WHERE delivered_at IS NULL
-                        AND dead_lettered_at IS NULL
-                    ) AS pending,
-                    MAX(delivered_at) AS last_delivered_at
-                FROM outbox
-            """)
-            row = cur.fetchone()
-            if not row:
-                return {
-                    "delivered_events": 0,
-                    "dead_lettered_events": 0,
-                    "pending_events": 0,
-                    "last_delivered_at": None,
-                }
-            return {
-                "delivered_events": row[0],
-                "dead_lettered_events": row[1],
-                "pending_events": row[2],
-                "last_delivered_at": row[3].isoformat() if row[3] else None,
-            }
\ No newline at end of file
+            cur.execute(SYSTEM_HEALTH_SQL)
+            return _health_from_row(cur.fetchone())
@@ -1,68 +1,201 @@
 from app.relay.publisher import publish
-from app.relay.repository import claim_pending, mark_delivered, mark_failed
+from app.relay.repository import (
+    claim_pending,
+    mark_delivered_many,
+    mark_failed_many,
+    release_claimed_many,
+    worker_id,
+)
 from app.core.logger import get_logger
 from app.core.metrics import (
     events_published,
     events_failed,
+    events_deferred,
+    publishes_in_flight,
 )
 from app.core.metrics import publish_latency_seconds, events_dead_lettered
+from concurrent.futures import ThreadPoolExecutor
+import os
 import time
+import uuid
 
 logger = get_logger(__name__)
 
-def run_relay():
-    rows = claim_pending(limit=10)
+RELAY_BATCH_SIZE = int(os.getenv("RELAY_BATCH_SIZE", "100"))
+RELAY_MAX_IN_FLIGHT = int(os.getenv("RELAY_MAX_IN_FLIGHT", "8"))
+RELAY_PRESERVE_ORDER = os.getenv("RELAY_PRESERVE_ORDER", "true").lower() in ("1", "true", "yes")
+
+
+def _ordering_key(row):
+    # Rows for the same entity share a lane; rows without one are independent.
+    outbox_id, _event_id, _topic, payload, _prev_attempts = row
+    if isinstance(payload, dict) and payload.get("entity_id"):
+        return payload["entity_id"]
+    return outbox_id
+
+
+def _build_lanes(rows, preserve_order: bool):
+    if not preserve_order:
+        return [[row] for row in rows]
+
+    lanes = {}
+    for row in rows:
+        lanes.setdefault(_ordering_key(row), []).append(row)
+    return list(lanes.values())
+
+
+def _publish_one(row):
+    outbox_id, event_id, topic, payload, prev_attempts = row
+    attempt = prev_attempts + 1
+
+    logger.info(
+        "Publishing event",
+        extra={
+            "event_id": event_id,
+            "attempt": attempt,
+            "topic": topic,
+        },
+    )
+
+    publishes_in_flight.inc()
+    try:
+        start = time.perf_counter()
+        publish(payload)
+        duration = time.perf_counter() - start
+        publish_latency_seconds.observe(duration)
+        return ("delivered", outbox_id, event_id, topic, attempt, None, duration)
+    except Exception as e:
+        return ("failed", outbox_id, event_id, topic, attempt, str(e), time.perf_counter() - start)
+    finally:
+        publishes_in_flight.dec()
+
+
+def _deliver_lane(lane):
+    """
+    Publish a lane in order. Once one event fails, the rest of the lane is
+    held back instead of being published ahead of it.
+    """
+    outcomes = []
+    for i, row in enumerate(lane):
+        outcome = _publish_one(row)
+        outcomes.append(outcome)
+        if outcome[0] == "failed":
+            blocker_id = outcome[1]
+            for (outbox_id, event_id, topic, _payload, prev_attempts) in lane[i + 1:]:
+                outcomes.append(("deferred", outbox_id, event_id, topic, prev_attempts + 1, blocker_id, 0.0))
+            break
+    return outcomes
+
+
+def run_relay(
+    limit: int = RELAY_BATCH_SIZE,
+    max_in_flight: int = RELAY_MAX_IN_FLIGHT,
+    preserve_order: bool = RELAY_PRESERVE_ORDER,
+    partition: tuple[int, int] | None = None,
+) -> dict:
+    """
+    Claim, publish and finalize one batch.
+    Returns counts per outcome plus the mean publish latency, for drain-mode sizing.
+    """
+    # unique per run, so two relay runs in one process can't finalize each other's leases
+    claim_token = f"{worker_id()}:{uuid.uuid4().hex[:8]}"
+    rows = claim_pending(limit=limit, partition=partition, claimed_by=claim_token, preserve_order=preserve_order)
 
     if not rows:
         print("No eligible outbox events.")
-        return
+        return {"claimed": 0, "delivered": 0, "failed": 0, "deferred": 0, "mean_publish_seconds": 0.0}
 
-    for (outbox_id, event_id, topic, payload, prev_attempts) in rows:
-        attempt = prev_attempts + 1
+    lanes = _build_lanes(rows, preserve_order)
 
-        try:
-            logger.info(
-                "Publishing event",
-                extra={
-                    "event_id": event_id,
-                    "attempt": attempt,
-                    "topic": topic,
-                },
-            )
+    if max_in_flight <= 1 or len(lanes) == 1:
+        lane_outcomes = [_deliver_lane(lane) for lane in lanes]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_in_flight, len(lanes))) as executor:
+            lane_outcomes = list(executor.map(_deliver_lane, lanes))
+
+    delivered = []
+    failed = []
+    deferred = []
+    publish_seconds = []
+    for outcomes in lane_outcomes:
+        for (status, outbox_id, event_id, topic, attempt, detail, duration) in outcomes:
+            if status != "deferred":
+                publish_seconds.append(duration)
+            if status == "delivered":
+                delivered.append((outbox_id, event_id, topic, attempt))
+            elif status == "failed":
+                failed.append((outbox_id, event_id, topic, attempt, detail))
+            else:
+                deferred.append((outbox_id, event_id, topic, attempt, detail))
 
-            start = time.perf_counter()
-            publish(payload)
-            duration = time.perf_counter() - start
-            publish_latency_seconds.observe(duration)
+    # finalize the whole batch in (at most) three statements;
+    # deferred rows are released last so they can follow their blocker's retry time
+    mark_delivered_many([outbox_id for (outbox_id, _, _, _) in delivered])
+    recorded = mark_failed_many(
+        [(outbox_id, attempt, error) for (outbox_id, _, _, attempt, error) in failed],
+        claimed_by=claim_token,
+    )
+    release_claimed_many(
+        [(outbox_id, blocker_id) for (outbox_id, _, _, _, blocker_id) in deferred],
+        claimed_by=claim_token,
+    )
 
-            mark_delivered(outbox_id)
-            events_published.inc()
+    for (outbox_id, event_id, topic, attempt) in delivered:
+        events_published.inc()
+        logger.info(
+            "Delivered event",
+            extra={
+                "event_id": event_id,
+                "attempt": attempt,
+                "topic": topic,
+            },
+        )
 
-            logger.info(
-                "Delivered event",
+    for (outbox_id, event_id, topic, attempt, error) in failed:
+        if str(outbox_id) not in recorded:
+            # the lease expired mid-publish; whoever reclaimed the row records its outcome
+            logger.warning(
+                "Publish failed after lease expired",
                 extra={
                     "event_id": event_id,
                     "attempt": attempt,
                     "topic": topic,
-                    
+                    "error": error,
                 },
             )
+            continue
+        events_failed.inc()
+        if recorded[str(outbox_id)]:
+            events_dead_lettered.inc()
 
-        except Exception as e:
-            mark_failed(outbox_id, attempt, str(e))
-            events_failed.inc()
-            if attempt >= 5:
-                events_dead_lettered.inc()
+        logger.error(
+            "Publish failed",
+            extra={
+                "event_id": event_id,
+                "attempt": attempt,
+                "topic": topic,
+                "error": error,
+            },
+        )
 
-            logger.error(
-                "Publish failed",
-                extra={
-                    "event_id": event_id,
-                    "attempt": attempt,
-                    "topic": topic,
-                    "error": str(e),
-                },
-            )
+    for (outbox_id, event_id, topic, attempt, blocker_id) in deferred:
+        events_deferred.inc()
+        logger.info(
+            "Deferred event behind failed predecessor",
+            extra={
+                "event_id": event_id,
+                "attempt": attempt,
+                "topic": topic,
+            },
+        )
+
+    return {
+        "claimed": len(rows),
+        "delivered": len(delivered),
+        "failed": len(failed),
+        "deferred": len(deferred),
+        "mean_publish_seconds": sum(publish_seconds) / len(publish_seconds) if publish_seconds else 0.0,
+    }
 
 if __name__ == "__main__":
-    run_relay()
\ No newline at end of file
+    run_relay()
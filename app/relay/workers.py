@@ -0,0 +1,105 @@
+"""
+Standalone relay: N worker processes, each owning one hash partition of
+outbox.partition_key (the event's entity_id, falling back to topic).
+
+    python -m app.relay.workers --workers 4
+
+Partitions don't overlap, so workers never contend for the same rows, and
+every entity is delivered by exactly one process in occurred_at order.
+Run the API with RELAY_IN_PROCESS=false when using this.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import time
+
+from prometheus_client import start_http_server
+
+from app.core.logger import get_logger
+from app.relay.listener import RELAY_STOP_CHECK_SECONDS
+from app.relay.repository import RELAY_LEASE_SECONDS
+
+logger = get_logger(__name__)
+
+SUPERVISOR_POLL_SECONDS = 1.0
+# How long a terminated worker gets before it is killed: enough to notice the
+# stop in an idle wait, or to finish the batch it holds a lease on. Killing it
+# mid-batch would leave those rows to be redelivered once the lease expires.
+WORKER_STOP_GRACE_SECONDS = RELAY_LEASE_SECONDS + RELAY_STOP_CHECK_SECONDS
+
+
+def run_worker(index: int, count: int, metrics_port: int | None = None):
+    # imported here so each process builds its own pool after start-up
+    from app.relay.listener import RelayListener
+
+    if metrics_port:
+        # each worker has its own registry, so each gets its own scrape port
+        start_http_server(metrics_port + index)
+
+    listener = RelayListener(partition=(index, count))
+    # only flag the stop here: a drain in progress finishes its batch, an idle wait ends within RELAY_STOP_CHECK_SECONDS
+    signal.signal(signal.SIGTERM, lambda *_: listener.stop(timeout=0, wake=False))
+    logger.info(f"Relay worker {index}/{count} started (pid {os.getpid()})")
+    listener.run_forever()
+
+
+def _start(ctx, index: int, count: int, metrics_port: int | None):
+    process = ctx.Process(
+        target=run_worker,
+        args=(index, count, metrics_port),
+        name=f"relay-worker-{index}",
+        daemon=False,
+    )
+    process.start()
+    return process
+
+
+def run_workers(count: int, metrics_port: int | None = None):
+    """
+    Start `count` workers and restart any that exit, so no partition is left unowned.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    processes = {index: _start(ctx, index, count, metrics_port) for index in range(count)}
+    stopping = False
+
+    def _shutdown(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    try:
+        while not stopping:
+            for index, process in list(processes.items()):
+                if not process.is_alive():
+                    logger.error(
+                        f"Relay worker {index} exited, restarting",
+                        extra={"error": f"exit code {process.exitcode}"},
+                    )
+                    processes[index] = _start(ctx, index, count, metrics_port)
+            time.sleep(SUPERVISOR_POLL_SECONDS)
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + WORKER_STOP_GRACE_SECONDS
+        for process in processes.values():
+            process.join(timeout=max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.error(f"Relay worker {process.name} did not stop in {WORKER_STOP_GRACE_SECONDS:.0f}s, killing it")
+                process.kill()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the outbox relay as a pool of partitioned worker processes")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("RELAY_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="serve Prometheus metrics for worker i on METRICS_PORT + i",
+    )
+    args = parser.parse_args()
+    run_workers(args.workers, args.metrics_port)
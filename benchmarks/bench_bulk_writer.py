@@ -0,0 +1,52 @@
+"""
+Rows/sec for the ingestion write path: per-row INSERTs (write_events) vs COPY (copy_events).
+Each run happens in a transaction that is rolled back, so nothing is left behind.
+
+    python -m benchmarks.bench_bulk_writer --events 5000
+"""
+import argparse
+import time
+
+import psycopg
+
+from app.core.db import close_pool, get_connection
+from app.ingestion.bulk_writer import copy_events
+from app.ingestion.run_ingestion import build_canonical_event, write_events
+
+
+def _synthetic_batch(n: int):
+    batch = []
+    for i in range(n):
+        raw = {
+            "symbol": f"SYM{i % 500}",
+            "price": 100.0 + (i % 97) / 10,
+            "volume": 1000 + i,
+            "currency": "USD",
+            "occurred_at": "2026-03-01T15:59:00+00:00",
+        }
+        batch.append((raw, build_canonical_event(raw)))
+    return batch
+
+
+def _measure(writer, batch) -> float:
+    with get_connection() as conn:
+        start = time.perf_counter()
+        with conn.transaction():
+            with conn.cursor() as cur:
+                writer(cur, batch)
+            elapsed = time.perf_counter() - start
+            raise psycopg.Rollback()
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    args = parser.parse_args()
+
+    batch = _synthetic_batch(args.events)
+    for label, writer in (("insert", write_events), ("copy", copy_events)):
+        elapsed = _measure(writer, batch)
+        # three rows (raw payload, event, outbox) per event
+        print(f"{label:<7} {args.events} events in {elapsed:6.3f}s  {3 * args.events / elapsed:10.0f} rows/s")
+    close_pool()
@@ -0,0 +1,80 @@
+"""
+Serialization cost per ingested tick, before and after the outbox stopped
+storing its own copy of the event:
+
+- before: stdlib json.dumps for the raw payload, the event payload and the
+  full envelope on the outbox row, plus the stdlib-encoded published message;
+- after: codec.dumps for the raw payload and the event payload only, plus
+  the message encoded with each available codec.
+
+Reports JSON bytes stored per event and serialization CPU per event. No
+database needed; JSONB storage tracks the text size closely.
+
+    python -m benchmarks.bench_codec --events 20000
+"""
+import argparse
+import json
+import time
+
+from app.core import codec
+from app.ingestion.run_ingestion import build_canonical_event
+
+
+def _synthetic_ticks(n: int):
+    ticks = []
+    for i in range(n):
+        raw = {
+            "symbol": f"SYM{i % 500}",
+            "price": 100.0 + (i % 97) / 10,
+            "volume": 1000 + i,
+            "currency": "USD",
+            "occurred_at": "2026-03-01T15:59:00+00:00",
+        }
+        ticks.append((raw, build_canonical_event(raw)))
+    return ticks
+
+
+def _before(raw, event):
+    stored = (json.dumps(raw), json.dumps(event["payload"]), json.dumps(event))
+    return stored, json.dumps(event).encode()
+
+
+def _after(wire):
+    def serialize(raw, event):
+        return (codec.dumps(raw), codec.dumps(event["payload"])), wire.encode(event)
+    return serialize
+
+
+def _measure(serialize, ticks) -> tuple[float, float, float]:
+    stored_bytes = wire_bytes = 0
+    start = time.process_time()
+    for raw, event in ticks:
+        stored, message = serialize(raw, event)
+        stored_bytes += sum(len(s) for s in stored)
+        wire_bytes += len(message)
+    elapsed = time.process_time() - start
+    n = len(ticks)
+    return stored_bytes / n, wire_bytes / n, elapsed / n * 1e6
+
+
+def _available_codecs():
+    for name in ("json", "orjson", "msgpack"):
+        try:
+            yield codec.get_codec(name)
+        except RuntimeError as e:
+            print(f"skipping {name}: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args()
+
+    ticks = _synthetic_ticks(args.events)
+    runs = [("before (stdlib, 3 copies)", _before)]
+    runs += [(f"after ({wire.name})", _after(wire)) for wire in _available_codecs()]
+
+    print(f"{'':<27}{'stored B/event':>15}{'message B':>11}{'CPU us/event':>14}")
+    for label, serialize in runs:
+        stored, wire, cpu = _measure(serialize, ticks)
+        print(f"{label:<27}{stored:>15.0f}{wire:>11.0f}{cpu:>14.2f}")
@@ -0,0 +1,57 @@
+"""
+Per-call latency of a trivial query: fresh psycopg.connect() vs the shared pool.
+
+    python -m benchmarks.bench_connection_pool --iterations 200
+"""
+import argparse
+import statistics
+import time
+
+import psycopg
+
+from app.core.db import DATABASE_URL, close_pool, get_connection
+
+
+def _fresh_connection_call():
+    with psycopg.connect(DATABASE_URL) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+
+
+def _pooled_call():
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+
+
+def _measure(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list[float]):
+    samples = sorted(samples)
+    p99 = samples[max(0, int(len(samples) * 0.99) - 1)]
+    print(
+        f"{label:<10} mean={statistics.mean(samples):7.3f}ms "
+        f"p50={statistics.median(samples):7.3f}ms p99={p99:7.3f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    # warm the pool so the first checkout doesn't count a connect
+    _pooled_call()
+
+    _report("connect", _measure(_fresh_connection_call, args.iterations))
+    _report("pooled", _measure(_pooled_call, args.iterations))
+    close_pool()
@@ -0,0 +1,98 @@
+"""
+Storage and insert throughput for raw payloads on a repeated-poll workload:
+`--symbols` symbols polled `--polls` times a minute for `--minutes` minutes,
+where every poll within a minute returns the same last bar.
+
+- inline: one JSONB payload per raw_payloads row (the layout before 0006);
+- content-addressed: raw_payloads rows reference raw_payload_blobs by hash,
+  and each distinct payload is stored once.
+
+Each poll is written like one batched ingestion. Everything happens in a
+transaction that is rolled back, so nothing is left behind. Storage is the
+sum of pg_column_size over the rows written, before indexes.
+
+    python -m benchmarks.bench_raw_payloads --symbols 50 --polls 6 --minutes 30
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+
+from app.core import payload_blobs
+from app.core.codec import dumps
+from app.core.db import close_pool, get_connection
+
+SOURCE = "bench"
+START = datetime(2026, 3, 2, 14, 30, tzinfo=timezone.utc)
+
+ROW_BYTES_SQL = "SELECT COALESCE(SUM(pg_column_size(r.*)), 0) FROM raw_payloads r WHERE r.source = %s"
+# blobs written by this (rolled back) transaction
+BLOB_BYTES_SQL = "SELECT COALESCE(SUM(pg_column_size(b.*)), 0) FROM raw_payload_blobs b WHERE b.first_seen_at = NOW()"
+
+
+def _polls(symbols: int, polls: int, minutes: int):
+    for minute in range(minutes):
+        occurred_at = (START + timedelta(minutes=minute)).isoformat()
+        for _ in range(polls):
+            yield [
+                {
+                    "symbol": f"SYM{s}",
+                    "price": 100.0 + (minute * 7 + s) % 97 / 10,
+                    "volume": 1000 + minute * 13 + s,
+                    "currency": "USD",
+                    "occurred_at": occurred_at,
+                }
+                for s in range(symbols)
+            ]
+
+
+def write_inline(cur, poll):
+    with cur.copy("COPY raw_payloads (id, source, payload_json) FROM STDIN") as copy:
+        for raw in poll:
+            copy.write_row((uuid.uuid4(), SOURCE, dumps(raw)))
+
+
+def write_addressed(cur, poll, compression: str):
+    blobs = [payload_blobs.encode(dumps(raw), compression) for raw in poll]
+    payload_blobs.write_blobs(cur, blobs)
+    with cur.copy("COPY raw_payloads (id, source, content_hash) FROM STDIN") as copy:
+        for blob in blobs:
+            copy.write_row((uuid.uuid4(), SOURCE, blob.content_hash))
+
+
+def _measure(writer, polls) -> tuple[float, int]:
+    with get_connection() as conn:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                start = time.perf_counter()
+                for poll in polls:
+                    with conn.transaction():
+                        writer(cur, poll)
+                elapsed = time.perf_counter() - start
+                stored = cur.execute(ROW_BYTES_SQL, (SOURCE,)).fetchone()[0]
+                stored += cur.execute(BLOB_BYTES_SQL).fetchone()[0]
+            raise psycopg.Rollback()
+    return elapsed, stored
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--polls", type=int, default=6, help="polls per minute")
+    parser.add_argument("--minutes", type=int, default=30)
+    parser.add_argument("--compression", choices=("none", "zlib"), default=payload_blobs.RAW_PAYLOAD_COMPRESSION)
+    args = parser.parse_args()
+
+    polls = list(_polls(args.symbols, args.polls, args.minutes))
+    fetches = sum(len(poll) for poll in polls)
+    runs = (
+        ("inline", write_inline),
+        ("content-addressed", lambda cur, poll: write_addressed(cur, poll, args.compression)),
+    )
+    print(f"{fetches} fetched payloads, {fetches // args.polls} distinct")
+    for label, writer in runs:
+        elapsed, stored = _measure(writer, polls)
+        print(f"{label:<18} {fetches / elapsed:10.0f} payloads/s  {stored / 1024:10.1f} KiB  {stored / fetches:6.1f} B/payload")
+    close_pool()
@@ -0,0 +1,315 @@
+-- Baseline: the schema as db/schema.sql last defined it. Every statement is
+-- idempotent, so it also applies cleanly over a database built from that file.
+
+-- Enable UUID generation
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+-- ============================================================
+-- 1) Raw Vendor Payloads (Audit Layer)
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS raw_payloads (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    source TEXT NOT NULL,
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    payload_json JSONB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_raw_payloads_source_fetched_at
+ON raw_payloads(source, fetched_at DESC);
+
+
+-- ============================================================
+-- 2) Canonical Immutable Event Store
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS events (
+    event_id UUID PRIMARY KEY,
+    event_type TEXT NOT NULL,
+    source TEXT NOT NULL,
+    entity_id TEXT,
+    entity_type TEXT,
+    occurred_at TIMESTAMPTZ NOT NULL,
+    ingested_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    schema_version INT NOT NULL CHECK (schema_version >= 1),
+    trace_id UUID NOT NULL,
+    payload_json JSONB NOT NULL,
+    raw_payload_id UUID
+);
+
+-- Query Performance Indexes
+CREATE INDEX IF NOT EXISTS idx_events_event_type_occurred_at
+ON events(event_type, occurred_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_events_entity
+ON events(entity_id, entity_type);
+
+CREATE INDEX IF NOT EXISTS idx_events_trace_id
+ON events(trace_id);
+
+CREATE INDEX IF NOT EXISTS idx_events_occurred_at
+ON events(occurred_at DESC);
+
+-- The raw vendor payload this event was built from (set at ingestion;
+-- NULL for events ingested before the link existed). Joined by raw_payloads' PK.
+ALTER TABLE events ADD COLUMN IF NOT EXISTS raw_payload_id UUID;
+
+-- Keyset order for time-range replays
+CREATE INDEX IF NOT EXISTS idx_events_occurred_at_event_id
+ON events(occurred_at, event_id);
+
+-- ============================================================
+-- 3) Transactional Outbox
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    event_id UUID NOT NULL REFERENCES events(event_id) ON DELETE CASCADE,
+    topic TEXT NOT NULL,
+    payload_json JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    delivered_at TIMESTAMPTZ,
+    delivery_attempts INT NOT NULL DEFAULT 0 CHECK (delivery_attempts >= 0),
+    last_error TEXT,
+    partition_key TEXT,
+    occurred_at TIMESTAMPTZ,
+    claimed_by TEXT,
+    claimed_until TIMESTAMPTZ,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    dead_lettered_at TIMESTAMPTZ
+);
+
+-- Retry scheduling and dead-lettering
+ALTER TABLE outbox ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+ALTER TABLE outbox ADD COLUMN IF NOT EXISTS dead_lettered_at TIMESTAMPTZ;
+
+-- Relay partitioning: each worker owns a hash partition of partition_key
+-- (the event's entity_id) and delivers it in occurred_at order.
+ALTER TABLE outbox ADD COLUMN IF NOT EXISTS partition_key TEXT;
+ALTER TABLE outbox ADD COLUMN IF NOT EXISTS occurred_at TIMESTAMPTZ;
+
+-- Claim leases: a claimed row belongs to claimed_by until claimed_until,
+-- after which another worker may reclaim it (crash recovery).
+ALTER TABLE outbox ADD COLUMN IF NOT EXISTS claimed_by TEXT;
+ALTER TABLE outbox ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ;
+
+UPDATE outbox
+SET partition_key = payload_json->>'entity_id',
+    occurred_at = (payload_json->>'occurred_at')::timestamptz
+WHERE partition_key IS NULL
+  AND payload_json ? 'entity_id';
+
+-- Fast retrieval of undelivered messages
+CREATE INDEX IF NOT EXISTS idx_outbox_pending
+ON outbox(created_at ASC)
+WHERE delivered_at IS NULL;
+
+-- Prevent duplicate publication rows per event/topic
+CREATE UNIQUE INDEX IF NOT EXISTS uq_outbox_event_topic
+ON outbox(event_id, topic);
+
+-- Bulk replay: which replay job last requeued a row (progress tracking)
+ALTER TABLE outbox ADD COLUMN IF NOT EXISTS replay_job_id UUID;
+
+CREATE INDEX IF NOT EXISTS idx_outbox_replay_job
+ON outbox(replay_job_id)
+WHERE replay_job_id IS NOT NULL;
+
+-- Keyset pagination of dead letters, newest first
+CREATE INDEX IF NOT EXISTS idx_outbox_dead_lettered
+ON outbox(dead_lettered_at DESC, id DESC)
+WHERE dead_lettered_at IS NOT NULL;
+
+-- Per-entity ordering checks in partitioned claims
+CREATE INDEX IF NOT EXISTS idx_outbox_pending_partition
+ON outbox(partition_key, occurred_at, created_at)
+WHERE delivered_at IS NULL;
+
+-- Delivery sequence: assigned when a row is marked delivered, under a
+-- transaction-level advisory lock so sequence order is commit order.
+-- Consumers page through it with keyset reads (see consumer_offsets).
+CREATE SEQUENCE IF NOT EXISTS outbox_delivery_seq;
+ALTER TABLE outbox ADD COLUMN IF NOT EXISTS delivery_seq BIGINT;
+
+UPDATE outbox o
+SET delivery_seq = d.seq
+FROM (
+    SELECT id, nextval('outbox_delivery_seq') AS seq
+    FROM (
+        SELECT id
+        FROM outbox
+        WHERE delivered_at IS NOT NULL
+          AND delivery_seq IS NULL
+        ORDER BY delivered_at, created_at
+    ) ordered
+) d
+WHERE o.id = d.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_outbox_delivery_seq
+ON outbox(topic, delivery_seq)
+WHERE delivery_seq IS NOT NULL;
+
+-- ============================================================
+-- 4) Latest Delivered Tick per Entity (consumer read model)
+-- ============================================================
+
+-- Upserted by the relay in the same statement that marks rows delivered.
+CREATE TABLE IF NOT EXISTS latest_ticks (
+    entity_id TEXT PRIMARY KEY,
+    event_id UUID NOT NULL,
+    trace_id UUID NOT NULL,
+    occurred_at TIMESTAMPTZ NOT NULL,
+    payload_json JSONB NOT NULL,
+    delivered_at TIMESTAMPTZ NOT NULL
+);
+
+INSERT INTO latest_ticks (entity_id, event_id, trace_id, occurred_at, payload_json, delivered_at)
+SELECT DISTINCT ON (e.entity_id)
+    e.entity_id, e.event_id, e.trace_id, e.occurred_at, e.payload_json, o.delivered_at
+FROM events e
+JOIN outbox o ON o.event_id = e.event_id
+WHERE e.event_type = 'MARKET_TICK_INGESTED'
+  AND e.entity_id IS NOT NULL
+  AND o.delivered_at IS NOT NULL
+ORDER BY e.entity_id, e.occurred_at DESC
+ON CONFLICT (entity_id) DO NOTHING;
+
+
+-- ============================================================
+-- 5) Consumer Offsets
+-- ============================================================
+
+-- Last delivery_seq each named consumer has processed, per topic.
+CREATE TABLE IF NOT EXISTS consumer_offsets (
+    consumer_name TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    last_seq BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (consumer_name, topic)
+);
+
+
+-- ============================================================
+-- 6) Replay Jobs
+-- ============================================================
+
+-- One row per bulk replay; progress is counted live from outbox.replay_job_id.
+CREATE TABLE IF NOT EXISTS replay_jobs (
+    id UUID PRIMARY KEY,
+    filters JSONB NOT NULL,
+    rate_per_second DOUBLE PRECISION NOT NULL,
+    total INT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finishes_at TIMESTAMPTZ
+);
+
+
+-- Time-range event replays: one row per named replay, checkpointed per page.
+CREATE TABLE IF NOT EXISTS replay_checkpoints (
+    name TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    entity_ids TEXT[],
+    start_at TIMESTAMPTZ NOT NULL,
+    end_at TIMESTAMPTZ NOT NULL,
+    rate_per_second DOUBLE PRECISION NOT NULL,
+    last_occurred_at TIMESTAMPTZ,
+    last_event_id UUID,
+    published BIGINT NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running',
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+
+-- ============================================================
+-- 7) Outbox Health Counters
+-- ============================================================
+
+-- Delivered / dead-lettered / pending totals, kept current by statement-level
+-- triggers so /health never scans the outbox. Deltas land in one of 16 slots
+-- (by backend pid) so concurrent relay workers don't queue on a single row;
+-- readers sum the slots.
+CREATE TABLE IF NOT EXISTS outbox_stats (
+    slot INT PRIMARY KEY,
+    delivered BIGINT NOT NULL DEFAULT 0,
+    dead_lettered BIGINT NOT NULL DEFAULT 0,
+    pending BIGINT NOT NULL DEFAULT 0,
+    last_delivered_at TIMESTAMPTZ
+);
+
+CREATE OR REPLACE FUNCTION outbox_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    d_delivered BIGINT := 0;
+    d_dead BIGINT := 0;
+    d_pending BIGINT := 0;
+    latest TIMESTAMPTZ;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT
+            COUNT(*) FILTER (WHERE delivered_at IS NOT NULL),
+            COUNT(*) FILTER (WHERE dead_lettered_at IS NOT NULL),
+            COUNT(*) FILTER (WHERE delivered_at IS NULL AND dead_lettered_at IS NULL),
+            MAX(delivered_at)
+        INTO d_delivered, d_dead, d_pending, latest
+        FROM new_rows;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT
+            d_delivered - COUNT(*) FILTER (WHERE delivered_at IS NOT NULL),
+            d_dead - COUNT(*) FILTER (WHERE dead_lettered_at IS NOT NULL),
+            d_pending - COUNT(*) FILTER (WHERE delivered_at IS NULL AND dead_lettered_at IS NULL)
+        INTO d_delivered, d_dead, d_pending
+        FROM old_rows;
+    END IF;
+
+    -- claims and retries don't change any total; skip the counter write entirely
+    IF d_delivered = 0 AND d_dead = 0 AND d_pending = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO outbox_stats AS s (slot, delivered, dead_lettered, pending, last_delivered_at)
+    VALUES (pg_backend_pid() % 16, d_delivered, d_dead, d_pending, latest)
+    ON CONFLICT (slot) DO UPDATE
+    SET delivered = s.delivered + EXCLUDED.delivered,
+        dead_lettered = s.dead_lettered + EXCLUDED.dead_lettered,
+        pending = s.pending + EXCLUDED.pending,
+        last_delivered_at = GREATEST(s.last_delivered_at, EXCLUDED.last_delivered_at);
+    RETURN NULL;
+END;
+$$;
+
+-- Install the triggers and seed the counters atomically: the lock keeps
+-- writers out between the full count and the first trigger firing (the
+-- migration runner applies this file in one transaction).
+LOCK TABLE outbox IN SHARE ROW EXCLUSIVE MODE;
+
+DROP TRIGGER IF EXISTS trg_outbox_stats_insert ON outbox;
+CREATE TRIGGER trg_outbox_stats_insert
+AFTER INSERT ON outbox
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION outbox_stats_apply();
+
+DROP TRIGGER IF EXISTS trg_outbox_stats_update ON outbox;
+CREATE TRIGGER trg_outbox_stats_update
+AFTER UPDATE ON outbox
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION outbox_stats_apply();
+
+DROP TRIGGER IF EXISTS trg_outbox_stats_delete ON outbox;
+CREATE TRIGGER trg_outbox_stats_delete
+AFTER DELETE ON outbox
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION outbox_stats_apply();
+
+DELETE FROM outbox_stats;
+INSERT INTO outbox_stats (slot, delivered, dead_lettered, pending, last_delivered_at)
+SELECT
+    0,
+    COUNT(*) FILTER (WHERE delivered_at IS NOT NULL),
+    COUNT(*) FILTER (WHERE dead_lettered_at IS NOT NULL),
+    COUNT(*) FILTER (WHERE delivered_at IS NULL AND dead_lettered_at IS NULL),
+    MAX(delivered_at)
+FROM outbox;
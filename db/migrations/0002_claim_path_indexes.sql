@@ -0,0 +1,40 @@
+-- migrate: no-transaction
+--
+-- Partial indexes shaped to the relay's hot queries, built CONCURRENTLY so
+-- writers keep going during the build. Each index is dropped first: if a
+-- previous run died mid-build it left an INVALID index behind that
+-- IF NOT EXISTS would otherwise keep.
+
+-- Unpartitioned claim: pending rows in created_at order. The retry and lease
+-- columns ride along so their filters (and seconds_until_next_attempt's MIN)
+-- are answered from the index.
+DROP INDEX CONCURRENTLY IF EXISTS idx_outbox_claimable;
+CREATE INDEX CONCURRENTLY idx_outbox_claimable
+ON outbox(created_at)
+INCLUDE (next_attempt_at, claimed_until)
+WHERE delivered_at IS NULL AND dead_lettered_at IS NULL;
+
+-- Partitioned claim: pending rows in per-entity delivery order.
+DROP INDEX CONCURRENTLY IF EXISTS idx_outbox_claimable_ordered;
+CREATE INDEX CONCURRENTLY idx_outbox_claimable_ordered
+ON outbox(occurred_at, created_at)
+WHERE delivered_at IS NULL AND dead_lettered_at IS NULL;
+
+-- Partitioned claim's "is an earlier row for this entity backing off?" probe.
+-- Replaces idx_outbox_pending_partition, which still covered dead letters.
+DROP INDEX CONCURRENTLY IF EXISTS idx_outbox_pending_entity;
+CREATE INDEX CONCURRENTLY idx_outbox_pending_entity
+ON outbox(partition_key, occurred_at, created_at)
+INCLUDE (next_attempt_at)
+WHERE delivered_at IS NULL AND dead_lettered_at IS NULL;
+
+-- Delivered history for one entity, newest first.
+DROP INDEX CONCURRENTLY IF EXISTS idx_outbox_delivered_entity;
+CREATE INDEX CONCURRENTLY idx_outbox_delivered_entity
+ON outbox(partition_key, topic, delivered_at DESC)
+WHERE delivered_at IS NOT NULL;
+
+-- Superseded by the indexes above (idx_outbox_dead_lettered already serves
+-- the dead-letter pages and stays as is).
+DROP INDEX CONCURRENTLY IF EXISTS idx_outbox_pending;
+DROP INDEX CONCURRENTLY IF EXISTS idx_outbox_pending_partition;
@@ -0,0 +1,184 @@
+-- Monthly range partitioning for the append-only tables, keyed on the time a
+-- row was written: raw_payloads.fetched_at, events.ingested_at and
+-- outbox.created_at. All three default to NOW() and are written in one
+-- ingestion transaction, so an event, its raw payload and its outbox rows
+-- always land in the same month and retire together (app.core.partitions).
+--
+-- No rows are copied. Each existing table becomes its parent's "_legacy"
+-- partition, covering everything before next month. ATTACH scans each table
+-- once to check the range, under the locks taken below.
+--
+-- Unique constraints on a partitioned table must include the partition key,
+-- so the primary keys and the (event_id, topic) / delivery_seq uniques gain
+-- their time column. They still catch duplicates written in one transaction.
+-- delivery_seq values come from a sequence and stay unique anyway.
+
+LOCK TABLE raw_payloads, events, outbox IN ACCESS EXCLUSIVE MODE;
+
+-- A foreign key can't reference a partitioned table without its partition
+-- key, and retention drops an event together with its outbox rows anyway.
+ALTER TABLE outbox DROP CONSTRAINT IF EXISTS outbox_event_id_fkey;
+
+-- Re-created on the partitioned parent below.
+DROP TRIGGER IF EXISTS trg_outbox_stats_insert ON outbox;
+DROP TRIGGER IF EXISTS trg_outbox_stats_update ON outbox;
+DROP TRIGGER IF EXISTS trg_outbox_stats_delete ON outbox;
+
+-- ------------------------------------------------------------
+-- Move the current tables (and their index names) out of the way
+-- ------------------------------------------------------------
+
+ALTER TABLE raw_payloads RENAME TO raw_payloads_legacy;
+ALTER TABLE raw_payloads_legacy RENAME CONSTRAINT raw_payloads_pkey TO raw_payloads_legacy_pkey;
+ALTER INDEX idx_raw_payloads_source_fetched_at RENAME TO idx_raw_payloads_source_fetched_at_legacy;
+
+ALTER TABLE events RENAME TO events_legacy;
+ALTER TABLE events_legacy RENAME CONSTRAINT events_pkey TO events_legacy_pkey;
+ALTER INDEX idx_events_event_type_occurred_at RENAME TO idx_events_event_type_occurred_at_legacy;
+ALTER INDEX idx_events_entity RENAME TO idx_events_entity_legacy;
+ALTER INDEX idx_events_trace_id RENAME TO idx_events_trace_id_legacy;
+ALTER INDEX idx_events_occurred_at RENAME TO idx_events_occurred_at_legacy;
+ALTER INDEX idx_events_occurred_at_event_id RENAME TO idx_events_occurred_at_event_id_legacy;
+
+ALTER TABLE outbox RENAME TO outbox_legacy;
+ALTER TABLE outbox_legacy RENAME CONSTRAINT outbox_pkey TO outbox_legacy_pkey;
+ALTER INDEX uq_outbox_event_topic RENAME TO uq_outbox_event_topic_legacy;
+ALTER INDEX uq_outbox_delivery_seq RENAME TO uq_outbox_delivery_seq_legacy;
+ALTER INDEX idx_outbox_replay_job RENAME TO idx_outbox_replay_job_legacy;
+ALTER INDEX idx_outbox_dead_lettered RENAME TO idx_outbox_dead_lettered_legacy;
+ALTER INDEX idx_outbox_claimable RENAME TO idx_outbox_claimable_legacy;
+ALTER INDEX idx_outbox_claimable_ordered RENAME TO idx_outbox_claimable_ordered_legacy;
+ALTER INDEX idx_outbox_pending_entity RENAME TO idx_outbox_pending_entity_legacy;
+ALTER INDEX idx_outbox_delivered_entity RENAME TO idx_outbox_delivered_entity_legacy;
+
+-- ------------------------------------------------------------
+-- Partitioned parents
+-- ------------------------------------------------------------
+
+CREATE TABLE raw_payloads (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    source TEXT NOT NULL,
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    payload_json JSONB NOT NULL,
+    PRIMARY KEY (id, fetched_at)
+) PARTITION BY RANGE (fetched_at);
+
+CREATE TABLE events (
+    event_id UUID NOT NULL,
+    event_type TEXT NOT NULL,
+    source TEXT NOT NULL,
+    entity_id TEXT,
+    entity_type TEXT,
+    occurred_at TIMESTAMPTZ NOT NULL,
+    ingested_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    schema_version INT NOT NULL CONSTRAINT events_schema_version_check CHECK (schema_version >= 1),
+    trace_id UUID NOT NULL,
+    payload_json JSONB NOT NULL,
+    raw_payload_id UUID,
+    PRIMARY KEY (event_id, ingested_at)
+) PARTITION BY RANGE (ingested_at);
+
+CREATE TABLE outbox (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    event_id UUID NOT NULL,
+    topic TEXT NOT NULL,
+    payload_json JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    delivered_at TIMESTAMPTZ,
+    delivery_attempts INT NOT NULL DEFAULT 0 CONSTRAINT outbox_delivery_attempts_check CHECK (delivery_attempts >= 0),
+    last_error TEXT,
+    partition_key TEXT,
+    occurred_at TIMESTAMPTZ,
+    claimed_by TEXT,
+    claimed_until TIMESTAMPTZ,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    dead_lettered_at TIMESTAMPTZ,
+    replay_job_id UUID,
+    delivery_seq BIGINT,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Legacy partitions up to the start of next month (UTC), a default partition
+-- as a safety net, and three months ahead. app.core.partitions keeps
+-- creating months ahead from here on.
+DO $$
+DECLARE
+    boundary TIMESTAMPTZ := (date_trunc('month', NOW() AT TIME ZONE 'UTC') + INTERVAL '1 month') AT TIME ZONE 'UTC';
+    month_start TIMESTAMPTZ;
+    t TEXT;
+    i INT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['raw_payloads', 'events', 'outbox'] LOOP
+        EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (MINVALUE) TO (%L)', t, t || '_legacy', boundary);
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', t || '_default', t);
+        FOR i IN 0..2 LOOP
+            month_start := ((boundary AT TIME ZONE 'UTC') + make_interval(months => i)) AT TIME ZONE 'UTC';
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                t || '_p' || to_char(month_start AT TIME ZONE 'UTC', 'YYYY_MM'),
+                t,
+                month_start,
+                ((month_start AT TIME ZONE 'UTC') + INTERVAL '1 month') AT TIME ZONE 'UTC'
+            );
+        END LOOP;
+    END LOOP;
+END $$;
+
+-- ------------------------------------------------------------
+-- Parent indexes: the legacy partitions' equivalent indexes are attached,
+-- not rebuilt; every other partition gets its own copy.
+-- ------------------------------------------------------------
+
+CREATE INDEX idx_raw_payloads_source_fetched_at ON raw_payloads(source, fetched_at DESC);
+
+CREATE INDEX idx_events_event_type_occurred_at ON events(event_type, occurred_at DESC);
+CREATE INDEX idx_events_entity ON events(entity_id, entity_type);
+CREATE INDEX idx_events_trace_id ON events(trace_id);
+CREATE INDEX idx_events_occurred_at ON events(occurred_at DESC);
+CREATE INDEX idx_events_occurred_at_event_id ON events(occurred_at, event_id);
+
+CREATE UNIQUE INDEX uq_outbox_event_topic ON outbox(event_id, topic, created_at);
+CREATE UNIQUE INDEX uq_outbox_delivery_seq ON outbox(topic, delivery_seq, created_at)
+WHERE delivery_seq IS NOT NULL;
+CREATE INDEX idx_outbox_replay_job ON outbox(replay_job_id)
+WHERE replay_job_id IS NOT NULL;
+CREATE INDEX idx_outbox_dead_lettered ON outbox(dead_lettered_at DESC, id DESC)
+WHERE dead_lettered_at IS NOT NULL;
+CREATE INDEX idx_outbox_claimable ON outbox(created_at)
+INCLUDE (next_attempt_at, claimed_until)
+WHERE delivered_at IS NULL AND dead_lettered_at IS NULL;
+CREATE INDEX idx_outbox_claimable_ordered ON outbox(occurred_at, created_at)
+WHERE delivered_at IS NULL AND dead_lettered_at IS NULL;
+CREATE INDEX idx_outbox_pending_entity ON outbox(partition_key, occurred_at, created_at)
+INCLUDE (next_attempt_at)
+WHERE delivered_at IS NULL AND dead_lettered_at IS NULL;
+CREATE INDEX idx_outbox_delivered_entity ON outbox(partition_key, topic, delivered_at DESC)
+WHERE delivered_at IS NOT NULL;
+
+-- Superseded on the legacy partitions by the wider keys above.
+ALTER TABLE raw_payloads_legacy DROP CONSTRAINT raw_payloads_legacy_pkey;
+ALTER TABLE events_legacy DROP CONSTRAINT events_legacy_pkey;
+ALTER TABLE outbox_legacy DROP CONSTRAINT outbox_legacy_pkey;
+DROP INDEX uq_outbox_event_topic_legacy;
+DROP INDEX uq_outbox_delivery_seq_legacy;
+
+-- ------------------------------------------------------------
+-- Health counters follow the parent. Dropping or detaching a partition
+-- fires no triggers, so retired rows stay in the delivered/dead-lettered
+-- totals, which count every event ever settled.
+-- ------------------------------------------------------------
+
+CREATE TRIGGER trg_outbox_stats_insert
+AFTER INSERT ON outbox
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION outbox_stats_apply();
+
+CREATE TRIGGER trg_outbox_stats_update
+AFTER UPDATE ON outbox
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION outbox_stats_apply();
+
+CREATE TRIGGER trg_outbox_stats_delete
+AFTER DELETE ON outbox
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION outbox_stats_apply();
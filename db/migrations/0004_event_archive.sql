@@ -0,0 +1,8 @@
+-- Columnar archive of delivered events (app.core.archive). Every delivered
+-- event on `topic` with occurred_at < archived_until is in the Parquet
+-- archive; readers take that range from files and the rest from Postgres.
+CREATE TABLE IF NOT EXISTS event_archive_watermarks (
+    topic TEXT PRIMARY KEY,
+    archived_until TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,9 @@
+-- The outbox no longer keeps its own copy of the event envelope. Ingestion
+-- leaves payload_json NULL and the relay rebuilds the envelope from the
+-- events row it references (app.relay.repository.claim_pending). Rows
+-- written before this migration keep their copy and are published from it.
+--
+-- Dropping NOT NULL on the partitioned parent applies to every partition and
+-- only touches the catalog.
+
+ALTER TABLE outbox ALTER COLUMN payload_json DROP NOT NULL;
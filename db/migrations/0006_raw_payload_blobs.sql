@@ -0,0 +1,30 @@
+-- Content-addressed raw payloads (app.core.payload_blobs). Identical vendor
+-- payloads are stored once in raw_payload_blobs, keyed by the sha256 of their
+-- JSON text. raw_payloads keeps one small row per fetch that references the
+-- blob by content_hash. Rows written before this migration keep payload_json
+-- inline and have no content_hash.
+--
+-- Blobs are not partitioned: one may be referenced from several months.
+-- Partition maintenance deletes the ones no raw_payloads row references.
+
+CREATE TABLE IF NOT EXISTS raw_payload_blobs (
+    content_hash BYTEA PRIMARY KEY,
+    payload_json JSONB,
+    -- zlib-compressed JSON text, used instead of payload_json for large payloads
+    payload_zlib BYTEA,
+    -- uncompressed JSON text size
+    size_bytes INT NOT NULL,
+    first_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT raw_payload_blobs_one_body CHECK ((payload_json IS NULL) <> (payload_zlib IS NULL))
+);
+
+-- Already compressed; keep TOAST from trying again.
+ALTER TABLE raw_payload_blobs ALTER COLUMN payload_zlib SET STORAGE EXTERNAL;
+
+ALTER TABLE raw_payloads ADD COLUMN IF NOT EXISTS content_hash BYTEA;
+ALTER TABLE raw_payloads ALTER COLUMN payload_json DROP NOT NULL;
+
+-- Garbage collection's "still referenced?" probe. Existing rows all have a
+-- NULL hash, so building it only reads them once.
+CREATE INDEX IF NOT EXISTS idx_raw_payloads_content_hash ON raw_payloads(content_hash)
+WHERE content_hash IS NOT NULL;
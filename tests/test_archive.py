@@ -0,0 +1,186 @@
+import uuid
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+from app.core.archive import export_pending
+
+DAY = date(2026, 10, 1)
+
+
+def make_row(symbol, minute, day=DAY):
+    at = datetime.combine(day, datetime.min.time(), timezone.utc) + timedelta(minutes=minute)
+    return (
+        uuid.uuid4(), "MARKET_TICK_INGESTED", "yfinance", symbol, "equity",
+        at, 1, uuid.uuid4(), {"price": float(minute), "volume": 1, "currency": "USD"},
+        at + timedelta(seconds=1), minute,
+    )
+
+
+def make_mock_conn(rows):
+    mock_cursor = MagicMock()
+    mock_cursor.__iter__.return_value = iter(rows)
+    mock_conn = MagicMock()
+    mock_conn.__enter__ = lambda s: s
+    mock_conn.__exit__ = MagicMock(return_value=False)
+    mock_conn.cursor.return_value.__enter__ = lambda s: mock_cursor
+    mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+    return mock_conn, mock_cursor
+
+
+def export_pending_with(watermark=None, pending=None, first=None, advanced=True, **kwargs):
+    with patch("app.core.archive.archived_until", return_value=watermark), \
+         patch("app.core.archive._earliest_pending", return_value=pending), \
+         patch("app.core.archive._first_event_at", return_value=first), \
+         patch("app.core.archive.export_day", return_value=7) as mock_export, \
+         patch("app.core.archive._advance_watermark", return_value=advanced) as mock_mark:
+        exported = export_pending(**kwargs)
+    return exported, mock_export, mock_mark
+
+
+class TestExportPending:
+    def test_exports_each_due_day_and_advances_watermark(self):
+        now = datetime(2026, 10, 5, 9, 0, tzinfo=timezone.utc)
+        exported, mock_export, mock_mark = export_pending_with(
+            watermark=datetime(2026, 10, 1, tzinfo=timezone.utc), lag_days=2, now=now,
+        )
+
+        # Oct 3 is the last day older than two days
+        assert [e["day"] for e in exported] == ["2026-10-01", "2026-10-02"]
+        assert [c.args[0] for c in mock_export.call_args_list] == [date(2026, 10, 1), date(2026, 10, 2)]
+        # each step only moves the watermark from where the previous one left it
+        assert [c.args[1:] for c in mock_mark.call_args_list] == [
+            (datetime(2026, 10, 1, tzinfo=timezone.utc), datetime(2026, 10, 2, tzinfo=timezone.utc)),
+            (datetime(2026, 10, 2, tzinfo=timezone.utc), datetime(2026, 10, 3, tzinfo=timezone.utc)),
+        ]
+
+    def test_stops_at_day_with_undelivered_events(self):
+        now = datetime(2026, 10, 9, tzinfo=timezone.utc)
+        exported, _, mock_mark = export_pending_with(
+            watermark=datetime(2026, 10, 1, tzinfo=timezone.utc),
+            pending=datetime(2026, 10, 3, 14, 30, tzinfo=timezone.utc),
+            lag_days=2, now=now,
+        )
+        assert [e["day"] for e in exported] == ["2026-10-01", "2026-10-02"]
+        assert mock_mark.call_args_list[-1].args[2] == datetime(2026, 10, 3, tzinfo=timezone.utc)
+
+    def test_stops_when_watermark_is_rewound_concurrently(self):
+        now = datetime(2026, 10, 9, tzinfo=timezone.utc)
+        exported, mock_export, _ = export_pending_with(
+            watermark=datetime(2026, 10, 1, tzinfo=timezone.utc), advanced=False, lag_days=2, now=now,
+        )
+        assert exported == []
+        assert mock_export.call_count == 1
+
+    def test_starts_from_first_event_without_watermark(self):
+        now = datetime(2026, 10, 4, tzinfo=timezone.utc)
+        exported, _, mock_mark = export_pending_with(
+            first=datetime(2026, 10, 1, 15, tzinfo=timezone.utc), lag_days=2, now=now,
+        )
+        assert [e["day"] for e in exported] == ["2026-10-01"]
+        assert mock_mark.call_args.args[1] is None
+
+    def test_nothing_to_do_on_empty_store(self):
+        assert export_pending_with()[0] == []
+
+
+class TestParquetRoundTrip:
+    @pytest.fixture(autouse=True)
+    def pyarrow(self):
+        pytest.importorskip("pyarrow")
+
+    def export(self, tmp_path, rows, day=DAY):
+        from app.core.archive import export_day
+
+        # the export query orders by entity, then time
+        rows = sorted(rows, key=lambda r: (r[3], r[5]))
+        mock_conn, mock_cursor = make_mock_conn(rows)
+        with patch("app.core.archive.get_connection", return_value=mock_conn):
+            count = export_day(day, root=tmp_path)
+        return count, mock_cursor
+
+    def test_writes_one_file_per_symbol_per_day(self, tmp_path):
+        count, mock_cursor = self.export(tmp_path, [make_row("AAPL", 1), make_row("MSFT", 2), make_row("AAPL", 3)])
+        assert count == 3
+        assert mock_cursor.execute.call_args[0][1][1:] == (
+            datetime(2026, 10, 1, tzinfo=timezone.utc), datetime(2026, 10, 2, tzinfo=timezone.utc),
+        )
+        day_dir = tmp_path / "topic=market.ticks" / "date=2026-10-01"
+        assert sorted(p.name for p in day_dir.iterdir()) == ["entity_id=AAPL.parquet", "entity_id=MSFT.parquet"]
+
+    def test_reexport_merges_late_deliveries_into_the_day(self, tmp_path):
+        from app.core.archive import load_table
+
+        first, other = make_row("AAPL", 1), make_row("MSFT", 2)
+        self.export(tmp_path, [first, other])
+        # a requeued dead letter delivered late; MSFT's partition may be gone by now
+        late = make_row("AAPL", 0)
+        count, _ = self.export(tmp_path, [first, late])
+        assert count == 2
+
+        day_dir = tmp_path / "topic=market.ticks" / "date=2026-10-01"
+        assert sorted(p.name for p in day_dir.iterdir()) == ["entity_id=AAPL.parquet", "entity_id=MSFT.parquet"]
+        start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        table = load_table("market.ticks", start, start + timedelta(days=1), root=tmp_path)
+        assert table.column("event_id").to_pylist() == [str(late[0]), str(first[0]), str(other[0])]
+
+    def test_reexport_never_leaves_the_day_without_a_file(self, tmp_path):
+        import os
+
+        first, other = make_row("AAPL", 1), make_row("MSFT", 2)
+        self.export(tmp_path, [first, other])
+        day_dir = tmp_path / "topic=market.ticks" / "date=2026-10-01"
+        replaced = []
+        real_replace = os.replace
+
+        def checked_replace(src, dst):
+            # readers mid-export still see every symbol's file
+            assert sorted(p.name for p in day_dir.glob("entity_id=*.parquet")) == [
+                "entity_id=AAPL.parquet", "entity_id=MSFT.parquet",
+            ]
+            replaced.append(dst)
+            real_replace(src, dst)
+
+        with patch("app.core.archive.os.replace", side_effect=checked_replace):
+            self.export(tmp_path, [first, make_row("AAPL", 0)])
+        assert replaced == [day_dir / "entity_id=AAPL.parquet"]
+
+    def test_failed_reexport_keeps_archived_files(self, tmp_path):
+        first, other = make_row("AAPL", 1), make_row("MSFT", 2)
+        self.export(tmp_path, [first, other])
+        day_dir = tmp_path / "topic=market.ticks" / "date=2026-10-01"
+
+        with patch("app.core.archive.os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                self.export(tmp_path, [first, make_row("AAPL", 0)])
+        assert sorted(p.name for p in day_dir.iterdir()) == ["entity_id=AAPL.parquet", "entity_id=MSFT.parquet"]
+
+    def test_load_table_filters_range_and_symbols_in_replay_order(self, tmp_path):
+        from app.core.archive import load_table
+
+        rows = [make_row("MSFT", 5), make_row("AAPL", 1), make_row("AAPL", 9)]
+        self.export(tmp_path, rows)
+        start = datetime(2026, 10, 1, 0, 2, tzinfo=timezone.utc)
+        table = load_table("market.ticks", start, start + timedelta(hours=1), root=tmp_path)
+        assert table.column("entity_id").to_pylist() == ["MSFT", "AAPL"]
+
+        aapl = load_table("market.ticks", datetime(2026, 10, 1, tzinfo=timezone.utc), datetime(2026, 10, 2, tzinfo=timezone.utc),
+                          entity_ids=["AAPL"], root=tmp_path)
+        assert aapl.num_rows == 2
+
+    def test_iter_range_spans_days_and_resumes_after_key(self, tmp_path):
+        from app.core.archive import iter_range
+
+        next_day = DAY + timedelta(days=1)
+        first, second = make_row("AAPL", 1), make_row("AAPL", 2)
+        self.export(tmp_path, [first, second])
+        third = make_row("AAPL", 1, day=next_day)
+        self.export(tmp_path, [third], day=next_day)
+
+        start, end = datetime(2026, 10, 1, tzinfo=timezone.utc), datetime(2026, 10, 3, tzinfo=timezone.utc)
+        rows = list(iter_range("market.ticks", start, end, root=tmp_path))
+        assert [r[0] for r in rows] == [str(first[0]), str(second[0]), str(third[0])]
+        assert rows[0][8] == first[8]
+        assert rows[0][5] == first[5]
+
+        resumed = list(iter_range("market.ticks", start, end, after=(first[5].isoformat(), str(first[0])), root=tmp_path))
+        assert [r[0] for r in resumed] == [str(second[0]), str(third[0])]
@@ -0,0 +1,68 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock, AsyncMock
+from app.relay import async_repository
+from app.relay.repository import EVENT_TRACE_SQL, SYSTEM_HEALTH_SQL
+
+
+def make_mock_async_conn():
+    mock_cursor = MagicMock()
+    mock_cursor.execute = AsyncMock()
+    mock_cursor.fetchone = AsyncMock()
+    mock_cursor.fetchall = AsyncMock()
+    mock_conn = MagicMock()
+    mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
+    mock_conn.__aexit__ = AsyncMock(return_value=False)
+    mock_conn.cursor.return_value.__aenter__ = AsyncMock(return_value=mock_cursor)
+    mock_conn.cursor.return_value.__aexit__ = AsyncMock(return_value=False)
+    return mock_conn, mock_cursor
+
+
+class TestAsyncSystemHealth:
+    def test_shares_sync_sql_and_mapping(self):
+        mock_conn, mock_cursor = make_mock_async_conn()
+        mock_cursor.fetchone.return_value = (4, 1, 2, None)
+        with patch("app.relay.async_repository.get_async_connection", return_value=mock_conn):
+            health = asyncio.run(async_repository.get_system_health())
+        mock_cursor.execute.assert_awaited_once_with(SYSTEM_HEALTH_SQL)
+        assert health["delivered_events"] == 4
+        assert health["pending_events"] == 2
+
+
+class TestAsyncDeadLetters:
+    def test_page_with_next_cursor(self):
+        at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        rows = [
+            (uuid.uuid4(), "market.ticks", 5, "boom", at, "MARKET_TICK_INGESTED", "AAPL", at, uuid.uuid4())
+            for _ in range(3)
+        ]
+        mock_conn, mock_cursor = make_mock_async_conn()
+        mock_cursor.fetchall.return_value = rows
+        with patch("app.relay.async_repository.get_async_connection", return_value=mock_conn):
+            items, next_cursor = asyncio.run(async_repository.get_dead_letters_page(limit=2))
+        assert len(items) == 2
+        assert next_cursor is not None
+        assert mock_cursor.execute.await_args[0][1][-1] == 3
+
+
+class TestAsyncEventTraces:
+    def test_one_query_for_all_ids(self):
+        mock_conn, mock_cursor = make_mock_async_conn()
+        mock_cursor.fetchall.return_value = []
+        with patch("app.relay.async_repository.get_async_connection", return_value=mock_conn):
+            result = asyncio.run(async_repository.get_event_traces(["a", "b"]))
+        assert result == {}
+        mock_cursor.execute.assert_awaited_once_with(EVENT_TRACE_SQL, (["a", "b"],))
+
+    def test_single_trace_normalizes_event_id(self):
+        event_id = uuid.uuid4()
+        traces = AsyncMock(return_value={str(event_id): {"event": {}}})
+        with patch("app.relay.async_repository.get_event_traces", traces):
+            assert asyncio.run(async_repository.get_event_trace(str(event_id).upper())) == {"event": {}}
+        traces.assert_awaited_once_with([str(event_id)])
+
+    def test_empty_ids_skip_database(self):
+        with patch("app.relay.async_repository.get_async_connection") as mock_get:
+            assert asyncio.run(async_repository.get_event_traces([])) == {}
+            mock_get.assert_not_called()
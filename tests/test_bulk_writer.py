@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from app.ingestion.bulk_writer import bulk_write_events, copy_events
+from app.ingestion.run_ingestion import build_canonical_event
+
+
+def make_batch(n):
+    batch = []
+    for i in range(n):
+        raw = {
+            "symbol": f"S{i}",
+            "price": 100.0 + i,
+            "volume": 1000 + i,
+            "currency": "USD",
+            "occurred_at": "2026-03-01T15:59:00+00:00",
+        }
+        batch.append((raw, build_canonical_event(raw)))
+    return batch
+
+
+def make_mock_cursor(new_blobs=0):
+    mock_cursor = MagicMock(rowcount=new_blobs)
+    copies = []
+
+    def fake_copy(sql):
+        copy = MagicMock()
+        copy.__enter__ = lambda s: s
+        copy.__exit__ = MagicMock(return_value=False)
+        copies.append((sql, copy))
+        return copy
+
+    mock_cursor.copy.side_effect = fake_copy
+    return mock_cursor, copies
+
+
+class TestCopyEvents:
+    def test_one_copy_per_table_in_dependency_order(self):
+        mock_cursor, copies = make_mock_cursor()
+        copy_events(mock_cursor, make_batch(3))
+        tables = [sql.split()[1] for sql, _ in copies]
+        assert tables == ["raw_payloads", "events", "outbox"]
+        assert all(copy.write_row.call_count == 3 for _, copy in copies)
+
+    def test_outbox_rows_reference_their_events(self):
+        mock_cursor, copies = make_mock_cursor()
+        batch = make_batch(2)
+        copy_events(mock_cursor, batch)
+        event_ids = [c[0][0][0] for c in copies[1][1].write_row.call_args_list]
+        outbox_ids = [c[0][0][0] for c in copies[2][1].write_row.call_args_list]
+        assert event_ids == outbox_ids == [event["event_id"] for _, event in batch]
+
+    def test_outbox_rows_do_not_copy_the_event(self):
+        mock_cursor, copies = make_mock_cursor()
+        copy_events(mock_cursor, make_batch(1))
+        assert "payload_json" not in copies[2][0]
+        assert len(copies[2][1].write_row.call_args[0][0]) == 4
+
+    def test_writes_compact_json(self):
+        mock_cursor, copies = make_mock_cursor()
+        copy_events(mock_cursor, make_batch(1))
+        payload = copies[1][1].write_row.call_args[0][0][8]
+        assert payload == '{"price":100.0,"volume":1000,"currency":"USD"}'
+
+    def test_events_link_their_raw_payloads(self):
+        mock_cursor, copies = make_mock_cursor()
+        copy_events(mock_cursor, make_batch(2))
+        raw_ids = [c[0][0][0] for c in copies[0][1].write_row.call_args_list]
+        linked_ids = [c[0][0][-1] for c in copies[1][1].write_row.call_args_list]
+        assert raw_ids == linked_ids
+        assert len(set(raw_ids)) == 2
+
+    def test_repeated_payloads_share_one_blob(self):
+        mock_cursor, copies = make_mock_cursor(new_blobs=1)
+        raw = make_batch(1)[0][0]
+        # the same bar polled three times
+        batch = [(raw, build_canonical_event(raw)) for _ in range(3)]
+        copy_events(mock_cursor, batch)
+
+        blob_sql, (hashes, *_) = mock_cursor.execute.call_args_list[1][0]
+        assert "ON CONFLICT (content_hash) DO NOTHING" in blob_sql
+        assert "pg_advisory_xact_lock_shared" in blob_sql
+        assert len(hashes) == 1
+        raw_rows = [c[0][0] for c in copies[0][1].write_row.call_args_list]
+        assert len({row[0] for row in raw_rows}) == 3
+        assert {row[2] for row in raw_rows} == {hashes[0]}
+
+    def test_skips_events_already_stored_in_any_month(self):
+        mock_cursor, copies = make_mock_cursor()
+        batch = make_batch(3)
+        mock_cursor.fetchall.return_value = [(batch[1][1]["event_id"],)]
+        assert copy_events(mock_cursor, batch) == 2
+
+        sql, (ids,) = mock_cursor.execute.call_args_list[0][0]
+        assert "FROM events WHERE event_id = ANY" in sql
+        assert ids == [event["event_id"] for _, event in batch]
+        written = [c[0][0][0] for c in copies[1][1].write_row.call_args_list]
+        assert written == [batch[0][1]["event_id"], batch[2][1]["event_id"]]
+
+    def test_batch_of_stored_events_writes_nothing(self):
+        mock_cursor, copies = make_mock_cursor()
+        batch = make_batch(2)
+        mock_cursor.fetchall.return_value = [(event["event_id"],) for _, event in batch]
+        assert copy_events(mock_cursor, batch) == 0
+        assert copies == []
+        assert mock_cursor.execute.call_count == 1
+
+    def test_notifies_relay(self):
+        mock_cursor, _ = make_mock_cursor()
+        copy_events(mock_cursor, make_batch(1))
+        assert "pg_notify" in mock_cursor.execute.call_args[0][0]
+
+
+class TestBulkWriteEvents:
+    def test_empty_batch_skips_database(self):
+        with patch("app.ingestion.bulk_writer.get_connection") as mock_get:
+            assert bulk_write_events([]) == 0
+            mock_get.assert_not_called()
@@ -0,0 +1,57 @@
+import json
+import logging
+import pytest
+from app.core import codec
+from app.core.logger import JsonFormatter
+
+EVENT = {
+    "event_id": "0b6f8e0c-4c1e-4e55-9d59-2f0f3b1f7a10",
+    "entity_id": "AAPL",
+    "occurred_at": "2026-10-16T19:59:00+00:00",
+    "payload": {"price": 231.5, "volume": 1200, "currency": "USD"},
+}
+
+
+class TestJsonHelpers:
+    def test_round_trips_and_matches_stdlib(self):
+        text = codec.dumps(EVENT)
+        assert codec.loads(text) == EVENT
+        assert json.loads(text) == EVENT
+        assert " " not in codec.dumps(EVENT["payload"])
+
+    def test_default_handles_unknown_types(self):
+        assert codec.loads(codec.dumps({"at": object}, default=str)) == {"at": str(object)}
+
+
+class TestCodecs:
+    @pytest.mark.parametrize("name", ["json", "orjson"])
+    def test_json_codecs_agree(self, name):
+        pytest.importorskip(name)
+        encoded = codec.get_codec(name).encode(EVENT)
+        assert isinstance(encoded, bytes)
+        assert codec.get_codec(name).decode(encoded) == EVENT
+        assert encoded == codec.get_codec("json").encode(EVENT)
+
+    def test_msgpack_is_smaller(self):
+        pytest.importorskip("msgpack")
+        msgpack = codec.get_codec("msgpack")
+        assert msgpack.decode(msgpack.encode(EVENT)) == EVENT
+        assert len(msgpack.encode(EVENT)) < len(codec.get_codec("json").encode(EVENT))
+
+    def test_unknown_codec(self):
+        with pytest.raises(ValueError):
+            codec.get_codec("xml")
+
+    def test_register_codec(self):
+        upper = codec.Codec("upper", "text/plain", lambda obj: str(obj).upper().encode(), bytes.decode)
+        codec.register_codec(upper)
+        assert codec.get_codec("upper").encode("tick") == b"TICK"
+
+
+class TestJsonFormatter:
+    def test_one_compact_json_object_per_line(self):
+        record = logging.LogRecord("relay", logging.INFO, __file__, 1, "Published", None, None)
+        record.event_id = EVENT["event_id"]
+        line = JsonFormatter().format(record)
+        assert "\n" not in line
+        assert json.loads(line)["event_id"] == EVENT["event_id"]
@@ -0,0 +1,154 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+from app.consumers.cache import tick_cache
+from app.consumers.donna_wolf_consumer import (
+    get_delivered_history, get_latest_market_event, get_portfolio_snapshot, get_tick_history,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    tick_cache.clear()
+    yield
+    tick_cache.clear()
+
+
+def make_mock_conn():
+    mock_cursor = MagicMock()
+    mock_conn = MagicMock()
+    mock_conn.__enter__ = lambda s: s
+    mock_conn.__exit__ = MagicMock(return_value=False)
+    mock_conn.cursor.return_value.__enter__ = lambda s: mock_cursor
+    mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+    return mock_conn, mock_cursor
+
+
+def make_row(symbol, price=100.0):
+    ts = datetime(2026, 1, 2, 15, 30, tzinfo=timezone.utc)
+    return (
+        f"evt-{symbol}", f"trace-{symbol}", symbol, ts,
+        {"price": price, "volume": 10, "currency": "USD"}, ts,
+    )
+
+
+class TestGetPortfolioSnapshot:
+    def test_single_query_for_all_symbols(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [make_row("MSFT"), make_row("AAPL")]
+        with patch("app.consumers.donna_wolf_consumer.get_connection", return_value=mock_conn) as mock_get:
+            snapshot = get_portfolio_snapshot(["AAPL", "MSFT", "NVDA"])
+            assert mock_get.call_count == 1
+            assert mock_cursor.execute.call_count == 1
+            sql, params = mock_cursor.execute.call_args[0]
+            assert "FROM latest_ticks" in sql
+            assert params == (["AAPL", "MSFT", "NVDA"],)
+        # input order, symbols without a delivered tick omitted
+        assert [item["symbol"] for item in snapshot] == ["AAPL", "MSFT"]
+        assert snapshot[0]["price"] == 100.0
+        assert snapshot[0]["delivered_at"] == "2026-01-02T15:30:00+00:00"
+
+    def test_empty_symbols_skips_database(self):
+        with patch("app.consumers.donna_wolf_consumer.get_connection") as mock_get:
+            assert get_portfolio_snapshot([]) == []
+            mock_get.assert_not_called()
+
+
+class TestSnapshotCaching:
+    def test_repeat_reads_served_from_cache(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [make_row("AAPL")]
+        with patch("app.consumers.donna_wolf_consumer.get_connection", return_value=mock_conn) as mock_get:
+            first = get_portfolio_snapshot(["AAPL", "NVDA"])
+            second = get_portfolio_snapshot(["AAPL", "NVDA"])
+            assert mock_get.call_count == 1
+        assert first == second
+
+    def test_only_misses_are_fetched(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [make_row("AAPL")]
+        with patch("app.consumers.donna_wolf_consumer.get_connection", return_value=mock_conn):
+            get_portfolio_snapshot(["AAPL"])
+            mock_cursor.fetchall.return_value = [make_row("MSFT")]
+            snapshot = get_portfolio_snapshot(["AAPL", "MSFT"])
+            assert mock_cursor.execute.call_args[0][1] == (["MSFT"],)
+        assert [item["symbol"] for item in snapshot] == ["AAPL", "MSFT"]
+
+    def test_invalidated_symbol_is_refetched(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [make_row("AAPL", price=100.0)]
+        with patch("app.consumers.donna_wolf_consumer.get_connection", return_value=mock_conn):
+            get_portfolio_snapshot(["AAPL"])
+            tick_cache.invalidate("AAPL")
+            mock_cursor.fetchall.return_value = [make_row("AAPL", price=101.0)]
+            assert get_latest_market_event("AAPL")["price"] == 101.0
+
+    def test_bypass_cache(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [make_row("AAPL")]
+        with patch("app.consumers.donna_wolf_consumer.get_connection", return_value=mock_conn) as mock_get:
+            get_portfolio_snapshot(["AAPL"])
+            get_portfolio_snapshot(["AAPL"], use_cache=False)
+            assert mock_get.call_count == 2
+
+
+class TestGetLatestMarketEvent:
+    def test_returns_none_when_nothing_delivered(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = []
+        with patch("app.consumers.donna_wolf_consumer.get_connection", return_value=mock_conn):
+            assert get_latest_market_event("AAPL") is None
+
+    def test_returns_formatted_tick(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [make_row("AAPL", price=189.5)]
+        with patch("app.consumers.donna_wolf_consumer.get_connection", return_value=mock_conn):
+            event = get_latest_market_event("AAPL")
+        assert event["event_id"] == "evt-AAPL"
+        assert event["price"] == 189.5
+
+
+class TestGetDeliveredHistory:
+    def test_reads_delivered_rows_for_symbol_newest_first(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [make_row("AAPL", 101.0), make_row("AAPL", 100.0)]
+        with patch("app.consumers.donna_wolf_consumer.get_connection", return_value=mock_conn):
+            history = get_delivered_history("AAPL", limit=2)
+            sql, params = mock_cursor.execute.call_args[0]
+            assert "o.partition_key = %s" in sql
+            assert "ORDER BY o.delivered_at DESC" in sql
+            assert params == ("AAPL", 2)
+            assert [h["price"] for h in history] == [101.0, 100.0]
+
+
+class TestGetTickHistory:
+    def test_splits_range_between_archive_and_event_store(self):
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        watermark = datetime(2026, 1, 2, tzinfo=timezone.utc)
+        end = datetime(2026, 1, 3, tzinfo=timezone.utc)
+        ts = datetime(2026, 1, 1, 15, 30, tzinfo=timezone.utc)
+        archived = (
+            "evt-old", "MARKET_TICK_INGESTED", "yfinance", "AAPL", "equity",
+            ts, 1, "trace-old", {"price": 99.0, "volume": 10, "currency": "USD"}, ts, 1,
+        )
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [make_row("AAPL", 101.0)]
+        with patch("app.consumers.donna_wolf_consumer.archive.ARCHIVE_ENABLED", True), \
+             patch("app.consumers.donna_wolf_consumer.archive.archived_until", return_value=watermark), \
+             patch("app.consumers.donna_wolf_consumer.archive.iter_range", return_value=iter([archived])) as mock_iter, \
+             patch("app.consumers.donna_wolf_consumer.get_connection", return_value=mock_conn):
+            history = get_tick_history("AAPL", start, end)
+
+        assert mock_iter.call_args.args[1:4] == (start, watermark, ["AAPL"])
+        assert mock_cursor.execute.call_args[0][1] == ("AAPL", watermark, end)
+        assert [h["price"] for h in history] == [99.0, 101.0]
+        assert history[0]["trace_id"] == "trace-old"
+
+    def test_archive_disabled_reads_event_store_only(self):
+        start, end = datetime(2026, 1, 1, tzinfo=timezone.utc), datetime(2026, 1, 3, tzinfo=timezone.utc)
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = []
+        with patch("app.consumers.donna_wolf_consumer.archive.ARCHIVE_ENABLED", False), \
+             patch("app.consumers.donna_wolf_consumer.get_connection", return_value=mock_conn):
+            assert get_tick_history("AAPL", start, end) == []
+        assert mock_cursor.execute.call_args[0][1] == ("AAPL", start, end)
@@ -0,0 +1,68 @@
+from unittest.mock import MagicMock
+from app.consumers.cache import CacheInvalidator, TickCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTickCache:
+    def test_hit_and_miss(self):
+        cache = TickCache(max_entries=10, ttl_seconds=30)
+        cache.put_many({"AAPL": {"price": 1.0}, "NVDA": None}, cache.version)
+        found, missing = cache.get_many(["AAPL", "NVDA", "MSFT"])
+        assert found == {"AAPL": {"price": 1.0}, "NVDA": None}
+        assert missing == ["MSFT"]
+
+    def test_evicts_least_recently_used(self):
+        cache = TickCache(max_entries=2, ttl_seconds=30)
+        cache.put_many({"AAPL": {}, "MSFT": {}}, cache.version)
+        cache.get_many(["AAPL"])
+        cache.put_many({"NVDA": {}}, cache.version)
+        _, missing = cache.get_many(["AAPL", "MSFT", "NVDA"])
+        assert missing == ["MSFT"]
+        assert len(cache) == 2
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = TickCache(max_entries=10, ttl_seconds=5, clock=clock)
+        cache.put_many({"AAPL": {}}, cache.version)
+        clock.now = 5.0
+        _, missing = cache.get_many(["AAPL"])
+        assert missing == ["AAPL"]
+        assert len(cache) == 0
+
+    def test_invalidate_drops_entry(self):
+        cache = TickCache(max_entries=10, ttl_seconds=30)
+        cache.put_many({"AAPL": {}, "MSFT": {}}, cache.version)
+        cache.invalidate("AAPL")
+        _, missing = cache.get_many(["AAPL", "MSFT"])
+        assert missing == ["AAPL"]
+
+    def test_put_overtaken_by_invalidation_is_discarded(self):
+        cache = TickCache(max_entries=10, ttl_seconds=30)
+        version = cache.version
+        cache.invalidate("AAPL")
+        cache.put_many({"AAPL": {"price": 1.0}}, version)
+        _, missing = cache.get_many(["AAPL"])
+        assert missing == ["AAPL"]
+
+
+class TestCacheInvalidator:
+    def test_invalidates_notified_symbols(self):
+        cache = MagicMock()
+        invalidator = CacheInvalidator(cache)
+        mock_conn = MagicMock()
+
+        def fake_notifies(timeout=None):
+            invalidator._stop.set()
+            return iter([MagicMock(payload="AAPL"), MagicMock(payload="MSFT")])
+
+        mock_conn.notifies.side_effect = fake_notifies
+        invalidator._listen(mock_conn)
+
+        assert [c.args[0] for c in cache.invalidate.call_args_list] == ["AAPL", "MSFT"]
@@ -0,0 +1,140 @@
+import asyncio
+import json
+from decimal import Decimal
+from unittest.mock import AsyncMock
+from app.dashboard import DashboardFeed, DASHBOARD_QUEUE_SIZE
+from app.relay.repository import _health_from_row
+
+
+def make_stats(delivered=0, pending=0, dead=0):
+    # SUM() over outbox_stats comes back from psycopg as Decimal unless cast
+    return _health_from_row((Decimal(delivered), Decimal(dead), Decimal(pending), None))
+
+
+def make_dead_letter(event_id, at="2026-03-01T12:00:00+00:00"):
+    return {"event_id": event_id, "entity_id": "AAPL", "delivery_attempts": 5,
+            "last_error": "boom", "dead_lettered_at": at}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_feed(stats, dead_letters=None):
+    clock = FakeClock()
+    fetch_health = AsyncMock(side_effect=stats)
+    fetch_dead_letters = AsyncMock(side_effect=dead_letters or [[]])
+    feed = DashboardFeed(fetch_health=fetch_health, fetch_dead_letters=fetch_dead_letters, clock=clock)
+    return feed, fetch_health, fetch_dead_letters, clock
+
+
+class TestRefresh:
+    def test_first_refresh_builds_snapshot(self):
+        feed, _, fetch_dead_letters, _ = make_feed([make_stats(5, 1, 1)], [[make_dead_letter("a")]])
+        assert asyncio.run(feed.refresh()) is None
+        assert feed.state["stats"]["delivered_events"] == 5
+        assert [dl["event_id"] for dl in feed.state["dead_letters"]] == ["a"]
+        fetch_dead_letters.assert_awaited_once_with(None)
+
+    def test_update_carries_deltas_and_rate(self):
+        feed, _, fetch_dead_letters, clock = make_feed([make_stats(10, 5), make_stats(30, 1)])
+
+        async def run():
+            await feed.refresh()
+            clock.now = 2.0
+            return await feed.refresh()
+
+        update = asyncio.run(run())
+        assert update["deltas"] == {"delivered_events": 20, "pending_events": -4, "dead_lettered_events": 0}
+        assert update["delivery_rate"] == 10.0
+        # dead-letter count didn't move, so no dead-letter query
+        assert fetch_dead_letters.await_count == 1
+
+    def test_only_new_dead_letters_are_fetched_and_sent(self):
+        old = make_dead_letter("a", "2026-03-01T12:00:00+00:00")
+        new = make_dead_letter("b", "2026-03-01T12:05:00+00:00")
+        feed, _, fetch_dead_letters, clock = make_feed(
+            [make_stats(dead=1), make_stats(dead=2)], [[old], [new, old]],
+        )
+
+        async def run():
+            await feed.refresh()
+            clock.now = 1.0
+            return await feed.refresh()
+
+        update = asyncio.run(run())
+        assert [dl["event_id"] for dl in update["new_dead_letters"]] == ["b"]
+        assert fetch_dead_letters.await_args[0][0].minute == 0
+        assert [dl["event_id"] for dl in feed.state["dead_letters"]] == ["b", "a"]
+
+    def test_unchanged_state_sends_nothing(self):
+        feed, _, _, clock = make_feed([make_stats(1), make_stats(1)])
+
+        async def run():
+            await feed.refresh()
+            clock.now = 1.0
+            return await feed.refresh()
+
+        assert asyncio.run(run()) is None
+
+
+class TestSubscribers:
+    def test_all_viewers_share_one_producer(self):
+        stats = [make_stats(0)] + [make_stats(i) for i in range(1, 50)]
+        feed, fetch_health, _, clock = make_feed(stats)
+        feed.interval = 0.01
+
+        async def run():
+            a = await feed.subscribe()
+            b = await feed.subscribe()
+            assert (await a.get())[0] == "snapshot"
+            assert (await b.get())[0] == "snapshot"
+            clock.now = 1.0
+            kind_a, update_a = await asyncio.wait_for(a.get(), 1)
+            kind_b, update_b = await asyncio.wait_for(b.get(), 1)
+            feed.unsubscribe(a)
+            feed.unsubscribe(b)
+            await asyncio.sleep(0.05)
+            return kind_a, update_a, kind_b, update_b
+
+        kind_a, update_a, kind_b, update_b = asyncio.run(run())
+        assert kind_a == kind_b == "update"
+        assert update_a is update_b
+        assert feed._task is None
+        # one poll per tick for both viewers, not one each
+        assert fetch_health.await_count < 10
+
+    def test_slow_viewer_is_resynced_with_snapshot(self):
+        feed, _, _, _ = make_feed([make_stats(0)])
+
+        async def run():
+            queue = await feed.subscribe()
+            feed._task.cancel()
+            for i in range(DASHBOARD_QUEUE_SIZE + 1):
+                feed._broadcast({"n": i})
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        items = asyncio.run(run())
+        assert items[0][0] == "snapshot"
+        assert len(items) < DASHBOARD_QUEUE_SIZE
+
+
+class TestStream:
+    def test_snapshot_is_valid_json(self):
+        feed, _, _, _ = make_feed([make_stats(5, 1, 1)], [[make_dead_letter("a")]])
+
+        async def first_event():
+            stream = feed.stream()
+            try:
+                return await stream.__anext__()
+            finally:
+                await stream.aclose()
+
+        event = asyncio.run(first_event())
+        assert event.startswith("event: snapshot\n")
+        data = json.loads(event.split("data: ", 1)[1])
+        assert data["stats"]["delivered_events"] == 5
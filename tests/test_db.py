@@ -0,0 +1,41 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from psycopg_pool import PoolTimeout
+from app.core import db
+
+
+def make_mock_pool():
+    mock_conn = MagicMock()
+    mock_conn.__enter__ = lambda s: s
+    mock_conn.__exit__ = MagicMock(return_value=False)
+    mock_pool = MagicMock()
+    mock_pool.getconn.return_value = mock_conn
+    mock_pool.get_stats.return_value = {"pool_size": 2, "pool_available": 1, "requests_waiting": 0}
+    return mock_pool, mock_conn
+
+
+class TestGetConnection:
+    def test_borrows_and_returns_connection(self):
+        mock_pool, mock_conn = make_mock_pool()
+        with patch("app.core.db.get_pool", return_value=mock_pool):
+            with db.get_connection() as conn:
+                assert conn is mock_conn
+            mock_pool.putconn.assert_called_once_with(mock_conn)
+
+    def test_returns_connection_on_error(self):
+        mock_pool, mock_conn = make_mock_pool()
+        with patch("app.core.db.get_pool", return_value=mock_pool):
+            with pytest.raises(RuntimeError):
+                with db.get_connection():
+                    raise RuntimeError("boom")
+            mock_pool.putconn.assert_called_once_with(mock_conn)
+
+    def test_counts_pool_timeouts(self):
+        mock_pool, _ = make_mock_pool()
+        mock_pool.getconn.side_effect = PoolTimeout("no connection")
+        before = db.db_pool_timeouts.labels(pool="sync")._value.get()
+        with patch("app.core.db.get_pool", return_value=mock_pool):
+            with pytest.raises(PoolTimeout):
+                with db.get_connection():
+                    pass
+        assert db.db_pool_timeouts.labels(pool="sync")._value.get() == before + 1
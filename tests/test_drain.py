@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import patch
+from app.relay.drain import AdaptiveBatchSizer, drain_outbox
+
+
+def make_result(claimed, failed=0, latency=0.02):
+    return {
+        "claimed": claimed,
+        "delivered": claimed - failed,
+        "failed": failed,
+        "deferred": 0,
+        "mean_publish_seconds": latency,
+    }
+
+
+class TestAdaptiveBatchSizer:
+    def test_grows_on_full_healthy_batch(self):
+        sizer = AdaptiveBatchSizer(initial=100, min_size=10, max_size=1000)
+        assert sizer.update(make_result(100)) == 200
+
+    def test_capped_at_max_size(self):
+        sizer = AdaptiveBatchSizer(initial=800, min_size=10, max_size=1000)
+        assert sizer.update(make_result(800)) == 1000
+
+    def test_shrinks_on_slow_publishes(self):
+        sizer = AdaptiveBatchSizer(initial=100, min_size=10, max_size=1000, target_publish_seconds=0.1)
+        assert sizer.update(make_result(100, latency=0.5)) == 50
+
+    def test_shrinks_on_high_error_rate(self):
+        sizer = AdaptiveBatchSizer(initial=100, min_size=10, max_size=1000, max_error_rate=0.2)
+        assert sizer.update(make_result(100, failed=50)) == 50
+
+    def test_holds_on_short_batch(self):
+        sizer = AdaptiveBatchSizer(initial=100, min_size=10, max_size=1000)
+        assert sizer.update(make_result(40)) == 100
+
+
+class TestDrainOutbox:
+    def test_keeps_claiming_while_batches_are_full(self):
+        sizer = AdaptiveBatchSizer(initial=10, min_size=10, max_size=1000)
+        results = [make_result(10), make_result(20), make_result(5)]
+        with patch("app.relay.drain.run_relay", side_effect=results) as mock_relay:
+            with patch("app.relay.drain.count_pending", return_value=0):
+                totals = drain_outbox(sizer)
+        assert [c.kwargs["limit"] for c in mock_relay.call_args_list] == [10, 20, 40]
+        assert totals["batches"] == 3
+        assert totals["delivered"] == 35
+
+    def test_stops_on_empty_outbox(self):
+        with patch("app.relay.drain.run_relay", return_value=make_result(0)) as mock_relay:
+            with patch("app.relay.drain.count_pending", return_value=0):
+                totals = drain_outbox(AdaptiveBatchSizer(initial=10))
+        assert mock_relay.call_count == 1
+        assert totals["claimed"] == 0
+
+    def test_reports_backlog(self):
+        with patch("app.relay.drain.run_relay", return_value=make_result(3)):
+            with patch("app.relay.drain.count_pending", return_value=42):
+                totals = drain_outbox(AdaptiveBatchSizer(initial=10))
+        assert totals["backlog"] == 42
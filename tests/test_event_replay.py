@@ -0,0 +1,192 @@
+import uuid
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+from app.relay.event_replay import _page_query, replay_running, run_replay
+
+
+@pytest.fixture(autouse=True)
+def lock_conn():
+    """The dedicated connection run_replay() holds the replay's advisory lock on."""
+    mock_conn = MagicMock()
+    mock_conn.__enter__ = lambda s: s
+    mock_conn.__exit__ = MagicMock(return_value=False)
+    mock_conn.execute.return_value.fetchone.return_value = (True,)
+    with patch("app.relay.event_replay.psycopg.connect", return_value=mock_conn):
+        yield mock_conn
+
+
+def make_mock_conn(pages):
+    """Each get_connection() call serves the next page of rows through the cursor."""
+    conns = []
+    for rows in pages:
+        mock_cursor = MagicMock()
+        mock_cursor.__iter__.return_value = iter(rows)
+        mock_conn = MagicMock()
+        mock_conn.__enter__ = lambda s: s
+        mock_conn.__exit__ = MagicMock(return_value=False)
+        mock_conn.cursor.return_value.__enter__ = lambda s, c=mock_cursor: c
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+        conns.append(mock_conn)
+    return conns
+
+
+def make_event_row(i):
+    at = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i)
+    return (
+        uuid.uuid4(), "MARKET_TICK_INGESTED", "yfinance", "AAPL", "equity",
+        at, 1, uuid.uuid4(), {"price": 1.0, "volume": 1, "currency": "USD"},
+    )
+
+
+def make_replay(**overrides):
+    replay = {
+        "name": "backfill",
+        "topic": "market.ticks",
+        "entity_ids": None,
+        "start_at": "2026-01-01T00:00:00+00:00",
+        "end_at": "2026-02-01T00:00:00+00:00",
+        "rate_per_second": 0,
+        "last_occurred_at": None,
+        "last_event_id": None,
+        "published": 0,
+        "status": "running",
+    }
+    replay.update(overrides)
+    return replay
+
+
+class TestPageQuery:
+    def test_resumes_after_checkpoint_key(self):
+        event_id = str(uuid.uuid4())
+        sql, params = _page_query(make_replay(entity_ids=["AAPL"]), ("2026-01-05T00:00:00+00:00", event_id))
+        assert "(e.occurred_at, e.event_id) > (%s, %s::uuid)" in sql
+        assert "ORDER BY e.occurred_at, e.event_id" in sql
+        assert params[3] == ["AAPL"]
+        assert params[4:6] == ["2026-01-05T00:00:00+00:00", event_id]
+
+
+class TestRunReplay:
+    def test_publishes_pages_and_checkpoints_each(self):
+        rows = [make_event_row(i) for i in range(3)]
+        publisher = MagicMock()
+        with patch("app.relay.event_replay.EVENT_REPLAY_PAGE_SIZE", 2), \
+             patch("app.relay.event_replay.get_replay", return_value=make_replay()), \
+             patch("app.relay.event_replay.get_connection", side_effect=make_mock_conn([rows[:2], rows[2:]])), \
+             patch("app.relay.event_replay._save_checkpoint") as mock_save:
+            run_replay("backfill", publisher=publisher)
+
+        assert publisher.call_count == 3
+        assert publisher.call_args_list[0][0][0]["event_id"] == str(rows[0][0])
+        assert [c.args[3:5] for c in mock_save.call_args_list] == [(2, "running"), (1, "completed")]
+        assert mock_save.call_args_list[0].args[2] == str(rows[1][0])
+
+    def test_publish_failure_checkpoints_progress_and_stops(self):
+        rows = [make_event_row(i) for i in range(3)]
+        publisher = MagicMock(side_effect=[None, RuntimeError("downstream down")])
+        with patch("app.relay.event_replay.get_replay", return_value=make_replay()), \
+             patch("app.relay.event_replay.get_connection", side_effect=make_mock_conn([rows])), \
+             patch("app.relay.event_replay._save_checkpoint") as mock_save:
+            run_replay("backfill", publisher=publisher)
+
+        args = mock_save.call_args.args
+        assert args[2] == str(rows[0][0])
+        assert args[3:] == (1, "failed", "downstream down")
+
+    def test_stop_request_leaves_replay_resumable(self):
+        rows = [make_event_row(i) for i in range(3)]
+        with patch("app.relay.event_replay.get_replay", return_value=make_replay()), \
+             patch("app.relay.event_replay.get_connection", side_effect=make_mock_conn([rows])), \
+             patch("app.relay.event_replay._save_checkpoint") as mock_save:
+            run_replay("backfill", should_stop=lambda: True, publisher=MagicMock())
+
+        assert mock_save.call_args.args[3:5] == (0, "stopped")
+
+    def test_completed_replay_is_not_rerun(self):
+        with patch("app.relay.event_replay.get_replay", return_value=make_replay(status="completed")), \
+             patch("app.relay.event_replay.get_connection") as mock_get:
+            run_replay("backfill")
+            mock_get.assert_not_called()
+
+    def test_replay_running_elsewhere_is_skipped(self, lock_conn):
+        lock_conn.execute.return_value.fetchone.return_value = (False,)
+        publisher = MagicMock()
+        with patch("app.relay.event_replay.get_replay", return_value=make_replay()), \
+             patch("app.relay.event_replay.get_connection") as mock_get, \
+             patch("app.relay.event_replay._save_checkpoint") as mock_save:
+            result = run_replay("backfill", publisher=publisher)
+
+        assert result["skipped"] is True
+        publisher.assert_not_called()
+        mock_get.assert_not_called()
+        mock_save.assert_not_called()
+        assert not any("unlock" in c.args[0] for c in lock_conn.execute.call_args_list)
+
+    def test_lock_is_released_after_run(self, lock_conn):
+        with patch("app.relay.event_replay.get_replay", return_value=make_replay()), \
+             patch("app.relay.event_replay.get_connection", side_effect=make_mock_conn([[]])), \
+             patch("app.relay.event_replay._save_checkpoint"):
+            run_replay("backfill", publisher=MagicMock())
+
+        sql, params = lock_conn.execute.call_args.args
+        assert "pg_advisory_unlock" in sql
+        assert params == ("backfill",)
+
+    def test_unknown_replay_raises(self):
+        with patch("app.relay.event_replay.get_replay", return_value=None):
+            with pytest.raises(ValueError):
+                run_replay("missing")
+
+
+class TestArchiveReplay:
+    def test_reads_archive_below_watermark_then_event_store(self):
+        archived = [make_event_row(i) for i in range(2)]
+        hot = [make_event_row(60 * 24 * 10)]
+        watermark = datetime(2026, 1, 10, tzinfo=timezone.utc)
+        publisher = MagicMock()
+        conns = make_mock_conn([hot])
+        with patch("app.relay.event_replay.archive.ARCHIVE_ENABLED", True), \
+             patch("app.relay.event_replay.archive.archived_until", return_value=watermark), \
+             patch("app.relay.event_replay.archive.read_page", return_value=archived) as mock_read, \
+             patch("app.relay.event_replay.get_replay", return_value=make_replay()), \
+             patch("app.relay.event_replay.get_connection", side_effect=conns), \
+             patch("app.relay.event_replay._save_checkpoint") as mock_save:
+            run_replay("backfill", publisher=publisher)
+
+        assert [c.args[0]["event_id"] for c in publisher.call_args_list] == [str(r[0]) for r in archived + hot]
+        assert mock_read.call_args.args[2] == watermark
+        # the event store page starts at the watermark, not at the replay start
+        with conns[0].cursor() as cur:
+            sql, params = cur.execute.call_args[0]
+        assert params[1] == watermark
+        assert [c.args[3:5] for c in mock_save.call_args_list] == [(2, "running"), (1, "completed")]
+
+    def test_watermark_before_range_skips_archive(self):
+        with patch("app.relay.event_replay.archive.ARCHIVE_ENABLED", True), \
+             patch("app.relay.event_replay.archive.archived_until", return_value=datetime(2025, 1, 1, tzinfo=timezone.utc)), \
+             patch("app.relay.event_replay.archive.read_page") as mock_read, \
+             patch("app.relay.event_replay.get_replay", return_value=make_replay()), \
+             patch("app.relay.event_replay.get_connection", side_effect=make_mock_conn([[]])), \
+             patch("app.relay.event_replay._save_checkpoint"):
+            run_replay("backfill", publisher=MagicMock())
+        mock_read.assert_not_called()
+
+
+class TestReplayRunning:
+    def test_held_lock_means_running(self):
+        mock_cursor = MagicMock()
+        mock_conn = make_mock_conn([[]])[0]
+        mock_conn.cursor.return_value.__enter__ = lambda s: mock_cursor
+        mock_cursor.fetchone.return_value = (False,)
+        with patch("app.relay.event_replay.get_connection", return_value=mock_conn):
+            assert replay_running("backfill") is True
+        assert mock_cursor.execute.call_count == 1
+
+    def test_free_lock_is_released_again(self):
+        mock_cursor = MagicMock()
+        mock_conn = make_mock_conn([[]])[0]
+        mock_conn.cursor.return_value.__enter__ = lambda s: mock_cursor
+        mock_cursor.fetchone.return_value = (True,)
+        with patch("app.relay.event_replay.get_connection", return_value=mock_conn):
+            assert replay_running("backfill") is False
+        assert "pg_advisory_unlock" in mock_cursor.execute.call_args.args[0]
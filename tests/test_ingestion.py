@@ -36,17 +36,153 @@ class TestFetchMarketData:
 class TestIngestSymbol:
     def test_returns_event_id_and_trace_id(self):
         with patch("app.ingestion.run_ingestion.yf.Ticker", side_effect=mock_yfinance_ticker):
-            with patch("app.ingestion.run_ingestion.psycopg.connect") as mock_conn:
+            with patch("app.ingestion.run_ingestion.get_connection") as mock_conn:
                 mock_conn.return_value.__enter__ = lambda s: s
                 mock_conn.return_value.__exit__ = MagicMock(return_value=False)
                 mock_conn.return_value.transaction = MagicMock()
                 mock_conn.return_value.transaction.return_value.__enter__ = lambda s: s
                 mock_conn.return_value.transaction.return_value.__exit__ = MagicMock(return_value=False)
-                mock_cursor = MagicMock()
+                mock_cursor = MagicMock(rowcount=1)
                 mock_conn.return_value.cursor.return_value.__enter__ = lambda s: mock_cursor
                 mock_conn.return_value.cursor.return_value.__exit__ = MagicMock(return_value=False)
 
                 result = ingest_symbol("AAPL")
                 assert "event_id" in result
                 assert "trace_id" in result
-                assert result["symbol"] == "AAPL"
\ No newline at end of file
+                assert result["symbol"] == "AAPL"
+
+def make_bars():
+    import pandas as pd
+    import numpy as np
+    from datetime import datetime, timezone
+
+    index = pd.DatetimeIndex([
+        datetime(2026, 3, 1, 15, 58, tzinfo=timezone.utc),
+        datetime(2026, 3, 1, 15, 59, tzinfo=timezone.utc),
+    ])
+    columns = pd.MultiIndex.from_product([["Close", "Volume"], ["AAPL", "TSLA", "DEAD"]])
+    data = [
+        [255.10, 180.00, np.nan, 1000, 500, np.nan],
+        [255.82, np.nan, np.nan, 1420615, np.nan, np.nan],
+    ]
+    return pd.DataFrame(data, index=index, columns=columns)
+
+
+class TestLatestTicks:
+    def test_takes_last_valid_bar_per_symbol(self):
+        from app.ingestion.sources import latest_ticks
+        ticks = latest_ticks(make_bars()).set_index("symbol")
+        assert ticks.loc["AAPL", "price"] == 255.82
+        assert ticks.loc["AAPL", "volume"] == 1420615
+        # TSLA's last bar has no close, so the earlier bar is used
+        assert ticks.loc["TSLA", "price"] == 180.00
+        assert str(ticks.loc["TSLA", "occurred_at"]) == "2026-03-01 15:58:00+00:00"
+
+    def test_drops_symbols_without_data(self):
+        from app.ingestion.sources import latest_ticks
+        ticks = latest_ticks(make_bars())
+        assert "DEAD" not in set(ticks["symbol"])
+
+
+class TestMarketDataSource:
+    def test_is_abstract(self):
+        from app.ingestion.sources import MarketDataSource
+
+        with pytest.raises(TypeError):
+            MarketDataSource()
+
+        class Incomplete(MarketDataSource):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+
+class TestIngestBatch:
+    def test_writes_whole_batch_in_one_bulk_write(self):
+        from app.ingestion.run_ingestion import ingest_batch
+        from app.ingestion.sources import StaticSource
+
+        with patch("app.ingestion.run_ingestion.bulk_write_events") as mock_write:
+            results = ingest_batch(["AAPL", "TSLA", "DEAD"], source=StaticSource(make_bars()))
+
+            mock_write.assert_called_once()
+            batch = mock_write.call_args[0][0]
+            assert [raw["symbol"] for raw, _ in batch] == ["AAPL", "TSLA"]
+            assert [r["symbol"] for r in results] == ["AAPL", "TSLA"]
+            assert [r["event_id"] for r in results] == [event["event_id"] for _, event in batch]
+
+    def test_reports_every_symbol_missing_when_source_has_no_data(self):
+        from app.ingestion.run_ingestion import ingest_batch
+        from app.ingestion.sources import StaticSource
+
+        for symbols in (["GONE", "NOPE"], ["DEAD"]):
+            with patch("app.ingestion.bulk_writer.get_connection") as mock_get:
+                assert ingest_batch(symbols, source=StaticSource(make_bars())) == []
+                mock_get.assert_not_called()
+
+    def test_raw_payload_shape_matches_single_symbol_path(self):
+        from app.ingestion.run_ingestion import ticks_to_raw_payloads
+        from app.ingestion.sources import latest_ticks
+        payloads = ticks_to_raw_payloads(latest_ticks(make_bars()))
+        assert payloads[0] == {
+            "symbol": "AAPL",
+            "price": 255.82,
+            "volume": 1420615,
+            "currency": "USD",
+            "occurred_at": "2026-03-01T15:59:00+00:00",
+        }
+        assert type(payloads[0]["volume"]) is int
+
+
+class TestRunIngestion:
+    def test_one_failure_does_not_block_others(self):
+        from app.ingestion.run_ingestion import run_ingestion
+
+        def fake_ingest(symbol):
+            if symbol == "BAD":
+                raise ValueError("No market data returned for BAD")
+            return {"event_id": "e", "trace_id": "t", "symbol": symbol}
+
+        with patch("app.ingestion.run_ingestion.ingest_symbol", side_effect=fake_ingest):
+            results = run_ingestion(["AAPL", "BAD", "TSLA"], max_workers=3)
+            assert [r["symbol"] for r in results] == ["AAPL", "TSLA"]
+
+    def test_symbols_fetched_in_parallel(self):
+        import time
+        from app.ingestion.run_ingestion import run_ingestion
+
+        def slow_ingest(symbol):
+            time.sleep(0.1)
+            return {"event_id": "e", "trace_id": "t", "symbol": symbol}
+
+        with patch("app.ingestion.run_ingestion.ingest_symbol", side_effect=slow_ingest):
+            start = time.perf_counter()
+            results = run_ingestion([f"S{i}" for i in range(5)], max_workers=5)
+            assert time.perf_counter() - start < 0.3
+            assert len(results) == 5
+
+    def test_latency_and_failures_labelled_by_symbol(self):
+        from app.ingestion.run_ingestion import run_ingestion
+
+        def fake_ingest(symbol):
+            if symbol == "BAD":
+                raise ValueError("No market data returned for BAD")
+            return {"event_id": "e", "trace_id": "t", "symbol": symbol}
+
+        with patch("app.ingestion.run_ingestion.ingest_symbol", side_effect=fake_ingest), \
+             patch("app.ingestion.run_ingestion.ingest_latency_seconds") as mock_latency, \
+             patch("app.ingestion.run_ingestion.ingest_failures") as mock_failures:
+            run_ingestion(["AAPL", "BAD"], max_workers=1)
+        mock_latency.labels.assert_called_once_with(source="yfinance", symbol="AAPL")
+        mock_failures.labels.assert_called_once_with(source="yfinance", symbol="BAD")
+
+    def test_fetch_goes_through_source_rate_limiter(self):
+        from app.ingestion.run_ingestion import fetch_market_data
+        limiter = MagicMock()
+        limiter.acquire.return_value = 0.0
+        with patch("app.ingestion.run_ingestion.get_rate_limiter", return_value=limiter) as mock_get:
+            with patch("app.ingestion.run_ingestion.yf.Ticker", side_effect=mock_yfinance_ticker):
+                fetch_market_data("AAPL")
+        mock_get.assert_called_once_with("yfinance")
+        limiter.acquire.assert_called_once()
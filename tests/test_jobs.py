@@ -0,0 +1,59 @@
+import threading
+import time
+from app.core.jobs import JobRunner
+
+
+def wait_for(runner, job_id, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = runner.get(job_id)
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+class TestJobRunner:
+    def test_records_result(self):
+        runner = JobRunner(max_workers=1)
+        job = runner.submit("relay", lambda x: {"claimed": x}, 3)
+        assert job["status"] == "queued"
+        done = wait_for(runner, job["job_id"])
+        assert done["status"] == "succeeded"
+        assert done["result"] == {"claimed": 3}
+        runner.shutdown()
+
+    def test_records_failure(self):
+        def boom():
+            raise RuntimeError("vendor down")
+
+        runner = JobRunner(max_workers=1)
+        done = wait_for(runner, runner.submit("ingest", boom)["job_id"])
+        assert done["status"] == "failed"
+        assert done["error"] == "vendor down"
+        runner.shutdown()
+
+    def test_coalesces_active_job_of_same_kind(self):
+        release = threading.Event()
+        runner = JobRunner(max_workers=1)
+        first = runner.submit("relay", release.wait, coalesce=True)
+        second = runner.submit("relay", release.wait, coalesce=True)
+        other = runner.submit("ingest", lambda: None, coalesce=True)
+        assert second["job_id"] == first["job_id"]
+        assert other["job_id"] != first["job_id"]
+        release.set()
+        wait_for(runner, first["job_id"])
+        runner.shutdown()
+
+    def test_forgets_oldest_finished_jobs(self):
+        runner = JobRunner(max_workers=1, history=2)
+        ids = [runner.submit("relay", lambda: None)["job_id"] for _ in range(3)]
+        wait_for(runner, ids[-1])
+        runner.submit("relay", lambda: None)
+        assert runner.get(ids[0]) is None
+        runner.shutdown(wait=True)
+
+    def test_unknown_job(self):
+        runner = JobRunner(max_workers=1)
+        assert runner.get("missing") is None
+        runner.shutdown()
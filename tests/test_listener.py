@@ -0,0 +1,65 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from app.relay.listener import RelayListener, _next_wait_seconds, RELAY_MAX_IDLE_SECONDS
+
+
+class TestNextWaitSeconds:
+    def test_idle_when_nothing_pending(self):
+        with patch("app.relay.listener.seconds_until_next_attempt", return_value=None):
+            assert _next_wait_seconds() == RELAY_MAX_IDLE_SECONDS
+
+    def test_wakes_for_next_retry(self):
+        with patch("app.relay.listener.seconds_until_next_attempt", return_value=4.5):
+            assert _next_wait_seconds() == 4.5
+
+    def test_never_busy_polls(self):
+        with patch("app.relay.listener.seconds_until_next_attempt", return_value=-3.0):
+            assert _next_wait_seconds() > 0
+
+
+class TestRelayListener:
+    def test_drains_on_each_wake_up(self):
+        drain = MagicMock()
+        listener = RelayListener(drain=drain)
+        mock_conn = MagicMock()
+        waits = []
+
+        def fake_notifies(timeout=None, stop_after=None):
+            if stop_after:
+                waits.append(timeout)
+                if len(waits) == 2:
+                    listener._stop.set()
+                return iter([MagicMock()])
+            return iter([])
+
+        mock_conn.notifies.side_effect = fake_notifies
+        with patch("app.relay.listener.seconds_until_next_attempt", return_value=2.0):
+            listener._listen(mock_conn)
+
+        assert drain.call_count == 2
+        # each wait is sliced so a stop request is noticed
+        assert waits == [1.0, 1.0]
+
+    def test_idle_wait_ends_on_stop(self):
+        listener = RelayListener(drain=MagicMock())
+        mock_conn = MagicMock()
+        slices = []
+
+        def fake_notifies(timeout=None, stop_after=None):
+            slices.append(timeout)
+            if len(slices) == 2:
+                # SIGTERM arrives mid-wait
+                listener.stop(timeout=0, wake=False)
+            return iter([])
+
+        mock_conn.notifies.side_effect = fake_notifies
+        listener._wait(mock_conn, 30.0)
+        assert slices == [1.0, 1.0]
+
+    def test_idle_wait_runs_to_deadline_without_notifications(self):
+        listener = RelayListener(drain=MagicMock())
+        mock_conn = MagicMock()
+        mock_conn.notifies.return_value = iter([])
+        with patch("app.relay.listener.time.monotonic", side_effect=[100.0, 100.0, 101.0, 102.0, 102.5]):
+            listener._wait(mock_conn, 2.5)
+        assert [c.kwargs["timeout"] for c in mock_conn.notifies.call_args_list] == [1.0, 1.0, 0.5]
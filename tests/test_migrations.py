@@ -0,0 +1,98 @@
+import pytest
+from unittest.mock import MagicMock
+from app.core.migrations import MIGRATIONS_DIR, discover, migrate, split_statements
+
+
+def write(directory, name, sql):
+    (directory / name).write_text(sql)
+
+
+def make_conn(applied=()):
+    conn = MagicMock()
+
+    def execute(sql, params=None):
+        result = MagicMock()
+        result.fetchall.return_value = list(applied) if "FROM schema_migrations" in sql else []
+        return result
+
+    conn.execute.side_effect = execute
+    return conn
+
+
+def executed(conn):
+    return [c[0][0] for c in conn.execute.call_args_list]
+
+
+class TestDiscover:
+    def test_orders_by_version_and_detects_no_transaction(self, tmp_path):
+        write(tmp_path, "0002_indexes.sql", "-- migrate: no-transaction\nCREATE INDEX CONCURRENTLY i ON t(a);\n")
+        write(tmp_path, "0001_baseline.sql", "CREATE TABLE t (a INT);\n")
+        migrations = discover(tmp_path)
+        assert [(m["version"], m["name"], m["transactional"]) for m in migrations] == [
+            (1, "baseline", True),
+            (2, "indexes", False),
+        ]
+
+    def test_rejects_badly_named_files(self, tmp_path):
+        write(tmp_path, "baseline.sql", "SELECT 1;")
+        with pytest.raises(RuntimeError):
+            discover(tmp_path)
+
+    def test_rejects_duplicate_versions(self, tmp_path):
+        write(tmp_path, "0001_a.sql", "SELECT 1;")
+        write(tmp_path, "0001_b.sql", "SELECT 2;")
+        with pytest.raises(RuntimeError):
+            discover(tmp_path)
+
+    def test_shipped_index_migration_builds_concurrently(self):
+        migrations = discover(MIGRATIONS_DIR)
+        assert [m["version"] for m in migrations][:2] == [1, 2]
+        indexes = migrations[1]
+        assert not indexes["transactional"]
+        creates = [s for s in split_statements(indexes["sql"]) if s.startswith("CREATE INDEX")]
+        assert creates and all("CONCURRENTLY" in s for s in creates)
+
+
+class TestSplitStatements:
+    def test_splits_on_trailing_semicolons_and_drops_comments(self):
+        sql = "-- migrate: no-transaction\n-- note\nCREATE INDEX CONCURRENTLY a\nON t(x);\n\nDROP INDEX b;\n"
+        assert split_statements(sql) == ["CREATE INDEX CONCURRENTLY a\nON t(x)", "DROP INDEX b"]
+
+
+class TestMigrate:
+    def test_applies_only_pending_migrations_in_a_transaction(self, tmp_path):
+        write(tmp_path, "0001_a.sql", "CREATE TABLE a (x INT);")
+        write(tmp_path, "0002_b.sql", "CREATE TABLE b (x INT);")
+        checksum = discover(tmp_path)[0]["checksum"]
+        conn = make_conn(applied=[(1, checksum)])
+
+        assert migrate(conn, directory=tmp_path) == [2]
+        sqls = executed(conn)
+        assert "CREATE TABLE b (x INT);" in sqls
+        assert "CREATE TABLE a (x INT);" not in sqls
+        assert conn.transaction.call_count == 1
+        assert "pg_advisory_lock" in sqls[0]
+        assert "pg_advisory_unlock" in sqls[-1]
+
+    def test_no_transaction_migration_runs_statement_by_statement(self, tmp_path):
+        write(tmp_path, "0001_idx.sql", "-- migrate: no-transaction\nCREATE INDEX CONCURRENTLY a ON t(x);\nCREATE INDEX CONCURRENTLY b ON t(y);\n")
+        conn = make_conn()
+
+        migrate(conn, directory=tmp_path)
+        sqls = executed(conn)
+        assert "CREATE INDEX CONCURRENTLY a ON t(x)" in sqls
+        assert "CREATE INDEX CONCURRENTLY b ON t(y)" in sqls
+        conn.transaction.assert_not_called()
+
+    def test_target_stops_early(self, tmp_path):
+        write(tmp_path, "0001_a.sql", "SELECT 1;")
+        write(tmp_path, "0002_b.sql", "SELECT 2;")
+        assert migrate(make_conn(), target=1, directory=tmp_path) == [1]
+
+    def test_edited_migration_raises_and_releases_lock(self, tmp_path):
+        write(tmp_path, "0001_a.sql", "SELECT 1;")
+        conn = make_conn(applied=[(1, "stale-checksum")])
+
+        with pytest.raises(RuntimeError):
+            migrate(conn, directory=tmp_path)
+        assert "pg_advisory_unlock" in executed(conn)[-1]
@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+from app.consumers.offsets import commit_offset, get_offset, iter_delivered, read_since
+
+
+def make_mock_conn():
+    mock_cursor = MagicMock()
+    mock_conn = MagicMock()
+    mock_conn.__enter__ = lambda s: s
+    mock_conn.__exit__ = MagicMock(return_value=False)
+    mock_conn.cursor.return_value.__enter__ = lambda s: mock_cursor
+    mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+    return mock_conn, mock_cursor
+
+
+def make_row(seq, symbol="AAPL"):
+    ts = datetime(2026, 1, 2, 15, 30, tzinfo=timezone.utc)
+    return (seq, f"evt-{seq}", f"trace-{seq}", symbol, ts, {"price": 1.0}, ts)
+
+
+class TestGetOffset:
+    def test_defaults_to_zero_for_new_consumer(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchone.return_value = None
+        with patch("app.consumers.offsets.get_connection", return_value=mock_conn):
+            assert get_offset("wolf") == 0
+
+    def test_returns_committed_offset(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchone.return_value = (42,)
+        with patch("app.consumers.offsets.get_connection", return_value=mock_conn):
+            assert get_offset("wolf") == 42
+
+
+class TestCommitOffset:
+    def test_offset_never_moves_backwards(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        with patch("app.consumers.offsets.get_connection", return_value=mock_conn):
+            commit_offset("wolf", 7)
+            sql, params = mock_cursor.execute.call_args[0]
+            assert "GREATEST(consumer_offsets.last_seq, EXCLUDED.last_seq)" in sql
+            assert params == ("wolf", "market.ticks", 7)
+
+
+class TestIterDelivered:
+    def test_keyset_read_on_server_side_cursor(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.__iter__.return_value = iter([make_row(5), make_row(6)])
+        with patch("app.consumers.offsets.get_connection", return_value=mock_conn):
+            events = list(iter_delivered(4, limit=100))
+            assert "name" in mock_conn.cursor.call_args.kwargs
+            sql, params = mock_cursor.execute.call_args[0]
+            assert "o.delivery_seq > %s" in sql
+            assert "ORDER BY o.delivery_seq" in sql
+            assert params == ("market.ticks", 4, 100)
+        assert [e["delivery_seq"] for e in events] == [5, 6]
+        assert events[0]["symbol"] == "AAPL"
+
+
+class TestReadSince:
+    def test_reads_from_committed_offset(self):
+        with patch("app.consumers.offsets.get_offset", return_value=10), \
+             patch("app.consumers.offsets.iter_delivered", return_value=iter([{"delivery_seq": 11}])) as mock_iter:
+            batch = read_since("wolf", max_batch=50)
+            mock_iter.assert_called_once_with(10, limit=50, topic="market.ticks")
+        assert batch == [{"delivery_seq": 11}]
@@ -0,0 +1,137 @@
+import threading
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from psycopg.errors import LockNotAvailable
+from app.core.partitions import (
+    PartitionMaintainer, add_months, ensure_partitions, list_partitions, month_start, retire_partitions,
+)
+
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+
+
+def bound(start, end):
+    return f"FOR VALUES FROM ('{start} 00:00:00+00') TO ('{end} 00:00:00+00')"
+
+
+def make_conn(partitions, pending=(), lock_busy=()):
+    """partitions: table -> [(name, bound)]; pending / lock_busy: outbox or events partition names."""
+    conn = MagicMock()
+
+    def execute(sql, params=None):
+        result = MagicMock()
+        if "pg_inherits" in sql:
+            result.fetchall.return_value = [(name, b, 8192) for name, b in partitions[params[0]]]
+        elif "LOCK TABLE" in sql and any(p in sql for p in lock_busy):
+            raise LockNotAvailable("lock timeout")
+        elif "SELECT EXISTS" in sql:
+            result.fetchone.return_value = (any(p in sql for p in pending),)
+        return result
+
+    conn.execute.side_effect = execute
+    return conn
+
+
+def executed(conn):
+    return [c[0][0] for c in conn.execute.call_args_list]
+
+
+def monthly(table, *months):
+    parts = [(f"{table}_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-06-01 00:00:00+00')"), (f"{table}_default", "DEFAULT")]
+    for start, end in months:
+        parts.append((f"{table}_p{start[:7].replace('-', '_')}", bound(start, end)))
+    return parts
+
+
+class TestMonthMath:
+    def test_month_start_is_utc_first_of_month(self):
+        assert month_start(NOW) == datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+    def test_add_months_crosses_years(self):
+        assert add_months(datetime(2026, 11, 1, tzinfo=timezone.utc), 2) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+        assert add_months(datetime(2026, 1, 1, tzinfo=timezone.utc), -1) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+
+
+class TestListPartitions:
+    def test_parses_upper_bounds_oldest_first_default_last(self):
+        conn = make_conn({"outbox": monthly("outbox", ("2026-06-01", "2026-07-01"))})
+        parts = list_partitions(conn, "outbox")
+        assert [p["name"] for p in parts] == ["outbox_legacy", "outbox_p2026_06", "outbox_default"]
+        assert parts[1]["upper"] == datetime(2026, 7, 1, tzinfo=timezone.utc)
+        assert parts[2]["upper"] is None
+
+
+class TestEnsurePartitions:
+    def test_creates_only_missing_months(self):
+        existing = [("2026-10-01", "2026-11-01")]
+        conn = make_conn({t: monthly(t, *existing) for t in ("outbox", "events", "raw_payloads")})
+        created = ensure_partitions(conn, months_ahead=1, now=NOW)
+        assert sorted(created) == ["events_p2026_11", "outbox_p2026_11", "raw_payloads_p2026_11"]
+        create_sql = [s for s in executed(conn) if s.startswith("CREATE TABLE outbox_p2026_11")]
+        assert "FROM ('2026-11-01T00:00:00+00:00') TO ('2026-12-01T00:00:00+00:00')" in create_sql[0]
+
+
+class TestRetirePartitions:
+    MONTHS = [("2026-06-01", "2026-07-01"), ("2026-07-01", "2026-08-01"), ("2026-08-01", "2026-09-01")]
+
+    def conn(self, **kwargs):
+        return make_conn({t: monthly(t, *self.MONTHS) for t in ("outbox", "events", "raw_payloads")}, **kwargs)
+
+    def test_drops_settled_months_past_retention(self):
+        conn = self.conn()
+        retired = retire_partitions(conn, retention_months=3, mode="drop", now=NOW, require_archive=False)
+        # cutoff is 2026-07-01: the legacy partition and June retire, July and August stay
+        assert retired == [
+            "outbox_legacy", "events_legacy", "raw_payloads_legacy",
+            "outbox_p2026_06", "events_p2026_06", "raw_payloads_p2026_06",
+        ]
+        sqls = executed(conn)
+        assert "ALTER TABLE events DETACH PARTITION events_p2026_06" in sqls
+        assert "DROP TABLE raw_payloads_p2026_06" in sqls
+        assert not any("p2026_07" in s for s in sqls if "DETACH" in s)
+
+    def test_keeps_month_with_pending_rows(self):
+        conn = self.conn(pending=("outbox_p2026_06",))
+        retired = retire_partitions(conn, retention_months=3, mode="drop", now=NOW, require_archive=False)
+        assert "outbox_p2026_06" not in retired
+        assert "outbox_legacy" in retired
+
+    def test_archive_mode_moves_instead_of_dropping(self):
+        conn = self.conn()
+        retire_partitions(conn, retention_months=3, mode="archive", now=NOW, require_archive=False)
+        sqls = executed(conn)
+        assert "ALTER TABLE outbox_p2026_06 SET SCHEMA archive" in sqls
+        assert not any(s.startswith("DROP TABLE") for s in sqls)
+
+    def test_lock_timeout_skips_month_until_next_run(self):
+        conn = self.conn(lock_busy=("outbox_legacy",))
+        retired = retire_partitions(conn, retention_months=3, mode="drop", now=NOW, require_archive=False)
+        assert retired == ["outbox_p2026_06", "events_p2026_06", "raw_payloads_p2026_06"]
+
+    def test_keeps_month_not_yet_archived(self):
+        conn = self.conn(pending=("events_p2026_06",))
+        retired = retire_partitions(conn, retention_months=3, mode="drop", now=NOW, require_archive=True)
+        assert retired == ["outbox_legacy", "events_legacy", "raw_payloads_legacy"]
+        assert any("event_archive_watermarks" in s for s in executed(conn))
+
+    def test_rejects_unknown_mode(self):
+        with pytest.raises(ValueError):
+            retire_partitions(self.conn(), mode="truncate", now=NOW)
+
+
+class TestPartitionMaintainer:
+    def test_keeps_running_after_a_failed_run(self):
+        calls = []
+        done = threading.Event()
+
+        def maintain():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("db down")
+            done.set()
+
+        maintainer = PartitionMaintainer(interval=0.01, maintain=maintain)
+        maintainer.start()
+        assert done.wait(2)
+        maintainer.stop()
+        assert not maintainer.running
@@ -0,0 +1,78 @@
+import hashlib
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from app.core import payload_blobs
+from app.core.codec import dumps
+from app.core.partitions import collect_blobs
+
+PAYLOAD = {"symbol": "AAPL", "price": 231.5, "volume": 1200, "currency": "USD",
+           "occurred_at": "2026-10-16T19:59:00+00:00"}
+
+
+class TestEncode:
+    def test_hash_is_sha256_of_the_json_text(self):
+        text = dumps(PAYLOAD)
+        blob = payload_blobs.encode(text)
+        assert blob.content_hash == hashlib.sha256(text.encode()).digest()
+        assert blob.payload_json == text
+        assert blob.payload_zlib is None
+
+    def test_compresses_large_payloads_when_enabled(self):
+        text = dumps({"bars": [PAYLOAD] * 50})
+        blob = payload_blobs.encode(text, compression="zlib", min_bytes=1024)
+        assert blob.payload_json is None
+        assert len(blob.payload_zlib) < blob.size_bytes == len(text)
+        assert payload_blobs.decode(None, blob.payload_zlib) == {"bars": [PAYLOAD] * 50}
+
+    def test_small_payloads_stay_uncompressed(self):
+        blob = payload_blobs.encode(dumps(PAYLOAD), compression="zlib", min_bytes=1024)
+        assert blob.payload_zlib is None
+
+
+class TestWriteBlobs:
+    def test_one_insert_for_distinct_payloads(self):
+        cur = MagicMock(rowcount=1)
+        blobs = [payload_blobs.encode(dumps(PAYLOAD))] * 3 + [payload_blobs.encode(dumps({**PAYLOAD, "volume": 1300}))]
+        assert payload_blobs.write_blobs(cur, blobs) == 1
+        assert cur.execute.call_count == 1
+        hashes, texts, zlibs, sizes = cur.execute.call_args[0][1]
+        assert len(hashes) == 2
+        assert zlibs == [None, None]
+
+    def test_empty_batch_skips_database(self):
+        cur = MagicMock()
+        assert payload_blobs.write_blobs(cur, []) == 0
+        cur.execute.assert_not_called()
+
+
+class TestCollectGarbage:
+    def make_conn(self, counts):
+        conn = MagicMock()
+        results = iter(counts)
+
+        def execute(sql, params=None):
+            result = MagicMock()
+            if "DELETE" in sql:
+                result.rowcount = next(results)
+            return result
+
+        conn.execute.side_effect = execute
+        return conn
+
+    def test_deletes_in_batches_under_exclusive_lock(self):
+        conn = self.make_conn([2, 1])
+        assert payload_blobs.collect_garbage(conn, older_than=datetime(2026, 7, 1, tzinfo=timezone.utc), batch_size=2) == 3
+        sqls = [c[0][0] for c in conn.execute.call_args_list]
+        assert sqls[0] == "SELECT pg_advisory_xact_lock(hashtext('raw_payload_blobs'))"
+        assert sum("DELETE" in s for s in sqls) == 2
+
+    def test_partition_maintenance_collects_before_retention_cutoff(self):
+        conn = self.make_conn([0])
+        collect_blobs(conn, retention_months=3, mode="drop", now=datetime(2026, 10, 18, tzinfo=timezone.utc))
+        delete = [c for c in conn.execute.call_args_list if "DELETE" in c[0][0]][0]
+        assert delete[0][1][0] == datetime(2026, 7, 1, tzinfo=timezone.utc)
+
+    def test_archive_mode_keeps_blobs(self):
+        conn = self.make_conn([])
+        assert collect_blobs(conn, mode="archive") == 0
+        conn.execute.assert_not_called()
@@ -0,0 +1,26 @@
+import time
+import pytest
+from app.core.rate_limit import TokenBucket
+
+
+class TestTokenBucket:
+    def test_burst_is_not_throttled(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+        assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+    def test_throttles_past_burst(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+        bucket.acquire()
+        start = time.perf_counter()
+        waited = bucket.acquire()
+        assert waited > 0
+        assert time.perf_counter() - start >= 0.04
+
+    def test_try_acquire_does_not_block(self):
+        bucket = TokenBucket(rate=0.001, capacity=1)
+        assert bucket.try_acquire() is True
+        assert bucket.try_acquire() is False
+
+    def test_zero_rate_disables_limit(self):
+        bucket = TokenBucket(rate=0, capacity=1)
+        assert all(bucket.acquire() == 0.0 for _ in range(100))
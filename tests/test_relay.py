@@ -3,21 +3,30 @@ from unittest.mock import patch, MagicMock, call
 from app.relay.run_relay import run_relay
 
 
-def make_mock_event():
+def make_mock_event(entity_id=None):
     import uuid
+    payload = {"price": 255.82, "volume": 1420615}
+    if entity_id:
+        payload["entity_id"] = entity_id
     return (
-        "outbox-id-123",
+        f"outbox-id-{uuid.uuid4()}",
         uuid.uuid4(),
         "market.ticks",
-        {"price": 255.82, "volume": 1420615},
+        payload,
         1
     )
 
 
+@pytest.fixture(autouse=True)
+def mock_release():
+    with patch("app.relay.run_relay.release_claimed_many") as mock_release:
+        yield mock_release
+
+
 class TestRunRelay:
     def test_no_events_does_nothing(self):
         with patch("app.relay.run_relay.claim_pending", return_value=[]):
-            with patch("app.relay.run_relay.mark_delivered") as mock_delivered:
+            with patch("app.relay.run_relay.mark_delivered_many") as mock_delivered:
                 run_relay()
                 mock_delivered.assert_not_called()
 
@@ -25,26 +34,136 @@ class TestRunRelay:
         event = make_mock_event()
         with patch("app.relay.run_relay.claim_pending", return_value=[event]):
             with patch("app.relay.run_relay.publish", return_value=None):
-                with patch("app.relay.run_relay.mark_delivered") as mock_delivered:
-                    with patch("app.relay.run_relay.mark_failed") as mock_failed:
+                with patch("app.relay.run_relay.mark_delivered_many") as mock_delivered:
+                    with patch("app.relay.run_relay.mark_failed_many") as mock_failed:
                         run_relay()
-                        mock_delivered.assert_called_once_with(event[0])
-                        mock_failed.assert_not_called()
+                        mock_delivered.assert_called_once_with([event[0]])
+                        assert mock_failed.call_args[0][0] == []
 
     def test_failed_publish_marks_failed(self):
         event = make_mock_event()
         with patch("app.relay.run_relay.claim_pending", return_value=[event]):
             with patch("app.relay.run_relay.publish", side_effect=Exception("transport error")):
-                with patch("app.relay.run_relay.mark_delivered") as mock_delivered:
-                    with patch("app.relay.run_relay.mark_failed") as mock_failed:
+                with patch("app.relay.run_relay.mark_delivered_many") as mock_delivered:
+                    with patch("app.relay.run_relay.mark_failed_many") as mock_failed:
                         run_relay()
-                        mock_failed.assert_called_once()
-                        mock_delivered.assert_not_called()
+                        assert mock_failed.call_args[0][0] == [(event[0], 2, "transport error")]
+                        mock_delivered.assert_called_once_with([])
 
     def test_multiple_events_processed_independently(self):
         events = [make_mock_event(), make_mock_event(), make_mock_event()]
         with patch("app.relay.run_relay.claim_pending", return_value=events):
             with patch("app.relay.run_relay.publish", return_value=None):
-                with patch("app.relay.run_relay.mark_delivered") as mock_delivered:
-                    run_relay()
-                    assert mock_delivered.call_count == 3
\ No newline at end of file
+                with patch("app.relay.run_relay.mark_delivered_many") as mock_delivered:
+                    with patch("app.relay.run_relay.mark_failed_many"):
+                        run_relay()
+                        assert len(mock_delivered.call_args[0][0]) == 3
+
+    def test_batch_finalized_in_one_call_each(self):
+        events = [make_mock_event(), make_mock_event(), make_mock_event()]
+        with patch("app.relay.run_relay.claim_pending", return_value=events):
+            with patch("app.relay.run_relay.publish", side_effect=[None, Exception("boom"), None]):
+                with patch("app.relay.run_relay.mark_delivered_many") as mock_delivered:
+                    with patch("app.relay.run_relay.mark_failed_many") as mock_failed:
+                        run_relay()
+                        assert mock_delivered.call_count == 1
+                        assert mock_failed.call_count == 1
+                        assert len(mock_delivered.call_args[0][0]) == 2
+                        assert len(mock_failed.call_args[0][0]) == 1
+
+    def test_publishes_concurrently_up_to_in_flight_limit(self):
+        import time
+        events = [make_mock_event() for _ in range(5)]
+        with patch("app.relay.run_relay.claim_pending", return_value=events):
+            with patch("app.relay.run_relay.publish", side_effect=lambda p: time.sleep(0.1)):
+                with patch("app.relay.run_relay.mark_delivered_many") as mock_delivered:
+                    with patch("app.relay.run_relay.mark_failed_many"):
+                        start = time.perf_counter()
+                        run_relay(max_in_flight=5)
+                        assert time.perf_counter() - start < 0.3
+                        assert len(mock_delivered.call_args[0][0]) == 5
+
+    def test_preserve_order_defers_events_behind_failure(self, mock_release):
+        first, second = make_mock_event("AAPL"), make_mock_event("AAPL")
+        other = make_mock_event("TSLA")
+        published = []
+
+        def fake_publish(payload):
+            published.append(payload)
+            if payload is first[3]:
+                raise Exception("transport error")
+
+        with patch("app.relay.run_relay.claim_pending", return_value=[first, second, other]):
+            with patch("app.relay.run_relay.publish", side_effect=fake_publish):
+                with patch("app.relay.run_relay.mark_delivered_many") as mock_delivered:
+                    with patch("app.relay.run_relay.mark_failed_many") as mock_failed:
+                        run_relay(max_in_flight=4, preserve_order=True)
+                        assert all(p is not second[3] for p in published)
+                        mock_delivered.assert_called_once_with([other[0]])
+                        assert mock_failed.call_args[0][0] == [(first[0], 2, "transport error")]
+                        assert mock_release.call_args[0][0] == [(second[0], first[0])]
+
+    def test_without_ordering_failures_do_not_block_entity(self, mock_release):
+        first, second = make_mock_event("AAPL"), make_mock_event("AAPL")
+
+        def fake_publish(payload):
+            if payload is first[3]:
+                raise Exception("transport error")
+
+        with patch("app.relay.run_relay.claim_pending", return_value=[first, second]):
+            with patch("app.relay.run_relay.publish", side_effect=fake_publish):
+                with patch("app.relay.run_relay.mark_delivered_many") as mock_delivered:
+                    with patch("app.relay.run_relay.mark_failed_many"):
+                        run_relay(max_in_flight=4, preserve_order=False)
+                        mock_delivered.assert_called_once_with([second[0]])
+                        assert mock_release.call_args[0][0] == []
+
+    def test_claims_only_own_partition(self):
+        with patch("app.relay.run_relay.claim_pending", return_value=[]) as mock_claim:
+            run_relay(limit=25, partition=(1, 3))
+            assert mock_claim.call_args.kwargs["limit"] == 25
+            assert mock_claim.call_args.kwargs["partition"] == (1, 3)
+
+    def test_claims_in_entity_order_when_preserving_order(self):
+        with patch("app.relay.run_relay.claim_pending", return_value=[]) as mock_claim:
+            run_relay(preserve_order=True)
+            assert mock_claim.call_args.kwargs["preserve_order"] is True
+            run_relay(preserve_order=False)
+            assert mock_claim.call_args.kwargs["preserve_order"] is False
+
+    def test_finalizes_under_the_claiming_lease(self, mock_release):
+        event = make_mock_event()
+        with patch("app.relay.run_relay.claim_pending", return_value=[event]) as mock_claim:
+            with patch("app.relay.run_relay.publish", side_effect=Exception("transport error")):
+                with patch("app.relay.run_relay.mark_delivered_many"):
+                    with patch("app.relay.run_relay.mark_failed_many") as mock_failed:
+                        run_relay()
+                        token = mock_claim.call_args.kwargs["claimed_by"]
+                        assert mock_failed.call_args.kwargs["claimed_by"] == token
+                        assert mock_release.call_args.kwargs["claimed_by"] == token
+
+    def test_lost_lease_failure_is_not_counted(self):
+        kept, lost = make_mock_event(), make_mock_event()
+        with patch("app.relay.run_relay.claim_pending", return_value=[kept, lost]):
+            with patch("app.relay.run_relay.publish", side_effect=Exception("transport error")):
+                with patch("app.relay.run_relay.mark_delivered_many"):
+                    with patch("app.relay.run_relay.mark_failed_many", return_value={kept[0]: False}):
+                        with patch("app.relay.run_relay.events_failed") as mock_failed_metric, \
+                             patch("app.relay.run_relay.events_dead_lettered") as mock_dead_metric:
+                            run_relay()
+                            assert mock_failed_metric.inc.call_count == 1
+                            mock_dead_metric.inc.assert_not_called()
+
+    def test_dead_letter_metric_follows_recorded_outcome(self):
+        event = (*make_mock_event()[:4], 4)
+        with patch("app.relay.run_relay.claim_pending", return_value=[event]):
+            with patch("app.relay.run_relay.publish", side_effect=Exception("transport error")):
+                with patch("app.relay.run_relay.mark_delivered_many"):
+                    with patch("app.relay.run_relay.mark_failed_many", return_value={}):
+                        with patch("app.relay.run_relay.events_dead_lettered") as mock_dead_metric:
+                            run_relay()
+                            mock_dead_metric.inc.assert_not_called()
+                    with patch("app.relay.run_relay.mark_failed_many", return_value={event[0]: True}):
+                        with patch("app.relay.run_relay.events_dead_lettered") as mock_dead_metric:
+                            run_relay()
+                            mock_dead_metric.inc.assert_called_once()
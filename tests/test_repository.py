@@ -1,6 +1,14 @@
+import re
 import pytest
 from unittest.mock import patch, MagicMock
-from app.relay.repository import mark_delivered, mark_failed, get_dead_letters, get_event_trace
+from datetime import datetime, timezone
+from app.relay.repository import (
+    claim_pending, mark_delivered, mark_delivered_many, mark_failed, mark_failed_many,
+    release_claimed_many, replay_dead_letters, get_replay_job,
+    get_dead_letters, get_event_trace, get_event_traces, get_system_health, count_pending,
+    get_dead_letters_page, iter_dead_letters, encode_dead_letter_cursor, decode_dead_letter_cursor,
+    seconds_until_next_attempt, NOT_BLOCKED_SQL,
+)
 
 
 def make_mock_conn():
@@ -18,21 +26,210 @@ def make_mock_conn():
 class TestMarkDelivered:
     def test_executes_update(self):
         mock_conn, mock_cursor = make_mock_conn()
-        with patch("app.relay.repository.psycopg.connect", return_value=mock_conn):
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
             mark_delivered("some-outbox-id")
             assert mock_cursor.execute.called
 
 
+class TestClaimPending:
+    def test_claims_in_single_statement(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = []
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            claim_pending(limit=1000)
+            assert mock_cursor.execute.call_count == 1
+            sql = mock_cursor.execute.call_args[0][0]
+            assert "FOR UPDATE SKIP LOCKED" in sql
+            assert "delivery_attempts + 1" in sql
+
+
+    def test_partitioned_claim_filters_and_orders_by_entity(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = []
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            claim_pending(limit=50, partition=(2, 4))
+            sql, params = mock_cursor.execute.call_args[0]
+            assert "hashtext" in sql
+            assert "NOT EXISTS" in sql
+            assert "ORDER BY claimed.occurred_at, claimed.created_at" in sql
+            assert params[2:] == (4, 2, 50)
+
+
+    def test_ordered_claim_skips_entities_behind_a_retry(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = []
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            claim_pending(limit=50, preserve_order=True)
+            sql, params = mock_cursor.execute.call_args[0]
+            assert NOT_BLOCKED_SQL in sql
+            assert "ORDER BY o.occurred_at, o.created_at" in sql
+            assert "ORDER BY claimed.occurred_at, claimed.created_at" in sql
+            assert params[2:] == (50,)
+
+    def test_unordered_claim_does_not_check_predecessors(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = []
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            claim_pending(limit=50)
+            assert NOT_BLOCKED_SQL not in mock_cursor.execute.call_args[0][0]
+
+    def test_claim_takes_a_lease_and_skips_leased_rows(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = []
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            claim_pending(limit=10, claimed_by="worker-a", lease_seconds=30)
+            sql, params = mock_cursor.execute.call_args[0]
+            assert "claimed_until IS NULL OR claimed_until < NOW()" in sql
+            assert params == ("worker-a", 30, 10)
+
+    def test_strips_reclaim_flag_and_counts_reclaims(self):
+        from app.core.metrics import outbox_leases_reclaimed
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [
+            ("id-1", "ev-1", "market.ticks", {}, 0, False),
+            ("id-2", "ev-2", "market.ticks", {}, 1, True),
+        ]
+        before = outbox_leases_reclaimed._value.get()
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            rows = claim_pending(limit=10)
+        assert [len(r) for r in rows] == [5, 5]
+        assert outbox_leases_reclaimed._value.get() == before + 1
+
+    def test_rebuilds_envelope_from_event_when_outbox_has_no_copy(self):
+        occurred_at = datetime(2026, 10, 18, 15, 59, tzinfo=timezone.utc)
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [
+            ("id-1", "ev-1", "market.ticks", None, 0, False,
+             "ev-1", "MARKET_TICK_INGESTED", "yfinance", "AAPL", "equity",
+             occurred_at, 1, "tr-1", {"price": 1.0}),
+            ("id-2", "ev-2", "market.ticks", {"event_id": "ev-2"}, 0, False, *([None] * 9)),
+        ]
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            rows = claim_pending(limit=10)
+            assert "LEFT JOIN events e" in mock_cursor.execute.call_args[0][0]
+        assert rows[0] == ("id-1", "ev-1", "market.ticks", {
+            "event_id": "ev-1", "event_type": "MARKET_TICK_INGESTED", "source": "yfinance",
+            "entity_id": "AAPL", "entity_type": "equity", "occurred_at": occurred_at.isoformat(),
+            "schema_version": 1, "trace_id": "tr-1", "payload": {"price": 1.0},
+        }, 0)
+        # rows written before the outbox stopped storing a copy are published as stored
+        assert rows[1][3] == {"event_id": "ev-2"}
+
+
+def cte_definitions_are_separated(sql: str) -> bool:
+    """Every CTE after the first follows a `),` line; a missing comma is a syntax error."""
+    lines = [line.strip() for line in sql.splitlines() if line.strip()]
+    starts = [i for i, line in enumerate(lines) if re.fullmatch(r"(WITH )?\w+ AS \(", line)]
+    return len(starts) > 1 and all(lines[i - 1] == ")," for i in starts[1:])
+
+
+class TestMarkDeliveredMany:
+    def test_cte_list_is_well_formed(self):
+        from app.relay.repository import UPSERT_LATEST_TICKS_SQL
+        assert cte_definitions_are_separated(UPSERT_LATEST_TICKS_SQL)
+        assert not cte_definitions_are_separated(UPSERT_LATEST_TICKS_SQL.replace("),\n    upserted AS", ")\n    upserted AS"))
+
+    def test_runs_statements_with_ids_and_channel(self):
+        from app.relay.repository import (
+            DELIVERY_SEQ_LOCK_SQL, LATEST_TICKS_NOTIFY_CHANNEL, MARK_DELIVERED_SQL, UPSERT_LATEST_TICKS_SQL,
+        )
+        import uuid
+        ids = [uuid.uuid4(), uuid.uuid4()]
+        mock_conn, mock_cursor = make_mock_conn()
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            mark_delivered_many(ids)
+        mock_conn.transaction.assert_called_once()
+        expected_ids = [str(i) for i in ids]
+        calls = [c[0] for c in mock_cursor.execute.call_args_list]
+        assert calls == [
+            (UPSERT_LATEST_TICKS_SQL, (expected_ids, LATEST_TICKS_NOTIFY_CHANNEL)),
+            (DELIVERY_SEQ_LOCK_SQL, (expected_ids,)),
+            (MARK_DELIVERED_SQL, (expected_ids,)),
+        ]
+        for sql, params in calls:
+            assert sql.count("%s") == len(params)
+            assert sql.count("(") == sql.count(")")
+        assert UPSERT_LATEST_TICKS_SQL.strip().endswith("SELECT pg_notify(%s, entity_id) FROM upserted")
+
+    def test_one_transaction_for_batch(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            mark_delivered_many([f"id-{i}" for i in range(1000)])
+            # upsert, per-topic lock, numbering: three statements for the whole batch
+            assert mock_cursor.execute.call_count == 3
+            assert len(mock_cursor.execute.call_args[0][1][0]) == 1000
+
+    def test_assigns_delivery_seq_under_per_topic_lock(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            mark_delivered_many(["id-1", "id-2"])
+            upsert_sql, lock_sql, sql = [c[0][0] for c in mock_cursor.execute.call_args_list]
+            assert "pg_advisory_xact_lock" not in upsert_sql
+            assert "hashtext(t.topic)" in lock_sql
+            assert "ORDER BY topic" in lock_sql
+            assert "nextval('outbox_delivery_seq')" in sql
+            assert "ORDER BY occurred_at, created_at" in sql
+
+    def test_upserts_latest_tick_without_regressing(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            mark_delivered_many(["id-1"])
+            sql = mock_cursor.execute.call_args_list[0][0][0]
+            assert "INSERT INTO latest_ticks" in sql
+            assert "DISTINCT ON (e.entity_id)" in sql
+            assert "latest_ticks.occurred_at <= EXCLUDED.occurred_at" in sql
+
+    def test_empty_batch_skips_database(self):
+        with patch("app.relay.repository.get_connection") as mock_get:
+            mark_delivered_many([])
+            mock_get.assert_not_called()
+
+
+class TestMarkFailedMany:
+    def test_single_statement_mixed_outcomes(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [("a", False), ("b", True)]
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            recorded = mark_failed_many([("a", 1, "timeout"), ("b", 5, "timeout")])
+            assert recorded == {"a": False, "b": True}
+            assert mock_cursor.execute.call_count == 1
+            ids, errors, next_times, dead_flags, _, _ = mock_cursor.execute.call_args[0][1]
+            assert dead_flags == [False, True]
+            assert next_times[0] is not None and next_times[1] is None
+
+
+class TestMarkFailedManyFencing:
+    def test_only_touches_rows_still_leased_to_caller(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = []
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            recorded = mark_failed_many([("a", 5, "timeout")], claimed_by="worker-a")
+            sql, params = mock_cursor.execute.call_args[0]
+            assert "o.claimed_by = %s" in sql
+            assert params[-1] == "worker-a"
+            assert recorded == {}
+
+
+class TestReleaseClaimedMany:
+    def test_undoes_claim_increment_behind_blocker(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            release_claimed_many([("b", "a")])
+            sql, params = mock_cursor.execute.call_args[0]
+            assert "delivery_attempts - 1" in sql
+            assert params[:2] == (["b"], ["a"])
+
+
 class TestMarkFailed:
     def test_schedules_retry_below_max(self):
         mock_conn, mock_cursor = make_mock_conn()
-        with patch("app.relay.repository.psycopg.connect", return_value=mock_conn):
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
             mark_failed("some-outbox-id", attempt=2, error="timeout")
             assert mock_cursor.execute.called
 
     def test_dead_letters_at_max_attempts(self):
         mock_conn, mock_cursor = make_mock_conn()
-        with patch("app.relay.repository.psycopg.connect", return_value=mock_conn):
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
             mark_failed("some-outbox-id", attempt=5, error="timeout")
             call_args = mock_cursor.execute.call_args[0][0]
             assert "dead_lettered_at" in call_args
@@ -42,7 +239,7 @@ class TestGetDeadLetters:
     def test_returns_empty_list_when_none(self):
         mock_conn, mock_cursor = make_mock_conn()
         mock_cursor.fetchall.return_value = []
-        with patch("app.relay.repository.psycopg.connect", return_value=mock_conn):
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
             result = get_dead_letters()
             assert result == []
 
@@ -60,7 +257,7 @@ class TestGetDeadLetters:
             "AAPL",
             datetime(2026, 3, 1, tzinfo=timezone.utc),
         )]
-        with patch("app.relay.repository.psycopg.connect", return_value=mock_conn):
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
             result = get_dead_letters()
             assert len(result) == 1
             assert result[0]["topic"] == "market.ticks"
@@ -68,10 +265,272 @@ class TestGetDeadLetters:
             assert result[0]["delivery_attempts"] == 5
 
 
+def make_dead_letter_row(minute, outbox_id=None):
+    from datetime import datetime, timezone
+    import uuid
+    at = datetime(2026, 3, 1, 12, minute, tzinfo=timezone.utc)
+    return (
+        uuid.uuid4(), "market.ticks", 5, "boom", at,
+        "MARKET_TICK_INGESTED", "AAPL", at, outbox_id or uuid.uuid4(),
+    )
+
+
+class TestDeadLetterPagination:
+    def test_returns_next_cursor_when_more_rows(self):
+        import uuid
+        mock_conn, mock_cursor = make_mock_conn()
+        last_id = uuid.uuid4()
+        mock_cursor.fetchall.return_value = [
+            make_dead_letter_row(3), make_dead_letter_row(2, last_id), make_dead_letter_row(1),
+        ]
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            items, next_cursor = get_dead_letters_page(limit=2)
+            sql, params = mock_cursor.execute.call_args[0]
+            assert "ORDER BY o.dead_lettered_at DESC, o.id DESC" in sql
+            assert params[-1] == 3
+        assert len(items) == 2
+        at, outbox_id = decode_dead_letter_cursor(next_cursor)
+        assert outbox_id == str(last_id)
+        assert at.minute == 2
+
+    def test_last_page_has_no_cursor(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [make_dead_letter_row(1)]
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            _, next_cursor = get_dead_letters_page(limit=2)
+        assert next_cursor is None
+
+    def test_cursor_and_filters_become_keyset_predicates(self):
+        from datetime import datetime, timezone
+        import uuid
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = []
+        outbox_id = uuid.uuid4()
+        at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        cursor = encode_dead_letter_cursor(at, outbox_id)
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            get_dead_letters_page(
+                limit=10, cursor=cursor, topic="market.ticks", entity_id="AAPL", error="50%_off",
+            )
+            sql, params = mock_cursor.execute.call_args[0]
+        assert "(o.dead_lettered_at, o.id) < (%s, %s::uuid)" in sql
+        assert "o.partition_key = %s" in sql
+        assert params == (at, str(outbox_id), "market.ticks", "AAPL", "%50\\%\\_off%", 11)
+
+    def test_rejects_malformed_cursor(self):
+        with pytest.raises(ValueError):
+            decode_dead_letter_cursor("not-a-cursor")
+
+
+class TestIterDeadLetters:
+    def test_streams_through_server_side_cursor(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.__iter__.return_value = iter([make_dead_letter_row(2), make_dead_letter_row(1)])
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            items = list(iter_dead_letters(topic="market.ticks"))
+            assert "name" in mock_conn.cursor.call_args.kwargs
+            assert "LIMIT" not in mock_cursor.execute.call_args[0][0]
+        assert len(items) == 2
+
+
+class TestReplayDeadLetters:
+    def test_requeues_matches_in_one_paced_statement(self):
+        from datetime import datetime, timezone
+        mock_conn, mock_cursor = make_mock_conn()
+        at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        mock_cursor.fetchone.return_value = ("job-1", 250, at, at)
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            job = replay_dead_letters(rate_per_second=50, topic="market.ticks", error="timeout")
+            sql, params = mock_cursor.execute.call_args_list[0][0]
+            assert "FOR UPDATE SKIP LOCKED" in sql
+            assert "ROW_NUMBER() OVER (ORDER BY occurred_at, created_at)" in sql
+            assert "INSERT INTO replay_jobs" in sql
+            # requeued events below the archive watermark pull it back
+            assert "UPDATE event_archive_watermarks" in sql
+            assert cte_definitions_are_separated(sql)
+            assert params[:2] == ("market.ticks", "%timeout%")
+            assert params[2] == 0.02
+            # relay is woken once for the whole job
+            assert "pg_notify" in mock_cursor.execute.call_args_list[1][0][0]
+        assert job["requeued"] == 250
+
+    def test_single_replay_rewinds_archive_watermark(self):
+        from app.relay.repository import replay_dead_letter
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchone.return_value = ("outbox-1",)
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            assert replay_dead_letter("ev-1")["status"] == "requeued"
+            sql = mock_cursor.execute.call_args_list[1][0][0]
+            assert "date_trunc('day', e.occurred_at, 'UTC')" in sql
+            assert cte_definitions_are_separated(sql)
+
+    def test_no_matches_skips_notify(self):
+        from datetime import datetime, timezone
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchone.return_value = ("job-1", 0, datetime(2026, 3, 1, tzinfo=timezone.utc), None)
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            job = replay_dead_letters(topic="nope")
+            assert mock_cursor.execute.call_count == 1
+        assert job["finishes_at"] is None
+
+
+class TestGetReplayJob:
+    def test_reports_progress(self):
+        from datetime import datetime, timezone
+        mock_conn, mock_cursor = make_mock_conn()
+        at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        mock_cursor.fetchone.return_value = ("job-1", {"topic": "market.ticks"}, 50.0, 10, at, at, 7, 1, 2)
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            job = get_replay_job("job-1")
+        assert (job["delivered"], job["dead_lettered"], job["pending"]) == (7, 1, 2)
+        assert job["status"] == "running"
+
+    def test_returns_none_when_missing(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchone.return_value = None
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            assert get_replay_job("missing") is None
+
+
 class TestGetEventTrace:
     def test_returns_none_when_event_not_found(self):
         mock_conn, mock_cursor = make_mock_conn()
-        mock_cursor.fetchone.return_value = None
-        with patch("app.relay.repository.psycopg.connect", return_value=mock_conn):
-            result = get_event_trace("nonexistent-id")
-            assert result is None
\ No newline at end of file
+        mock_cursor.fetchall.return_value = []
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            result = get_event_trace("0b7c5a52-2d1e-4c1b-9a57-1f8a3e0c4d21")
+            assert result is None
+
+    def test_normalizes_event_id(self):
+        event_id = "0b7c5a52-2d1e-4c1b-9a57-1f8a3e0c4d21"
+        with patch("app.relay.repository.get_event_traces", return_value={event_id: {"event": {}}}) as mock_traces:
+            assert get_event_trace(event_id.upper().replace("-", "")) == {"event": {}}
+            mock_traces.assert_called_once_with([event_id])
+
+    def test_rejects_non_uuid(self):
+        with patch("app.relay.repository.get_connection") as mock_get:
+            with pytest.raises(ValueError):
+                get_event_trace("nonexistent-id")
+            mock_get.assert_not_called()
+
+    def test_single_query_with_linked_raw_payload(self):
+        from datetime import datetime, timezone
+        import uuid
+        at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        event_id, raw_id = uuid.uuid4(), uuid.uuid4()
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [(
+            event_id, "MARKET_TICK_INGESTED", "yfinance", "AAPL", "equity", at, at, 1, uuid.uuid4(),
+            {"price": 1.0},
+            "market.ticks", 1, at, at, None, None, at,
+            raw_id, "yfinance", at, {"symbol": "AAPL"}, None,
+        )]
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            trace = get_event_trace(str(event_id))
+            assert mock_cursor.execute.call_count == 1
+            assert "r.id = e.raw_payload_id" in mock_cursor.execute.call_args[0][0]
+        assert trace["final_state"] == "DELIVERED"
+        assert trace["raw_payload"]["id"] == str(raw_id)
+        assert trace["raw_payload"]["payload"] == {"symbol": "AAPL"}
+
+    def test_decompresses_large_raw_payload(self):
+        import uuid
+        import zlib
+        at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        event_id = uuid.uuid4()
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [(
+            event_id, "MARKET_TICK_INGESTED", "yfinance", "AAPL", "equity", at, at, 1, uuid.uuid4(),
+            {"price": 1.0},
+            "market.ticks", 1, at, at, None, None, at,
+            uuid.uuid4(), "yfinance", at, None, zlib.compress(b'{"symbol":"AAPL"}'),
+        )]
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            trace = get_event_trace(str(event_id))
+            assert "b.content_hash = r.content_hash" in mock_cursor.execute.call_args[0][0]
+        assert trace["raw_payload"]["payload"] == {"symbol": "AAPL"}
+
+    def test_event_without_outbox_or_raw_link(self):
+        from datetime import datetime, timezone
+        import uuid
+        at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        event_id = uuid.uuid4()
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = [(
+            event_id, "MARKET_TICK_INGESTED", "yfinance", "AAPL", "equity", at, at, 1, uuid.uuid4(),
+            {"price": 1.0},
+        ) + (None,) * 12]
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            trace = get_event_trace(str(event_id))
+        assert trace["final_state"] == "NO_OUTBOX_RECORD"
+        assert trace["outbox"] is None
+        assert trace["raw_payload"] is None
+
+    def test_batch_is_one_query(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchall.return_value = []
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            assert get_event_traces(["a", "b", "c"]) == {}
+            assert mock_cursor.execute.call_count == 1
+            assert mock_cursor.execute.call_args[0][1] == (["a", "b", "c"],)
+
+
+class TestGetSystemHealth:
+    def test_reads_counters_not_outbox(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchone.return_value = (10, 2, 3, None)
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            health = get_system_health()
+            sql = mock_cursor.execute.call_args[0][0]
+            assert "FROM outbox_stats" in sql
+            assert "FROM outbox\n" not in sql
+        assert health == {
+            "delivered_events": 10,
+            "dead_lettered_events": 2,
+            "pending_events": 3,
+            "last_delivered_at": None,
+        }
+
+
+class TestCountPending:
+    def test_reads_counters(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchone.return_value = (7,)
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            assert count_pending() == 7
+            assert "outbox_stats" in mock_cursor.execute.call_args[0][0]
+
+    def test_numeric_sum_comes_back_as_int(self):
+        from decimal import Decimal
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchone.return_value = (Decimal("7"),)
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            pending = count_pending()
+        assert pending == 7 and type(pending) is int
+        assert "::bigint" in mock_cursor.execute.call_args[0][0]
+
+
+class TestSecondsUntilNextAttempt:
+    def test_none_when_nothing_pending(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchone.return_value = (None,)
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            assert seconds_until_next_attempt() is None
+        assert NOT_BLOCKED_SQL not in mock_cursor.execute.call_args[0][0]
+
+    def test_preserve_order_ignores_rows_blocked_behind_a_retry(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchone.return_value = (4.5,)
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            assert seconds_until_next_attempt(preserve_order=True) == 4.5
+        sql, params = mock_cursor.execute.call_args[0]
+        assert NOT_BLOCKED_SQL in sql
+        assert params == ()
+
+    def test_partition_ignores_rows_blocked_behind_a_retry(self):
+        mock_conn, mock_cursor = make_mock_conn()
+        mock_cursor.fetchone.return_value = (4.5,)
+        with patch("app.relay.repository.get_connection", return_value=mock_conn):
+            assert seconds_until_next_attempt((1, 4)) == 4.5
+        sql, params = mock_cursor.execute.call_args[0]
+        assert NOT_BLOCKED_SQL in sql
+        assert params == (4, 1)